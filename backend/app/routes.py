@@ -1,8 +1,63 @@
 # app/routes.py
-from fastapi import APIRouter
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from backend.rag import RAG
+from backend.rag.ingest import ChunkIndex
+from backend.rag.llm import StreamMetrics, record_stream_metrics
+from backend.rag.rag import build_prompt
+from backend.rag.vector import DEFAULT_STORE, Embedder, EmbeddingStore
 
 router = APIRouter()
 
+RAG_REFRESH_SECONDS = 30
+
+_rag = RAG()
+_rag_lock = threading.Lock()
+_chunks = None        # ChunkIndex over the embedding store, once the store exists
+_embedder = None
+_seen = None          # ChunkIndex.version() the retriever reflects
+_checked_at = None
+
+
+def get_rag() -> RAG:
+    """
+    One RAG per process; its retriever covers every ingested chunk (articles, PDFs) in the store.
+    At most every RAG_REFRESH_SECONDS the chunk index is checked: new chunks are added to the
+    live retriever, and it is rebuilt only when chunks were replaced or removed.
+    """
+    global _chunks, _embedder, _seen, _checked_at
+    with _rag_lock:
+        now = time.monotonic()
+        if _checked_at is not None and now - _checked_at < RAG_REFRESH_SECONDS:
+            return _rag
+        _checked_at = now
+        if _chunks is None:
+            if not os.path.exists(DEFAULT_STORE):
+                return _rag  # nothing ingested yet; checked again after the next interval
+            store = EmbeddingStore()
+            _chunks, _embedder = ChunkIndex(store), Embedder(store=store)
+        version = _chunks.version()
+        if version == _seen:
+            return _rag
+        if _seen is not None and version[1] == _seen[1]:
+            _rag.retriever.add(*_chunks.documents(after=_seen[0], upto=version[0]))
+        else:
+            _rag.retriever = _chunks.build_retriever(_embedder, upto=version[0])
+        _seen = version
+    return _rag
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @router.get("/home")
 def ping():
     return {"message": "pong"}
@@ -16,3 +71,41 @@ def gamble():
     return {"Put your life savings into NMAX"}#Put nmax in there cuz it lost most money in the year
 
 
+@router.get("/rag/stream")
+async def stream_answer(q: str = Query(..., min_length=1), ticker: str | None = None,
+                        start: str | None = None, end: str | None = None, k: int = Query(4, ge=1, le=20)):
+    """
+    Server-Sent Events answer: /rag/stream?q=...&ticker=NVDA&start=2025-01-01
+
+    Events: `sources` (retrieved passages), one `token` per generated token,
+    then `done` with time-to-first-token and tokens/sec. The same metrics are
+    appended to db/llm_timings.jsonl for every request, finished or not.
+    """
+    try:
+        dates = [datetime.fromisoformat(d) if d else None for d in (start, end)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start/end must be ISO dates")
+    metrics = StreamMetrics()
+    metrics.start()  # TTFT includes retrieval
+
+    async def events():
+        completed, retrieval = False, None
+        try:
+            rag = await asyncio.to_thread(get_rag)
+            hits = await rag.retrieve(q, k, ticker, *dates) if len(rag.retriever) else []
+            retrieval = time.perf_counter() - metrics.started
+            yield _sse("sources", [{"id": h.document.id, "tickers": list(h.document.tickers),
+                                    "datetime": h.document.datetime, "score": h.score} for h in hits])
+            async for token in rag.a_stream(build_prompt(q, hits), metrics):
+                yield _sse("token", token)
+            completed = True
+            yield _sse("done", metrics.as_dict() | {"retrieval_seconds": retrieval})
+        finally:
+            # Also runs when the client disconnects mid-stream
+            if metrics.finished is None:
+                metrics.finish()
+            record_stream_metrics({"at": time.time(), "route": "/rag/stream", "completed": completed,
+                                   "retrieval_seconds": retrieval, **metrics.as_dict()})
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
@@ -0,0 +1,175 @@
+"""
+Walk-forward backtesting for the XGBoost forecaster.
+
+Each ticker's features are computed once (features.feature_arrays) and every
+fold just slices those arrays. A fold trains the next-day return model on an
+expanding or rolling window ending at `train_end`, then, exactly like
+get_next_30_day_predictions does live, rolls it forward recursively from every
+origin in the next `step` days. All origins of a fold advance together in one
+RollingState, so a fold costs max(horizons) predict calls.
+
+Tickers, and fold chunks within a ticker, run in parallel across processes.
+
+Run from the backend directory:
+    python -m forecasting.backtest --tickers 500 --years 5
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .config import make_model
+from .features import feature_arrays
+from .multi_horizon import LONG_WINDOW, RollingState, recursive_forecast
+
+DEFAULT_HORIZONS = (1, 5, 20)
+# Rows before this have incomplete rolling features (SMA_30 needs 30 closes)
+WARMUP_ROWS = LONG_WINDOW - 1
+METRIC_COLUMNS = ['ticker', 'fold', 'horizon', 'train_start', 'train_end', 'test_end',
+                  'n_test', 'mae', 'rmse', 'mape', 'r2', 'hit_rate', 'naive_rmse']
+
+
+def walk_forward_splits(n_rows: int, initial_train: int = 250, step: int = 63,
+                        window: str = 'expanding', train_size: int | None = None) -> list:
+    """(train_start, train_end, test_end) row ranges for every fold
+
+    window='expanding' always trains from row 0; window='rolling' keeps the
+    last `train_size` rows (defaults to initial_train).
+    """
+    if window not in ('expanding', 'rolling'):
+        raise ValueError("window must be 'expanding' or 'rolling'")
+    train_size = train_size or initial_train
+    splits = []
+    train_end = initial_train
+    while train_end < n_rows:
+        train_start = 0 if window == 'expanding' else max(0, train_end - train_size)
+        splits.append((train_start, train_end, min(train_end + step, n_rows)))
+        train_end += step
+    return splits
+
+
+def _fold_metrics(y_true, y_pred, last_close) -> dict:
+    err = y_pred - y_true
+    ss_tot = np.sum((y_true - y_true.mean()) ** 2)
+    return {
+        'mae': float(np.mean(np.abs(err))),
+        'rmse': float(np.sqrt(np.mean(err ** 2))),
+        'mape': float(np.mean(np.abs(err) / np.abs(y_true)) * 100),
+        'r2': float(1 - np.sum(err ** 2) / ss_tot) if ss_tot > 0 else float('nan'),
+        # Did the forecast get the direction of the move right?
+        'hit_rate': float(np.mean(np.sign(y_pred - last_close) == np.sign(y_true - last_close))),
+        'naive_rmse': float(np.sqrt(np.mean((last_close - y_true) ** 2))),
+    }
+
+
+def _run_folds(ticker: str, arrays: dict, folds: list, horizons, params: dict) -> list:
+    """Evaluate the given folds of one ticker; runs inside a worker process"""
+    rows = []
+    X, log_return, close = arrays['X'], arrays['log_return'], arrays['close']
+    n = len(close)
+    max_h = max(horizons)
+    for fold_id, (train_start, train_end, test_end) in folds:
+        # Train only on rows whose next-day return is already known at train_end
+        train = np.arange(max(train_start, WARMUP_ROWS), train_end - 1)
+        train = train[~np.isnan(log_return[train])]
+        origins = np.arange(train_end, min(test_end, n - 1))
+        if len(train) < 50 or len(origins) == 0:
+            continue
+
+        model = make_model(**params)
+        model.fit(X[train], log_return[train], verbose=False)
+
+        state = RollingState.at_origins(arrays, origins)
+        path = recursive_forecast(model.predict, state, max_h)
+
+        for h in horizons:
+            valid = origins + h < n
+            if not valid.any():
+                continue
+            y_test = close[origins[valid] + h]
+            rows.append({
+                'ticker': ticker, 'fold': fold_id, 'horizon': h,
+                'train_start': int(train[0]), 'train_end': train_end,
+                'test_end': int(origins[valid][-1]) + 1, 'n_test': int(valid.sum()),
+                **_fold_metrics(y_test, path[valid, h - 1], close[origins[valid]]),
+            })
+    return rows
+
+
+def backtest(histories: dict, horizons=DEFAULT_HORIZONS, initial_train: int = 250,
+             step: int = 63, window: str = 'expanding', train_size: int | None = None,
+             params: dict | None = None, max_workers: int | None = None) -> pd.DataFrame:
+    """Walk-forward backtest over {ticker: OHLCV frame}; returns the per-fold metrics table"""
+    max_workers = max_workers or os.cpu_count() or 1
+    # One tree-building thread per model; parallelism comes from the process pool
+    params = {'n_jobs': 1, **(params or {})}
+
+    tasks = []
+    for ticker, df in histories.items():
+        arrays = feature_arrays(df)
+        folds = list(enumerate(walk_forward_splits(len(arrays['close']), initial_train,
+                                                   step, window, train_size)))
+        if not folds:
+            continue
+        # Split a ticker's folds into chunks when there are fewer tickers than workers
+        n_chunks = max(1, min(len(folds), math.ceil(max_workers / max(len(histories), 1))))
+        for chunk in np.array_split(np.arange(len(folds)), n_chunks):
+            tasks.append((ticker, arrays, [folds[i] for i in chunk], tuple(horizons), params))
+
+    rows = []
+    if max_workers == 1:
+        for task in tasks:
+            rows.extend(_run_folds(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for result in pool.map(_run_folds, *zip(*tasks), chunksize=1):
+                rows.extend(result)
+
+    return compact_metrics(pd.DataFrame(rows, columns=METRIC_COLUMNS))
+
+
+def compact_metrics(metrics: pd.DataFrame) -> pd.DataFrame:
+    """Shrink the metrics table: categorical tickers, int32 indices, float32 metrics"""
+    metrics = metrics.astype({'ticker': 'category'})
+    for col in ('fold', 'horizon', 'train_start', 'train_end', 'test_end', 'n_test'):
+        metrics[col] = metrics[col].astype(np.int32)
+    for col in ('mae', 'rmse', 'mape', 'r2', 'hit_rate', 'naive_rmse'):
+        metrics[col] = metrics[col].astype(np.float32)
+    return metrics.sort_values(['ticker', 'horizon', 'fold'], ignore_index=True)
+
+
+def summarize(metrics: pd.DataFrame) -> pd.DataFrame:
+    """Mean metrics per horizon across tickers and folds"""
+    return metrics.groupby('horizon', observed=True)[
+        ['mae', 'rmse', 'mape', 'r2', 'hit_rate', 'naive_rmse']].mean()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .synthetic import synthetic_universe
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest benchmark")
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--step', type=int, default=63)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--n-estimators', type=int, default=None)
+    parser.add_argument('--output', default='backtest_metrics.csv')
+    args = parser.parse_args()
+
+    histories = synthetic_universe(args.tickers, args.years * 252)
+    params = {'n_estimators': args.n_estimators} if args.n_estimators else None
+
+    print(f"📊 Backtesting {args.tickers} tickers x {args.years} years on {args.workers} workers...")
+    started = time.perf_counter()
+    metrics = backtest(histories, step=args.step, params=params, max_workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    metrics.to_csv(args.output, index=False)
+    print(summarize(metrics))
+    print(f"✅ {len(metrics)} fold results in {elapsed:.1f}s "
+          f"({metrics.memory_usage(deep=True).sum() / 1024:.0f} KiB) -> {args.output}")
@@ -0,0 +1,72 @@
+"""XGBoost forecaster configuration.
+
+XGB_PARAMS are the defaults. forecasting.tuning writes tuned overrides per
+sector and per ticker to db/tuned_params.json, along with the sector each
+tuned ticker belongs to; `params_for` layers them as defaults <- sector <-
+ticker, looking the sector up there when the caller doesn't pass one.
+"""
+import json
+import os
+
+from xgboost import XGBRegressor
+
+XGB_PARAMS = {
+    'n_estimators': 400,
+    'learning_rate': 0.1,
+    'max_depth': 6,
+    'min_child_weight': 1,
+    'subsample': 0.9,
+    'colsample_bytree': 0.9,
+    'reg_alpha': 0.01,
+    'reg_lambda': 0.01,
+    'random_state': 42,
+}
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # goes up from forecasting to backend
+TUNED_PARAMS_PATH = os.path.join(BASE_DIR, 'db', 'tuned_params.json')
+
+
+def load_tuned_params(path: str = TUNED_PARAMS_PATH) -> dict:
+    """{'tickers': {...}, 'sectors': {...}, 'members': {ticker: sector}} written by the tuner"""
+    if not os.path.exists(path):
+        return {'tickers': {}, 'sectors': {}, 'members': {}}
+    with open(path) as f:
+        tuned = json.load(f)
+    tuned.setdefault('tickers', {})
+    tuned.setdefault('sectors', {})
+    tuned.setdefault('members', {})
+    return tuned
+
+
+def save_tuned_params(level: str, best: dict, path: str = TUNED_PARAMS_PATH,
+                      members: dict | None = None):
+    """Merge {group: params} into the tuned overrides at level 'tickers' or 'sectors'
+
+    `members` ({ticker: sector}) records which sector a ticker was tuned in.
+    """
+    tuned = load_tuned_params(path)
+    tuned[level].update(best)
+    tuned['members'].update({t.upper(): s for t, s in (members or {}).items()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(tuned, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def params_for(ticker: str | None = None, sector: str | None = None) -> dict:
+    """Hyperparameters for a ticker: defaults, then sector overrides, then ticker overrides"""
+    tuned = load_tuned_params()
+    params = dict(XGB_PARAMS)
+    if ticker and not sector:
+        sector = tuned['members'].get(ticker.upper())
+    if sector:
+        params.update(tuned['sectors'].get(sector, {}))
+    if ticker:
+        params.update(tuned['tickers'].get(ticker.upper(), {}))
+    return params
+
+
+def make_model(**overrides) -> XGBRegressor:
+    """XGBRegressor with the forecaster's default hyperparameters, optionally overridden"""
+    return XGBRegressor(**{**XGB_PARAMS, **overrides})
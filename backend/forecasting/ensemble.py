@@ -0,0 +1,198 @@
+"""
+Weighted ensemble of the XGBoost, ARIMA and Prophet forecasters with
+prediction intervals.
+
+For every ticker each model is refitted at a few recent walk-forward origins
+and scored on the `horizon` closes that followed. Those log errors give:
+
+- weights: inverse mean squared error, so the model that has been most
+  accurate lately counts most. Forecasts are combined in log-price space.
+- bands: the ensemble's per-step errors are resampled with replacement into
+  cumulative error paths (residual bootstrap). This runs for all tickers at
+  once in NumPy, and the quantiles of those paths scale the point forecast.
+
+The batch job (save_forecasting_to_db.run_ensemble_batch) precomputes this for
+the universe so the API only has to read it.
+
+Run from the backend directory for a synthetic timing run:
+    python -m forecasting.ensemble --tickers 20
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .forecasters import fit_predict, get_forecaster, load_states, record_timings, save_states
+from .multi_horizon import future_dates
+
+ENSEMBLE_MODELS = ('xgboost', 'arima', 'prophet')
+N_ORIGINS = 4
+ORIGIN_STEP = 21
+N_SIMS = 1000
+# Quantile -> column name; the 5-95% and 25-75% bands
+BANDS = {0.05: 'lower_90', 0.25: 'lower_50', 0.75: 'upper_50', 0.95: 'upper_90'}
+
+
+def walk_forward_errors(name: str, ticker: str, history: pd.DataFrame, horizon: int,
+                        n_origins: int = N_ORIGINS, step: int = ORIGIN_STEP,
+                        warm_start: dict | None = None) -> np.ndarray:
+    """(n_origins, horizon) log(actual / forecast), most recent origin first"""
+    close = history['Close'].to_numpy(dtype=np.float64)
+    min_history = get_forecaster(name).min_history
+    errors = []
+    for k in range(n_origins):
+        origin = len(close) - horizon - k * step
+        if origin < min_history:
+            break
+        result = fit_predict(name, ticker, history.iloc[:origin], horizon, warm_start)
+        errors.append(np.log(close[origin:origin + horizon]) - np.log(result['forecast']))
+    return np.asarray(errors, dtype=np.float64).reshape(-1, horizon)
+
+
+def _ensemble_task(args) -> dict:
+    """Walk-forward errors and the final forecast of every model for one ticker"""
+    ticker, history, horizon, models, states = args
+    out = {'ticker': ticker, 'errors': {}, 'forecasts': {}, 'states': {}, 'timings': []}
+    for name in models:
+        try:
+            warm_start = states.get(name, {}).get(ticker)
+            errors = walk_forward_errors(name, ticker, history, horizon, warm_start=warm_start)
+            result = fit_predict(name, ticker, history, horizon, warm_start)
+        except Exception as e:  # a missing package or too little history drops the model
+            print(f"⚠️ {name} skipped for {ticker}: {e}")
+            continue
+        if len(errors) == 0:
+            continue
+        out['errors'][name] = errors
+        out['forecasts'][name] = result['forecast']
+        if result['state']:
+            out['states'][name] = result['state']
+        out['timings'].append({k: result[k] for k in ('ticker', 'model', 'fit_seconds',
+                                                      'predict_seconds', 'warm_started')})
+    return out
+
+
+def combine(errors: dict, forecasts: dict) -> tuple[dict, np.ndarray, np.ndarray]:
+    """Inverse-MSE weights, weighted log-space point forecast and the ensemble's errors
+
+    Models are compared on the origins they all have (the most recent ones).
+    """
+    names = list(forecasts)
+    k = min(len(errors[n]) for n in names)
+    E = np.stack([errors[n][:k] for n in names])                      # (models, k, horizon)
+    mse = np.mean(E ** 2, axis=(1, 2))
+    w = 1.0 / np.maximum(mse, 1e-12)
+    w /= w.sum()
+    log_point = np.einsum('m,mh->h', w, np.log(np.stack([forecasts[n] for n in names])))
+    # log(actual / ensemble) is the weighted sum of each model's log error
+    ensemble_errors = np.einsum('m,mkh->kh', w, E)
+    return dict(zip(names, w.tolist())), np.exp(log_point), ensemble_errors
+
+
+def bootstrap_bands(points: np.ndarray, innovations: np.ndarray, counts: np.ndarray,
+                    n_sims: int = N_SIMS, seed: int = 42, chunk: int = 64) -> np.ndarray:
+    """Quantile bands for many tickers at once
+
+    points: (n, horizon) point forecasts. innovations: (n, m) per-step log
+    errors, of which the first counts[i] are valid for ticker i. Returns
+    (len(BANDS), n, horizon) prices.
+    """
+    rng = np.random.default_rng(seed)
+    n, horizon = points.shape
+    quantiles = np.array(list(BANDS))
+    bands = np.empty((len(quantiles), n, horizon))
+    for start in range(0, n, chunk):
+        rows = slice(start, min(start + chunk, n))
+        pool = innovations[rows].astype(np.float32)
+        c = counts[rows]
+        # Uniform index into each ticker's own valid innovations
+        idx = (rng.random((len(pool), n_sims * horizon)) * c[:, None]).astype(np.int64)
+        paths = np.take_along_axis(pool, idx, axis=1).reshape(len(pool), n_sims, horizon)
+        np.cumsum(paths, axis=2, out=paths)
+        bands[:, rows] = points[rows] * np.exp(np.quantile(paths, quantiles, axis=1))
+    return bands
+
+
+def _innovations(ensemble_errors: np.ndarray) -> np.ndarray:
+    """Per-step errors (first step, then increments), centred so bands sit on the point path"""
+    steps = np.diff(ensemble_errors, axis=1, prepend=0.0).ravel()
+    return steps - steps.mean()
+
+
+def forecast_ensemble(histories: dict, horizon: int = 30, models=ENSEMBLE_MODELS,
+                      max_workers: int | None = None, persist: bool = True) -> dict:
+    """Ensemble forecast with bands for {ticker: OHLCV frame}
+
+    Returns {ticker: DataFrame[Date, Predicted_Close, lower_90, lower_50,
+    upper_50, upper_90]} with the model weights in df.attrs['weights'].
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    states = load_states()
+    tasks = [(t, df, horizon, tuple(models), states) for t, df in histories.items()]
+    if max_workers == 1 or len(tasks) == 1:
+        results = [_ensemble_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_ensemble_task, tasks))
+    results = [r for r in results if r['forecasts']]
+    if not results:
+        return {}
+
+    combined = [combine(r['errors'], r['forecasts']) for r in results]
+    points = np.stack([c[1] for c in combined])
+    steps = [_innovations(c[2]) for c in combined]
+    counts = np.array([len(s) for s in steps])
+    innovations = np.zeros((len(steps), counts.max()))
+    for i, s in enumerate(steps):
+        innovations[i, :len(s)] = s
+    bands = bootstrap_bands(points, innovations, counts)
+
+    if persist:
+        new_states = {}
+        for r in results:
+            for name, state in r['states'].items():
+                new_states.setdefault(name, {})[r['ticker']] = state
+        save_states(new_states)
+        record_timings([row | {'at': time.time()} for r in results for row in r['timings']])
+
+    out = {}
+    for i, r in enumerate(results):
+        ticker = r['ticker']
+        df = pd.DataFrame({'Date': future_dates(histories[ticker].index[-1], horizon),
+                           'Predicted_Close': points[i]})
+        for j, column in enumerate(BANDS.values()):
+            df[column] = bands[j, i]
+        df.attrs['weights'] = combined[i][0]
+        out[ticker] = df
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .synthetic import synthetic_universe
+
+    parser = argparse.ArgumentParser(description="Ensemble forecast timing run")
+    parser.add_argument('--tickers', type=int, default=20)
+    parser.add_argument('--days', type=int, default=504)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    histories = synthetic_universe(args.tickers, args.days)
+    started = time.perf_counter()
+    forecasts = forecast_ensemble(histories, max_workers=args.workers, persist=False)
+    fitted = time.perf_counter() - started
+
+    # Bootstrap cost alone, for the whole universe
+    points = np.stack([df['Predicted_Close'].to_numpy() for df in forecasts.values()])
+    innovations = np.random.default_rng(0).normal(0, 0.01, (len(points), N_ORIGINS * 30))
+    started = time.perf_counter()
+    bootstrap_bands(points, innovations, np.full(len(points), innovations.shape[1]))
+    bands_seconds = time.perf_counter() - started
+
+    first = next(iter(forecasts.values()))
+    print(first.head().round({c: 2 for c in first.columns if c != "Date"}))
+    print(f"⚖️ Weights: {first.attrs['weights']}")
+    print(f"✅ {len(forecasts)} tickers in {fitted:.1f}s; bands alone {bands_seconds * 1000:.1f} ms")
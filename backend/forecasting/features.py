@@ -0,0 +1,100 @@
+"""Feature engineering shared by the forecaster, backtests and research scripts."""
+import numpy as np
+import pandas as pd
+
+FEATURE_COLS = ['Open', 'High', 'Low', 'Close', 'Volume',
+                'SMA_10', 'SMA_30', 'Volatility', 'Volume_MA']
+
+
+def add_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the rolling technical indicators the XGBoost forecaster trains on"""
+    df['SMA_10'] = df['Close'].rolling(10).mean()
+    df['SMA_30'] = df['Close'].rolling(30).mean()
+    df['Volatility'] = df['Close'].rolling(10).std()
+    df['Volume_MA'] = df['Volume'].rolling(10).mean()
+    return df
+
+
+def add_target(df: pd.DataFrame, horizon: int = 1, column: str = 'target') -> pd.DataFrame:
+    """Target = closing price `horizon` trading days ahead"""
+    df[column] = df['Close'].shift(-horizon)
+    return df
+
+
+# Scale-free versions of FEATURE_COLS: every price feature is relative to Close
+# and volume is relative to its moving average, so one model can serve any
+# ticker and predictions (log returns) extrapolate beyond the training range.
+RELATIVE_FEATURE_COLS = ['Open_rel', 'High_rel', 'Low_rel', 'SMA_10_rel',
+                         'SMA_30_rel', 'Volatility_rel', 'Volume_rel']
+
+
+def relative_features(df: pd.DataFrame) -> pd.DataFrame:
+    """RELATIVE_FEATURE_COLS from a frame that already has add_features() columns"""
+    close = df['Close']
+    return pd.DataFrame({
+        'Open_rel': df['Open'] / close - 1,
+        'High_rel': df['High'] / close - 1,
+        'Low_rel': df['Low'] / close - 1,
+        'SMA_10_rel': df['SMA_10'] / close - 1,
+        'SMA_30_rel': df['SMA_30'] / close - 1,
+        'Volatility_rel': df['Volatility'] / close,
+        'Volume_rel': np.log((df['Volume'] + 1) / (df['Volume_MA'] + 1)),
+    }, index=df.index)
+
+
+def log_return_target(df: pd.DataFrame, horizon: int = 1) -> pd.Series:
+    """log(Close[t + horizon] / Close[t])"""
+    return np.log(df['Close'].shift(-horizon) / df['Close'])
+
+
+def feature_arrays(df: pd.DataFrame) -> dict:
+    """Compute every feature once and return aligned NumPy arrays for the whole history.
+
+    Keys: 'X' (RELATIVE_FEATURE_COLS, float32, NaN during warm-up), 'log_return'
+    (next-day, NaN on the last row) and the raw 'open'/'high'/'low'/'close'/'volume'.
+    Backtests slice these arrays per fold instead of recomputing the frame.
+    """
+    feats = add_features(df[['Open', 'High', 'Low', 'Close', 'Volume']].dropna().copy())
+    return {
+        'X': relative_features(feats).to_numpy(dtype=np.float32),
+        'log_return': log_return_target(feats).to_numpy(dtype=np.float64),
+        **{col.lower(): feats[col].to_numpy(dtype=np.float64)
+           for col in ('Open', 'High', 'Low', 'Close', 'Volume')},
+    }
+
+
+# Panel versions of the rolling indicators: (dates x tickers) arrays, computed
+# for every ticker at once along axis 0. Like pandas rolling, a window with any
+# NaN (e.g. before a ticker listed) gives NaN.
+
+def _window_valid(a: np.ndarray, window: int) -> np.ndarray:
+    valid = np.cumsum(~np.isnan(a), axis=0)
+    valid[window:] -= valid[:-window].copy()
+    ok = valid == window
+    ok[:window - 1] = False
+    return ok
+
+
+def rolling_mean(a: np.ndarray, window: int) -> np.ndarray:
+    """Rolling mean of each column via cumulative sums"""
+    total = np.cumsum(np.nan_to_num(a), axis=0)
+    total[window:] -= total[:-window].copy()
+    return np.where(_window_valid(a, window), total / window, np.nan)
+
+
+def rolling_std(a: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sample standard deviation of each column (ddof=1, as pandas)"""
+    out = np.full(a.shape, np.nan)
+    if len(a) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(a, window, axis=0)
+        out[window - 1:] = windows.std(axis=-1, ddof=1)
+    return out
+
+
+def panel_indicators(close: np.ndarray) -> dict:
+    """SMA_10, SMA_30 and Volatility (add_features columns) for a close panel"""
+    return {
+        'SMA_10': rolling_mean(close, 10),
+        'SMA_30': rolling_mean(close, 30),
+        'Volatility': rolling_std(close, 10),
+    }
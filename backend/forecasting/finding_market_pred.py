@@ -1,9 +1,12 @@
+import os
+import sys
 import yfinance as yf
-from statsmodels.tsa.arima.model import ARIMA
-from prophet import Prophet
-import matplotlib.pyplot as plt
 import pandas as pd
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forecasting.forecasters import get_forecaster
+
 def get_stock_data(ticker):
     ticker_obj = yf.Ticker(ticker)
     hist = ticker_obj.history(period="1y")  # last 1 year
@@ -12,28 +15,20 @@ def get_stock_data(ticker):
 
 def get_forecasting_prediction(ticker_df, forecast_days=7):
     results = {}
+    history = ticker_df.set_index("Date")
 
-    # Using ARIMA
-    series = ticker_df.set_index("Date")['Close']
-    model = ARIMA(series, order=(5,1,0))
-    model_fit = model.fit()
-    arima_forecast = model_fit.forecast(steps=forecast_days)
-    results['ARIMA'] = arima_forecast
-
-    # Using Prophet
-    prophet_df = ticker_df.rename(columns={'Date':'ds','Close':'y'})
-    prophet_df['ds'] = pd.to_datetime(prophet_df['ds']).dt.tz_localize(None)#stripping timezones cuz prophet doesn't like it
-    prophet_df = prophet_df.dropna(subset=['y'])#dropping any missing values
+    # Using ARIMA(5,1,0)
+    results['ARIMA'] = pd.Series(get_forecaster('arima').fit(history).predict(forecast_days))
 
-    model = Prophet(daily_seasonality=True)
-    model.fit(prophet_df)
-    future = model.make_future_dataframe(periods=forecast_days)
-    forecast = model.predict(future)
-    results['Prophet'] = forecast[['ds','yhat']].tail(forecast_days)
+    # Using Prophet (business-day steps, timezones are stripped inside the forecaster)
+    prophet = get_forecaster('prophet').fit(history)
+    future = prophet.model.make_future_dataframe(periods=forecast_days, freq='B', include_history=False)
+    results['Prophet'] = prophet.model.predict(future)[['ds', 'yhat']]
 
     return results
 
 def plot_forecast(df, arima_forecast=None, prophet_forecast=None,sarima_forecast=None):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12,6))
     plt.plot(df['Date'], df['Close'], label='Historical', color='blue')
 
@@ -57,12 +52,13 @@ def plot_forecast(df, arima_forecast=None, prophet_forecast=None,sarima_forecast
     plt.grid(True)
     plt.show()
 
-# Usage
-stock_data = get_stock_data('AAPL')
-stock_data.to_csv("data/example_data.csv")
+if __name__ == "__main__":
+    # Usage
+    stock_data = get_stock_data('AAPL')
+    stock_data.to_csv("data/example_data.csv")
 
-# forecasting_results = get_forecasting_prediction(stock_data, 30)
+    # forecasting_results = get_forecasting_prediction(stock_data, 30)
 
-# plot_forecast(stock_data, 
-#               arima_forecast=forecasting_results['ARIMA'], 
-#               prophet_forecast=forecasting_results['Prophet'])
+    # plot_forecast(stock_data, 
+    #               arima_forecast=forecasting_results['ARIMA'], 
+    #               prophet_forecast=forecasting_results['Prophet'])
@@ -0,0 +1,400 @@
+"""
+Pluggable forecasters behind one interface.
+
+Every model implements fit(history, warm_start=None) -> self, predict(horizon)
+-> array of closes and state() -> JSON-serializable params that the next
+daily refit can warm-start from. `FORECASTERS` maps the names accepted by the
+API (?model=...) to classes.
+
+statsmodels and prophet are imported lazily so the server starts without them;
+asking for 'arima' or 'prophet' without the package raises ImportError.
+
+`fit_predict_many` fits one model across many tickers in a process pool,
+warm-starting from and saving to a small JSON state file, and returns the
+per-ticker fit/predict timings alongside the forecasts. It also accepts
+'global', the cross-sectional GlobalForecaster trained once for the whole
+batch; that model needs the universe, so it has no per-ticker API entry.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .config import make_model, params_for
+from .global_model import GlobalForecaster
+from .multi_horizon import LONG_WINDOW, RollingState, recursive_forecast, training_set
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # goes up from forecasting to backend
+STATE_PATH = os.path.join(BASE_DIR, "db", "forecaster_state.json")
+TIMINGS_PATH = os.path.join(BASE_DIR, "db", "forecaster_timings.jsonl")
+_STATE_LOCK = threading.Lock()  # save_states runs on API worker threads
+
+
+class Forecaster:
+    """Base class: fit on an OHLCV history, predict the next `horizon` closes"""
+
+    name = 'base'
+    min_history = 2
+
+    def fit(self, history: pd.DataFrame, warm_start: dict | None = None) -> 'Forecaster':
+        raise NotImplementedError
+
+    def predict(self, horizon: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def state(self) -> dict:
+        """Fitted parameters to warm-start the next fit (empty if not applicable)"""
+        return {}
+
+
+class NaiveForecaster(Forecaster):
+    """Tomorrow looks like today: repeat the last close"""
+
+    name = 'naive'
+
+    def fit(self, history, warm_start=None):
+        self.last = float(history['Close'].iloc[-1])
+        return self
+
+    def predict(self, horizon):
+        return np.full(horizon, self.last)
+
+
+class DriftForecaster(Forecaster):
+    """Extend the average daily log return of the history"""
+
+    name = 'drift'
+
+    def fit(self, history, warm_start=None):
+        close = history['Close'].to_numpy(dtype=np.float64)
+        self.last = close[-1]
+        self.drift = np.log(close[-1] / close[0]) / max(len(close) - 1, 1)
+        return self
+
+    def predict(self, horizon):
+        return self.last * np.exp(self.drift * np.arange(1, horizon + 1))
+
+
+def fit_ar_batch(log_returns: np.ndarray, order: int = 5) -> np.ndarray:
+    """Least-squares AR(order) with intercept for many series at once.
+
+    log_returns: (n_series, T), NaN-padded where a series is shorter. Returns
+    (n_series, order + 1) coefficients [intercept, lag1, ..., lag_order] from
+    batched normal equations; rows touching a NaN are left out of the fit.
+    """
+    log_returns = np.atleast_2d(log_returns)
+    lags = np.lib.stride_tricks.sliding_window_view(log_returns, order, axis=1)[:, :-1, ::-1]
+    X = np.concatenate([np.ones(lags.shape[:2] + (1,)), lags], axis=2)
+    y = log_returns[:, order:]
+    valid = np.isfinite(y) & np.isfinite(lags).all(axis=2)
+    if not valid.all():
+        X = np.where(valid[..., None], X, 0.0)
+        y = np.where(valid, y, 0.0)
+    XtX = np.einsum('nti,ntj->nij', X, X) + 1e-8 * np.eye(order + 1)
+    Xty = np.einsum('nti,nt->ni', X, y)
+    return np.linalg.solve(XtX, Xty[..., None])[..., 0]
+
+
+def ar_forecast_batch(closes: np.ndarray, coefs: np.ndarray, horizon: int) -> np.ndarray:
+    """Roll fitted AR coefficients forward for every series; (n_series, horizon) closes"""
+    closes = np.atleast_2d(closes)
+    order = coefs.shape[1] - 1
+    recent = np.diff(np.log(closes[:, -(order + 1):]), axis=1)[:, ::-1]  # newest first
+    level = np.log(closes[:, -1])
+    path = np.empty((len(closes), horizon))
+    for step in range(horizon):
+        r = coefs[:, 0] + np.einsum('ni,ni->n', coefs[:, 1:], recent)
+        recent = np.concatenate([r[:, None], recent[:, :-1]], axis=1)
+        level = level + r
+        path[:, step] = np.exp(level)
+    return path
+
+
+class ARForecaster(Forecaster):
+    """Fast baseline: AR(order) on daily log returns fitted with NumPy least squares"""
+
+    name = 'ar'
+
+    def __init__(self, order: int = 5):
+        self.order = order
+        self.min_history = order + 10
+
+    def fit(self, history, warm_start=None):
+        self.close = history['Close'].to_numpy(dtype=np.float64)
+        self.coefs = fit_ar_batch(np.diff(np.log(self.close))[None, :], self.order)
+        return self
+
+    def predict(self, horizon):
+        return ar_forecast_batch(self.close[None, :], self.coefs, horizon)[0]
+
+    def state(self):
+        return {'coefs': self.coefs[0].tolist()}
+
+
+class XGBoostForecaster(Forecaster):
+    """The live recursive XGBoost forecaster (see multi_horizon)"""
+
+    name = 'xgboost'
+    min_history = LONG_WINDOW + 50
+
+    def __init__(self, ticker: str | None = None, sector: str | None = None, **params):
+        self.params = {**params_for(ticker, sector), **params}
+
+    def fit(self, history, warm_start=None):
+        X, y, _ = training_set(history)
+        self.model = make_model(**self.params)
+        self.model.fit(X, y, verbose=False)
+        self.history = history
+        return self
+
+    def predict(self, horizon):
+        state = RollingState.from_histories([self.history])
+        return recursive_forecast(self.model.predict, state, horizon)[0]
+
+
+class ARIMAForecaster(Forecaster):
+    """statsmodels ARIMA on closes; warm-starts from the previous fit's parameters"""
+
+    name = 'arima'
+    min_history = 30
+
+    def __init__(self, order=(5, 1, 0)):
+        self.order = tuple(order)
+
+    def fit(self, history, warm_start=None):
+        from statsmodels.tsa.arima.model import ARIMA
+
+        series = history['Close'].reset_index(drop=True)
+        model = ARIMA(series, order=self.order)
+        start_params = None
+        if warm_start and warm_start.get('order') == list(self.order):
+            start_params = np.asarray(warm_start['params'])
+        self.result = model.fit(start_params=start_params)
+        return self
+
+    def predict(self, horizon):
+        return np.asarray(self.result.forecast(steps=horizon), dtype=np.float64)
+
+    def state(self):
+        return {'order': list(self.order), 'params': np.asarray(self.result.params).tolist()}
+
+
+class ProphetForecaster(Forecaster):
+    """Prophet on closes; warm-starts Stan from the previous fit's parameters"""
+
+    name = 'prophet'
+    min_history = 30
+
+    def fit(self, history, warm_start=None):
+        from prophet import Prophet
+
+        df = pd.DataFrame({'ds': pd.DatetimeIndex(history.index), 'y': history['Close'].to_numpy()})
+        if df['ds'].dt.tz is not None:
+            df['ds'] = df['ds'].dt.tz_localize(None)  # prophet doesn't accept timezones
+        df = df.dropna(subset=['y'])
+
+        self.model = Prophet(daily_seasonality=True)
+        init = None
+        if warm_start:
+            # Prophet's documented warm start; delta only carries over if changepoints match
+            init = {k: (np.asarray(v) if isinstance(v, list) else v) for k, v in warm_start.items()}
+        self.model.fit(df, init=init) if init else self.model.fit(df)
+        return self
+
+    def predict(self, horizon):
+        future = self.model.make_future_dataframe(periods=horizon, freq='B', include_history=False)
+        return self.model.predict(future)['yhat'].to_numpy(dtype=np.float64)
+
+    def state(self):
+        params = self.model.params
+        out = {}
+        for name in ('k', 'm', 'sigma_obs'):
+            out[name] = float(params[name][0][0])
+        for name in ('delta', 'beta'):
+            out[name] = params[name][0].tolist()
+        return out
+
+
+FORECASTERS = {
+    'naive': NaiveForecaster,
+    'drift': DriftForecaster,
+    'ar': ARForecaster,
+    'xgboost': XGBoostForecaster,
+    'arima': ARIMAForecaster,
+    'prophet': ProphetForecaster,
+}
+
+
+def get_forecaster(name: str, **kwargs) -> Forecaster:
+    if name not in FORECASTERS:
+        raise ValueError(f"Unknown model '{name}'. Choose from {sorted(FORECASTERS)}")
+    return FORECASTERS[name](**kwargs)
+
+
+def load_states(path: str = STATE_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_states(states: dict, path: str = STATE_PATH):
+    """Merge `states` into the state file; the read-merge-write is serialized across threads"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with _STATE_LOCK:
+        merged = load_states(path)
+        for model_name, by_ticker in states.items():
+            merged.setdefault(model_name, {}).update(by_ticker)
+        # Unique temp file: another process writing the same path can't clobber it mid-write
+        with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as f:
+            json.dump(merged, f)
+        os.replace(f.name, path)
+
+
+def record_timings(rows: list, path: str = TIMINGS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+
+
+def fit_predict(name: str, ticker: str, history: pd.DataFrame, horizon: int,
+                warm_start: dict | None = None, **kwargs) -> dict:
+    """Fit one model on one ticker; returns forecast, new state and timings"""
+    if name == 'xgboost':
+        kwargs.setdefault('ticker', ticker)  # picks up the ticker's (or its sector's) tuned params
+    forecaster = get_forecaster(name, **kwargs)
+    if len(history) < forecaster.min_history:
+        raise ValueError(f"{name} needs at least {forecaster.min_history} rows, got {len(history)}")
+    started = time.perf_counter()
+    forecaster.fit(history, warm_start=warm_start)
+    fitted = time.perf_counter()
+    forecast = forecaster.predict(horizon)
+    done = time.perf_counter()
+    return {
+        'ticker': ticker, 'model': name, 'forecast': np.asarray(forecast, dtype=np.float64),
+        'state': forecaster.state(), 'warm_started': bool(warm_start),
+        'fit_seconds': fitted - started, 'predict_seconds': done - fitted,
+    }
+
+
+def _fit_predict_task(args):
+    name, ticker, history, horizon, warm_start = args
+    try:
+        return fit_predict(name, ticker, history, horizon, warm_start)
+    except Exception as e:
+        return {'ticker': ticker, 'model': name, 'error': str(e)}
+
+
+def fit_predict_many(name: str, histories: dict, horizon: int = 30, max_workers: int | None = None,
+                     warm_start: bool = True, persist: bool = True, sectors: dict | None = None) -> dict:
+    """Fit `name` for every ticker in parallel; {ticker: fit_predict result}
+
+    `sectors` ({ticker: sector}) is only used by the 'global' model.
+    """
+    states = load_states().get(name, {}) if warm_start else {}
+
+    if name == 'ar':
+        # The AR baseline is fitted for the whole batch at once instead of per process
+        return _fit_ar_universe(histories, horizon, persist)
+    if name == 'global':
+        return _fit_global_universe(histories, horizon, persist, sectors)
+
+    tasks = [(name, t, df, horizon, states.get(t)) for t, df in histories.items()]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        results = [_fit_predict_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_fit_predict_task, tasks))
+
+    by_ticker = {r['ticker']: r for r in results}
+    if persist:
+        ok = [r for r in results if 'error' not in r]
+        save_states({name: {r['ticker']: r['state'] for r in ok if r['state']}})
+        record_timings([{k: r[k] for k in ('ticker', 'model', 'fit_seconds', 'predict_seconds',
+                                           'warm_started')} | {'at': time.time()} for r in ok])
+    return by_ticker
+
+
+def _fit_ar_universe(histories: dict, horizon: int, persist: bool, order: int = 5) -> dict:
+    """Vectorized AR fit: every full history, left-padded with NaN to one length, in one solve"""
+    histories = {t: df for t, df in histories.items() if len(df) > order + 10}
+    if not histories:
+        return {}
+    length = max(len(df) for df in histories.values())
+    closes = np.full((len(histories), length), np.nan)
+    for i, df in enumerate(histories.values()):
+        # A recent IPO is masked out of the padding instead of truncating everyone else
+        closes[i, length - len(df):] = df['Close'].to_numpy(dtype=np.float64)
+    started = time.perf_counter()
+    coefs = fit_ar_batch(np.diff(np.log(closes), axis=1), order)
+    fitted = time.perf_counter()
+    paths = ar_forecast_batch(closes, coefs, horizon)
+    done = time.perf_counter()
+
+    n = len(histories)
+    results = {
+        t: {'ticker': t, 'model': 'ar', 'forecast': paths[i], 'state': {'coefs': coefs[i].tolist()},
+            'warm_started': False, 'fit_seconds': (fitted - started) / n,
+            'predict_seconds': (done - fitted) / n}
+        for i, t in enumerate(histories)
+    }
+    if persist:
+        record_timings([{k: r[k] for k in ('ticker', 'model', 'fit_seconds', 'predict_seconds',
+                                           'warm_started')} | {'at': time.time()} for r in results.values()])
+    return results
+
+
+def _fit_global_universe(histories: dict, horizon: int, persist: bool, sectors: dict | None = None) -> dict:
+    """One GlobalForecaster over the whole batch; every ticker is forecast by the same model"""
+    histories = {t: df for t, df in histories.items() if len(df) >= XGBoostForecaster.min_history}
+    if not histories:
+        return {}
+    started = time.perf_counter()
+    model = GlobalForecaster().fit(histories, sectors)
+    fitted = time.perf_counter()
+    frame = model.forecast(histories, horizon)
+    done = time.perf_counter()
+
+    n = len(histories)
+    paths = {t: g['Predicted_Close'].to_numpy(dtype=np.float64) for t, g in frame.groupby('ticker', sort=False)}
+    results = {
+        t: {'ticker': t, 'model': 'global', 'forecast': paths[t], 'state': {}, 'warm_started': False,
+            'fit_seconds': (fitted - started) / n, 'predict_seconds': (done - fitted) / n}
+        for t in histories
+    }
+    if persist:
+        record_timings([{k: r[k] for k in ('ticker', 'model', 'fit_seconds', 'predict_seconds',
+                                           'warm_started')} | {'at': time.time()} for r in results.values()])
+    return results
+
+
+if __name__ == "__main__":
+    # Benchmark: per-ticker fit+predict time for every available model
+    import argparse
+
+    from .synthetic import synthetic_universe
+
+    parser = argparse.ArgumentParser(description="Forecaster timing benchmark")
+    parser.add_argument('--tickers', type=int, default=20)
+    parser.add_argument('--models', nargs='*', default=sorted([*FORECASTERS, 'global']))
+    args = parser.parse_args()
+
+    histories = synthetic_universe(args.tickers, 252)
+    for name in args.models:
+        started = time.perf_counter()
+        results = fit_predict_many(name, histories, horizon=30, persist=False)
+        elapsed = time.perf_counter() - started
+        errors = [r['error'] for r in results.values() if 'error' in r]
+        if errors:
+            print(f"{name:<8} skipped: {errors[0]}")
+            continue
+        fit_ms = np.mean([r['fit_seconds'] for r in results.values()]) * 1000
+        print(f"{name:<8} {fit_ms:9.2f} ms/ticker fit | {elapsed:6.2f}s total for {len(results)} tickers")
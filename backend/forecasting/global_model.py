@@ -0,0 +1,139 @@
+"""
+Cross-sectional global forecaster.
+
+Instead of one 400-tree model per ticker trained on ~250 rows, the scale-free
+features of the whole universe are stacked into one float32 matrix with the
+ticker and sector as categorical columns, and a single XGBoost model (hist
+tree method, all CPU threads) learns the next-day log return for everyone.
+Prediction for the whole universe is one call per forecast day.
+
+Batch jobs use it through forecasters.fit_predict_many('global', ...); the
+per-ticker API models (forecasters.FORECASTERS) don't include it, since a
+fit needs the whole universe rather than one ticker's history.
+
+Run from the backend directory to compare against the per-ticker path:
+    python -m forecasting.global_model --tickers 200
+"""
+import numpy as np
+import pandas as pd
+
+from .config import make_model, params_for
+from .features import RELATIVE_FEATURE_COLS
+from .multi_horizon import LONG_WINDOW, RollingState, future_dates, recursive_forecast, training_set
+
+CATEGORICAL_COLS = ['ticker', 'sector']
+GLOBAL_PARAMS = {'tree_method': 'hist', 'n_jobs': -1, 'enable_categorical': True,
+                 'max_cat_to_onehot': 1}
+
+
+class GlobalForecaster:
+    """One XGBoost model over every ticker's stacked features"""
+
+    def __init__(self, **params):
+        self.params = {**params_for(), **GLOBAL_PARAMS, **params,
+                       'feature_types': ['q'] * len(RELATIVE_FEATURE_COLS) + ['c'] * len(CATEGORICAL_COLS)}
+        self.model = None
+        self.ticker_codes = {}
+        self.sector_codes = {}
+        self.sectors = {}
+
+    def _codes(self, tickers, sectors: dict) -> np.ndarray:
+        """(n, 2) float32 ticker/sector category codes; NaN for anything unseen in training"""
+        ticker = [self.ticker_codes.get(t, np.nan) for t in tickers]
+        sector = [self.sector_codes.get(sectors.get(t), np.nan) for t in tickers]
+        return np.column_stack([ticker, sector]).astype(np.float32)
+
+    def stack(self, histories: dict, sectors: dict) -> tuple[np.ndarray, np.ndarray]:
+        """Universe training matrix (float32) and next-day log-return target"""
+        parts = []
+        for ticker, df in histories.items():
+            X, y, _ = training_set(df)
+            codes = np.broadcast_to(self._codes([ticker], sectors), (len(X), len(CATEGORICAL_COLS)))
+            parts.append((np.hstack([X, codes]), y))
+        return (np.concatenate([p[0] for p in parts]).astype(np.float32),
+                np.concatenate([p[1] for p in parts]))
+
+    def fit(self, histories: dict, sectors: dict | None = None) -> 'GlobalForecaster':
+        sectors = sectors or {}
+        self.sectors = sectors
+        self.ticker_codes = {t: i for i, t in enumerate(histories)}
+        self.sector_codes = {s: i for i, s in enumerate(sorted(set(sectors.values())))}
+        X, y = self.stack(histories, sectors)
+        self.model = make_model(**self.params)
+        self.model.fit(X, y, verbose=False)
+        return self
+
+    def predict_returns(self, features: np.ndarray, tickers) -> np.ndarray:
+        """Next-day log returns for one feature row per ticker, in a single predict call"""
+        X = np.hstack([features, self._codes(tickers, self.sectors)])
+        return self.model.predict(X)
+
+    def forecast(self, histories: dict, horizon: int = 30) -> pd.DataFrame:
+        """Recursive forecast for every ticker; long frame of ticker, Date, Predicted_Close"""
+        histories = {t: df for t, df in histories.items() if len(df) > LONG_WINDOW}
+        tickers = list(histories)
+        state = RollingState.from_histories(histories.values())
+        path = recursive_forecast(lambda F: self.predict_returns(F, tickers), state, horizon)
+        return pd.concat([
+            pd.DataFrame({'ticker': t, 'Date': future_dates(histories[t].index[-1], horizon),
+                          'Predicted_Close': path[i]})
+            for i, t in enumerate(tickers)
+        ], ignore_index=True)
+
+
+def _holdout_scores(pred_returns, y, close) -> dict:
+    pred = close * np.exp(pred_returns)
+    actual = close * np.exp(y)
+    return {
+        'rmse': float(np.sqrt(np.mean((pred - actual) ** 2))),
+        'mape': float(np.mean(np.abs(pred - actual) / actual) * 100),
+        'hit_rate': float(np.mean(np.sign(pred_returns) == np.sign(y))),
+    }
+
+
+def compare(histories: dict, sectors: dict | None = None, holdout: float = 0.2) -> pd.DataFrame:
+    """Train time and next-day holdout accuracy: per-ticker models vs one global model"""
+    import time
+
+    sectors = sectors or {}
+    splits = {}
+    for ticker, df in histories.items():
+        n_test = int(len(df) * holdout)
+        splits[ticker] = (df.iloc[:-n_test], df.iloc[-n_test - LONG_WINDOW:])
+
+    # Per-ticker path: one model per ticker, as get_next_30_day_predictions trains them
+    started = time.perf_counter()
+    per_ticker = {t: make_model(**params_for(t, sectors.get(t))).fit(*training_set(train)[:2], verbose=False)
+                  for t, (train, _) in splits.items()}
+    per_ticker_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    global_model = GlobalForecaster().fit({t: train for t, (train, _) in splits.items()}, sectors)
+    global_seconds = time.perf_counter() - started
+
+    tests = {t: training_set(test) for t, (_, test) in splits.items()}
+    y = np.concatenate([tests[t][1] for t in tests])
+    close = np.concatenate([tests[t][2] for t in tests])
+    local_pred = np.concatenate([per_ticker[t].predict(tests[t][0]) for t in tests])
+    tickers = [t for t in tests for _ in range(len(tests[t][0]))]
+    global_pred = global_model.predict_returns(np.concatenate([tests[t][0] for t in tests]), tickers)
+
+    return pd.DataFrame([
+        {'model': 'per-ticker', 'train_seconds': per_ticker_seconds, **_holdout_scores(local_pred, y, close)},
+        {'model': 'global', 'train_seconds': global_seconds, **_holdout_scores(global_pred, y, close)},
+    ]).set_index('model')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .synthetic import synthetic_universe
+
+    parser = argparse.ArgumentParser(description="Global vs per-ticker forecaster benchmark")
+    parser.add_argument('--tickers', type=int, default=200)
+    parser.add_argument('--days', type=int, default=252)
+    args = parser.parse_args()
+
+    histories = synthetic_universe(args.tickers, args.days)
+    sectors = {t: f"Sector{i % 11}" for i, t in enumerate(histories)}
+    print(compare(histories, sectors).round(4))
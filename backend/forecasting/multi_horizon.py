@@ -0,0 +1,190 @@
+"""
+Recursive multi-horizon forecasting.
+
+A model trained on scale-free features (features.RELATIVE_FEATURE_COLS) to
+predict the next day's log return is rolled forward one day at a time.
+`RollingState` keeps the last 30 closes and 10 volumes of every ticker in ring
+buffers with running sums, so each step updates SMA_10, SMA_30, Volatility
+and Volume_MA in O(1) per ticker instead of recomputing rolling windows over
+the full frame. All tickers advance together, so a 30-day universe rollout is
+30 vectorized predict calls.
+
+Future bars only have a predicted close: each step assumes Open = previous
+close, High/Low = the range of Open and Close, and Volume = its moving average.
+"""
+import numpy as np
+import pandas as pd
+
+from .config import make_model
+from .features import add_features, log_return_target, relative_features
+
+LONG_WINDOW = 30
+SHORT_WINDOW = 10
+
+
+class RollingState:
+    """Incrementally maintained rolling features for many tickers at once"""
+
+    def __init__(self, closes: np.ndarray, volumes: np.ndarray,
+                 opens: np.ndarray, highs: np.ndarray, lows: np.ndarray):
+        # closes: (n, 30) oldest -> newest; volumes: (n, 10); opens/highs/lows: (n,) latest bar
+        self._closes = np.array(closes, dtype=np.float64)
+        self._volumes = np.array(volumes, dtype=np.float64)
+        self._pos = 0  # ring index of the oldest close (and oldest volume)
+        self._vpos = 0
+        self.open = np.asarray(opens, dtype=np.float64).copy()
+        self.high = np.asarray(highs, dtype=np.float64).copy()
+        self.low = np.asarray(lows, dtype=np.float64).copy()
+
+        short = self._closes[:, -SHORT_WINDOW:]
+        self._sum30 = self._closes.sum(axis=1)
+        self._sum10 = short.sum(axis=1)
+        self._sumsq10 = (short ** 2).sum(axis=1)
+        self._vsum10 = self._volumes.sum(axis=1)
+
+    @classmethod
+    def from_histories(cls, histories) -> 'RollingState':
+        """Seed from OHLCV frames (each needs at least 30 rows)"""
+        histories = list(histories)
+        closes = np.stack([df['Close'].to_numpy()[-LONG_WINDOW:] for df in histories])
+        volumes = np.stack([df['Volume'].to_numpy()[-SHORT_WINDOW:] for df in histories])
+        last = [df.iloc[-1] for df in histories]
+        return cls(closes, volumes,
+                   [r['Open'] for r in last], [r['High'] for r in last], [r['Low'] for r in last])
+
+    @classmethod
+    def at_origins(cls, arrays: dict, origins) -> 'RollingState':
+        """One state row per origin index t of a features.feature_arrays() history (t >= 29)"""
+        origins = np.asarray(origins)
+        closes = arrays['close'][origins[:, None] + np.arange(1 - LONG_WINDOW, 1)]
+        volumes = arrays['volume'][origins[:, None] + np.arange(1 - SHORT_WINDOW, 1)]
+        return cls(closes, volumes, arrays['open'][origins],
+                   arrays['high'][origins], arrays['low'][origins])
+
+    def __len__(self):
+        return len(self._closes)
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._closes[:, (self._pos - 1) % LONG_WINDOW]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self._volumes[:, (self._vpos - 1) % SHORT_WINDOW]
+
+    @property
+    def volume_ma(self) -> np.ndarray:
+        return self._vsum10 / SHORT_WINDOW
+
+    def features(self) -> np.ndarray:
+        """(n, len(RELATIVE_FEATURE_COLS)) float32 matrix for the latest bar"""
+        close = self.close
+        sma10 = self._sum10 / SHORT_WINDOW
+        sma30 = self._sum30 / LONG_WINDOW
+        var10 = np.maximum(self._sumsq10 - self._sum10 ** 2 / SHORT_WINDOW, 0) / (SHORT_WINDOW - 1)
+        return np.column_stack([
+            self.open / close - 1,
+            self.high / close - 1,
+            self.low / close - 1,
+            sma10 / close - 1,
+            sma30 / close - 1,
+            np.sqrt(var10) / close,
+            np.log((self.volume + 1) / (self.volume_ma + 1)),
+        ]).astype(np.float32)
+
+    def push(self, close: np.ndarray, volume: np.ndarray | None = None):
+        """Append one synthetic bar per ticker and update the running sums"""
+        prev_close = self.close
+        volume = self.volume_ma if volume is None else volume
+
+        oldest = self._closes[:, self._pos]
+        leaving10 = self._closes[:, (self._pos + LONG_WINDOW - SHORT_WINDOW) % LONG_WINDOW]
+        self._sum30 += close - oldest
+        self._sum10 += close - leaving10
+        self._sumsq10 += close ** 2 - leaving10 ** 2
+        self._closes[:, self._pos] = close
+        self._pos = (self._pos + 1) % LONG_WINDOW
+
+        self._vsum10 += volume - self._volumes[:, self._vpos]
+        self._volumes[:, self._vpos] = volume
+        self._vpos = (self._vpos + 1) % SHORT_WINDOW
+
+        self.open = prev_close
+        self.high = np.maximum(prev_close, close)
+        self.low = np.minimum(prev_close, close)
+
+
+def training_set(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(X float32, next-day log return, close) rows for one OHLCV history"""
+    feats = add_features(df[['Open', 'High', 'Low', 'Close', 'Volume']].copy())
+    X = relative_features(feats)
+    y = log_return_target(feats)
+    valid = X.notna().all(axis=1) & y.notna()
+    return (X[valid].to_numpy(dtype=np.float32), y[valid].to_numpy(dtype=np.float64),
+            feats['Close'][valid].to_numpy(dtype=np.float64))
+
+
+def fit_return_model(histories, **params):
+    """Fit one next-day log-return model on the stacked rows of every history"""
+    parts = [training_set(df) for df in histories]
+    X = np.concatenate([p[0] for p in parts])
+    y = np.concatenate([p[1] for p in parts])
+    model = make_model(**params)
+    model.fit(X, y, verbose=False)
+    return model
+
+
+def recursive_forecast(predict, state: RollingState, horizon: int) -> np.ndarray:
+    """Roll `predict` (features -> log return) forward; returns (n_tickers, horizon) closes"""
+    path = np.empty((len(state), horizon))
+    for step in range(horizon):
+        next_close = state.close * np.exp(predict(state.features()))
+        state.push(next_close)
+        path[:, step] = next_close
+    return path
+
+
+def future_dates(last_date, horizon: int) -> pd.DatetimeIndex:
+    """The next `horizon` business days after last_date"""
+    return pd.bdate_range(pd.Timestamp(last_date) + pd.offsets.BDay(1), periods=horizon)
+
+
+def forecast_universe(histories: dict, horizon: int = 30, model=None, **params) -> pd.DataFrame:
+    """Train (unless given) one shared model and forecast every ticker `horizon` days ahead.
+
+    Returns a long frame with columns ticker, Date, Predicted_Close.
+    """
+    histories = {t: df for t, df in histories.items() if len(df) > LONG_WINDOW}
+    if not histories:
+        return pd.DataFrame(columns=['ticker', 'Date', 'Predicted_Close'])
+    if model is None:
+        model = fit_return_model(histories.values(), **params)
+
+    state = RollingState.from_histories(histories.values())
+    path = recursive_forecast(model.predict, state, horizon)
+
+    frames = []
+    for i, (ticker, df) in enumerate(histories.items()):
+        dates = future_dates(df.index[-1], horizon)
+        frames.append(pd.DataFrame({'ticker': ticker, 'Date': dates, 'Predicted_Close': path[i]}))
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    # Benchmark: universe-wide 30-day rollout from one shared model
+    import time
+
+    from .synthetic import synthetic_universe
+
+    histories = synthetic_universe(500, 252)
+    started = time.perf_counter()
+    model = fit_return_model(histories.values(), n_jobs=-1)
+    trained = time.perf_counter()
+
+    calls = []
+    state = RollingState.from_histories(histories.values())
+    path = recursive_forecast(lambda X: calls.append(len(X)) or model.predict(X), state, 30)
+    done = time.perf_counter()
+
+    print(f"train: {trained - started:.2f}s | rollout: {(done - trained) * 1000:.1f} ms "
+          f"for {path.shape[0]} tickers x {path.shape[1]} days in {len(calls)} predict calls")
@@ -0,0 +1,159 @@
+"""
+Local daily price history store.
+
+One compressed .npz file per ticker under backend/db/prices holding dates and
+OHLCV columns. Histories are fetched from yfinance once and then only topped
+up with the bars added since the last stored date, so backtests, portfolio
+risk and screeners read from disk instead of re-downloading. Each file also
+records how far back a full-period download has reached (`checked_from`), so
+a ticker listed after the period start is back-filled once, not on every call.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # goes up from forecasting to backend
+DEFAULT_ROOT = os.path.join(BASE_DIR, "db", "prices")
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _period_start(period: str) -> pd.Timestamp:
+    today = pd.Timestamp.today().normalize()
+    if period == 'max':
+        return pd.Timestamp('1970-01-01')
+    if period.endswith('mo'):
+        return today - pd.DateOffset(months=int(period[:-2]))
+    if period.endswith('y'):
+        return today - pd.DateOffset(years=int(period[:-1]))
+    if period.endswith('d'):
+        return today - pd.Timedelta(days=int(period[:-1]))
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def _empty_bars() -> pd.DataFrame:
+    return pd.DataFrame({col: pd.Series(dtype=np.float64) for col in OHLCV},
+                        index=pd.DatetimeIndex([], name='Date'))
+
+
+def _daily_bars(bars: pd.DataFrame) -> pd.DataFrame:
+    """OHLCV columns indexed by naive, normalized dates (yfinance returns tz-aware)"""
+    bars = bars[OHLCV].copy()
+    index = pd.DatetimeIndex(bars.index)
+    bars.index = (index.tz_localize(None) if index.tz is not None else index).normalize()
+    bars.index.name = 'Date'
+    return bars
+
+
+class PriceStore:
+    """Disk-backed daily OHLCV histories keyed by ticker"""
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+        self._lock = threading.Lock()
+        self._listeners = []
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker.upper()}.npz")
+
+    def tickers(self) -> list:
+        return sorted(f[:-4] for f in os.listdir(self.root) if f.endswith('.npz'))
+
+    def load(self, ticker: str) -> pd.DataFrame | None:
+        """Stored history (naive DatetimeIndex, OHLCV columns) or None"""
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            index = pd.DatetimeIndex(data['dates'].astype('datetime64[ns]'), name='Date')
+            return pd.DataFrame({col: data[col] for col in OHLCV}, index=index)
+
+    def checked_from(self, ticker: str) -> pd.Timestamp | None:
+        """Earliest period start a full download has covered (history before it doesn't exist)"""
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return pd.Timestamp(int(data['checked_from'])) if 'checked_from' in data.files else None
+
+    def save(self, ticker: str, df: pd.DataFrame, checked_from=None):
+        df = _daily_bars(df)
+        dates = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        if checked_from is None:
+            checked_from = self.checked_from(ticker)  # keep the marker across appends
+        marker = {} if checked_from is None else {'checked_from': np.int64(pd.Timestamp(checked_from).value)}
+        tmp = self.path(ticker) + '.tmp.npz'
+        np.savez_compressed(tmp, dates=dates, **marker,
+                            **{col: df[col].to_numpy(dtype=np.float64) for col in OHLCV})
+        os.replace(tmp, self.path(ticker))
+
+    def subscribe(self, listener):
+        """listener(ticker, new_bars_df) is called whenever new bars are appended"""
+        self._listeners.append(listener)
+
+    def append(self, ticker: str, bars: pd.DataFrame, checked_from=None) -> pd.DataFrame:
+        """Append bars newer than the last stored date (the daily bar ingest path)"""
+        with self._lock:
+            existing = self.load(ticker)
+            if bars is None or bars.empty:
+                return existing if existing is not None else _empty_bars()
+            bars = _daily_bars(bars)
+            if existing is not None and not existing.empty:
+                bars = bars[bars.index > existing.index[-1]]
+                combined = pd.concat([existing, bars])
+            else:
+                combined = bars
+            if not bars.empty:
+                self.save(ticker, combined, checked_from)
+        if not bars.empty:
+            for listener in self._listeners:
+                listener(ticker.upper(), bars)
+        return combined
+
+    def _fetch(self, ticker: str, start=None, period: str = '5y') -> pd.DataFrame:
+        import yfinance as yf
+        if start is not None:
+            return yf.Ticker(ticker).history(start=start, interval='1d')
+        return yf.Ticker(ticker).history(period=period, interval='1d')
+
+    def history(self, ticker: str, period: str = '5y', refresh: bool = True) -> pd.DataFrame:
+        """History covering `period`, downloading only what the store is missing"""
+        df = self.load(ticker)
+        start = _period_start(period)
+        if df is None or df.empty:
+            df = self.append(ticker, self._fetch(ticker, period=period), checked_from=start)
+        elif df.index[0] > start + timedelta(days=7) and (self.checked_from(ticker) or df.index[0]) > start:
+            # Stored history does not reach back far enough and was never downloaded
+            # from this far back: backfill the whole period once
+            df = self._merge_full(ticker, self._fetch(ticker, period=period), checked_from=start)
+        elif refresh and df.index[-1] < pd.Timestamp(datetime.today().date()) - pd.offsets.BDay(1):
+            df = self.append(ticker, self._fetch(ticker, start=df.index[-1] + timedelta(days=1)))
+        return df[df.index >= start]
+
+    def _merge_full(self, ticker: str, fetched: pd.DataFrame, checked_from=None) -> pd.DataFrame:
+        with self._lock:
+            existing = self.load(ticker)
+            if fetched is None or fetched.empty:
+                return existing if existing is not None else _empty_bars()
+            fetched = _daily_bars(fetched)
+            combined = pd.concat([existing, fetched]) if existing is not None else fetched
+            combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+            self.save(ticker, combined, checked_from)
+        return combined
+
+    def panel(self, tickers, field: str = 'Close', start=None) -> pd.DataFrame:
+        """dates x tickers frame of one field from stored histories (no downloads)"""
+        columns = {}
+        for ticker in tickers:
+            df = self.load(ticker)
+            if df is not None:
+                columns[ticker.upper()] = df[field]
+        if not columns:
+            return pd.DataFrame(index=pd.DatetimeIndex([]))
+        panel = pd.DataFrame(columns).sort_index()
+        if start is not None:
+            panel = panel[panel.index >= pd.Timestamp(start)]
+        return panel
@@ -0,0 +1,342 @@
+"""
+Stock screener over a columnar table of the latest indicators.
+
+`Screener` keeps one NumPy array per column (indicators from features.py,
+RSI, returns, 52-week range and a few fundamentals) with one row per symbol,
+like MoversTable. A filter such as
+
+    RSI < 30 and Close > SMA_30 and sector == 'Technology'
+
+is parsed with `ast` into a small whitelisted expression tree and evaluated
+as vectorized boolean masks over whole columns; anything that is not a
+column, literal, comparison, arithmetic or and/or/not is rejected, so user
+input is never passed to eval.
+
+Rows are computed for the whole universe at once from a close/volume panel
+and recomputed one ticker at a time when PriceStore ingests new bars.
+
+Run from the backend directory for the 10k-symbol benchmark:
+    python -m forecasting.screener --symbols 10000
+"""
+import ast
+import operator
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .features import rolling_mean, rolling_std
+
+RSI_PERIOD = 14
+LOOKBACK_DAYS = 260  # enough bars for the 52-week range and every rolling window
+INDICATOR_COLS = ['Close', 'Volume', 'SMA_10', 'SMA_30', 'Volatility', 'Volume_MA',
+                  'RSI', 'Change_pct', 'Return_1m', 'High_52w', 'Low_52w']
+FUNDAMENTAL_COLS = {'sector': object, 'marketCap': np.float64, 'pe': np.float64}
+
+
+class ScreenerError(ValueError):
+    """Invalid filter expression or sort column"""
+
+
+def panel_rsi(close: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Wilder's RSI for every column of a (dates x tickers) close panel"""
+    delta = pd.DataFrame(np.diff(close, axis=0, prepend=np.nan))
+    gain = delta.clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + gain.to_numpy() / loss.to_numpy())
+    return np.where(loss.to_numpy() == 0, 100.0, rsi)
+
+
+def latest_indicators(close: np.ndarray, volume: np.ndarray) -> dict:
+    """INDICATOR_COLS on the last row of (dates x tickers) close/volume panels"""
+    close = pd.DataFrame(close).ffill().to_numpy()  # stale tickers keep their last price
+    volume = np.nan_to_num(volume)
+
+    def back(n):
+        return close[-n - 1] if len(close) > n else np.full(close.shape[1], np.nan)
+
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        # Tickers without any bars give all-NaN columns and NaN indicators
+        warnings.simplefilter('ignore', RuntimeWarning)
+        change = (close[-1] / back(1) - 1) * 100
+        month = (close[-1] / back(21) - 1) * 100
+        high = np.nanmax(close[-252:], axis=0)
+        low = np.nanmin(close[-252:], axis=0)
+    return {
+        'Close': close[-1],
+        'Volume': volume[-1],
+        'SMA_10': rolling_mean(close[-10:], 10)[-1],
+        'SMA_30': rolling_mean(close[-30:], 30)[-1],
+        'Volatility': rolling_std(close[-10:], 10)[-1],
+        'Volume_MA': rolling_mean(volume[-10:], 10)[-1],
+        'RSI': panel_rsi(close)[-1],
+        'Change_pct': change,
+        'Return_1m': month,
+        'High_52w': high,
+        'Low_52w': low,
+    }
+
+
+# --- Filter expressions ------------------------------------------------------
+
+_COMPARE = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+            ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne}
+_ARITH = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+          ast.Div: operator.truediv}
+
+
+def parse_filter(expression: str) -> ast.AST:
+    """Parse and validate a filter; raises ScreenerError on anything outside the grammar"""
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise ScreenerError(f"Invalid filter: {e.msg}") from None
+    except (RecursionError, MemoryError):
+        raise ScreenerError("Invalid filter: too deeply nested") from None
+    allowed = (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+               ast.Compare, ast.BinOp, ast.Name, ast.Load, ast.Constant, ast.List, ast.Tuple,
+               ast.In, ast.NotIn, *_COMPARE, *_ARITH)
+    for node in ast.walk(tree):
+        if not isinstance(node, allowed):
+            raise ScreenerError(f"Unsupported syntax in filter: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, str)):
+            raise ScreenerError(f"Unsupported literal in filter: {node.value!r}")
+    return tree
+
+
+def _numeric(value) -> bool:
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind in 'biuf'
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _arithmetic_operand(node, columns: dict, n: int):
+    value = _evaluate(node, columns, n)
+    if not _numeric(value):
+        raise ScreenerError("Arithmetic needs numeric columns or numbers")
+    return value
+
+
+def _evaluate(node, columns: dict, n: int):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, columns, n)
+    if isinstance(node, ast.Name):
+        key = node.id.lower()
+        if key not in columns:
+            raise ScreenerError(f"Unknown column '{node.id}'")
+        return columns[key]
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_evaluate(e, columns, n) for e in node.elts]
+    if isinstance(node, ast.BoolOp):
+        masks = [np.asarray(_evaluate(v, columns, n), dtype=bool) for v in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        return combine.reduce(masks)
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.Not):
+            return ~np.asarray(_evaluate(node.operand, columns, n), dtype=bool)
+        return -_arithmetic_operand(node.operand, columns, n)
+    if isinstance(node, ast.BinOp):
+        # Numbers only: no string repetition/concatenation ('ab' * 10**9)
+        left = _arithmetic_operand(node.left, columns, n)
+        right = _arithmetic_operand(node.right, columns, n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return _ARITH[type(node.op)](left, right)
+    if isinstance(node, ast.Compare):
+        # Chained comparisons (10 < RSI < 30) are and-ed pairwise, like Python
+        mask = np.ones(n, dtype=bool)
+        left = _evaluate(node.left, columns, n)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _evaluate(comparator, columns, n)
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if not isinstance(right, list):
+                    raise ScreenerError("'in' needs a list, e.g. sector in ['Technology', 'Energy']")
+                result = np.isin(left, right)
+                result = ~result if isinstance(op, ast.NotIn) else result
+            else:
+                with np.errstate(invalid='ignore'):
+                    result = _COMPARE[type(op)](left, right)  # NaN compares False
+            mask &= np.asarray(result, dtype=bool)
+            left = right
+        return mask
+    raise ScreenerError(f"Unsupported syntax in filter: {type(node).__name__}")
+
+
+# --- Table ---------------------------------------------------------------------
+
+class Screener:
+    """Columnar latest-indicator table answering filter/sort/limit queries"""
+
+    def __init__(self, store=None, capacity: int = 256):
+        self.store = store
+        self._lock = threading.Lock()
+        self._index = {}
+        self._symbols = []
+        self._columns = {c: np.full(capacity, np.nan) for c in INDICATOR_COLS}
+        for name, dtype in FUNDAMENTAL_COLS.items():
+            self._columns[name] = np.full(capacity, None if dtype is object else np.nan, dtype=dtype)
+        self.updated_at = None
+
+    def __len__(self):
+        return len(self._symbols)
+
+    @property
+    def columns(self) -> list:
+        return ['symbol', *self._columns]
+
+    def _slot(self, symbol: str) -> int:
+        """Row for symbol, appending (and growing the columns) if it is new"""
+        i = self._index.get(symbol)
+        if i is not None:
+            return i
+        i = len(self._symbols)
+        capacity = len(self._columns['Close'])
+        if i == capacity:
+            for name, column in self._columns.items():
+                fill = None if column.dtype == object else np.nan
+                self._columns[name] = np.concatenate((column, np.full(capacity, fill, dtype=column.dtype)))
+        self._index[symbol] = i
+        self._symbols.append(symbol)
+        return i
+
+    def _rows(self, symbols) -> np.ndarray:
+        return np.fromiter((self._slot(s.upper()) for s in symbols), dtype=np.int64, count=len(symbols))
+
+    def update_indicators(self, symbols, close: np.ndarray, volume: np.ndarray):
+        """Recompute indicator rows for `symbols` from (dates x symbols) close/volume panels"""
+        values = latest_indicators(close, volume)
+        with self._lock:
+            rows = self._rows(list(symbols))
+            for name, column in values.items():
+                self._columns[name][rows] = column
+            self.updated_at = pd.Timestamp.now()
+
+    def build(self, histories: dict):
+        """Fill the table for {ticker: OHLCV frame} in one panel pass"""
+        tails = {t: df.iloc[-LOOKBACK_DAYS:] for t, df in histories.items() if not df.empty}
+        if not tails:
+            return
+        first = next(iter(tails.values())).index
+        if all(df.index.equals(first) for df in tails.values()):
+            # Common case (one market calendar): stack columns without index alignment
+            close = np.column_stack([df['Close'].to_numpy(dtype=np.float64) for df in tails.values()])
+            volume = np.column_stack([df['Volume'].to_numpy(dtype=np.float64) for df in tails.values()])
+        else:
+            closes = pd.concat({t: df['Close'] for t, df in tails.items()}, axis=1).sort_index()
+            volumes = pd.concat({t: df['Volume'] for t, df in tails.items()}, axis=1).reindex(closes.index)
+            close = closes.iloc[-LOOKBACK_DAYS:].to_numpy(dtype=np.float64)
+            volume = volumes.iloc[-LOOKBACK_DAYS:].to_numpy(dtype=np.float64)
+        self.update_indicators(list(tails), close, volume)
+
+    def set_fundamentals(self, symbol: str, **values):
+        """Set sector / marketCap / pe for one symbol (missing keys are left as they are)"""
+        with self._lock:
+            i = self._slot(symbol.upper())
+            for name, value in values.items():
+                if name in FUNDAMENTAL_COLS and value is not None:
+                    self._columns[name][i] = value
+
+    def on_bars(self, ticker: str, bars: pd.DataFrame):
+        """PriceStore listener: recompute this ticker's row from its stored history"""
+        if self.store is None:
+            return
+        history = self.store.load(ticker)
+        if history is None or history.empty:
+            return
+        history = history.iloc[-LOOKBACK_DAYS:]
+        self.update_indicators([ticker], history[['Close']].to_numpy(dtype=np.float64),
+                               history[['Volume']].to_numpy(dtype=np.float64))
+
+    def query(self, expression: str | None = None, sort: str | None = None, descending: bool = True,
+              limit: int = 50, fields=None) -> dict:
+        """Rows matching `expression`, sorted by `sort` (NaN last), at most `limit`"""
+        limit = max(0, limit)  # a negative slice would return everything but the tail
+        tree = parse_filter(expression) if expression else None
+        with self._lock:
+            n = len(self._symbols)
+            columns = {name.lower(): column[:n] for name, column in self._columns.items()}
+            columns['symbol'] = np.array(self._symbols, dtype=object)
+            names = {name.lower(): name for name in self.columns}
+
+            try:
+                mask = np.ones(n, dtype=bool) if tree is None else _evaluate(tree, columns, n)
+            except ScreenerError:
+                raise
+            except (TypeError, ValueError, ArithmeticError) as e:
+                # e.g. sector > 1: comparing a text column with a number
+                raise ScreenerError(f"Invalid filter: {e}") from None
+            except RecursionError:
+                raise ScreenerError("Invalid filter: too deeply nested") from None
+            if not isinstance(mask, np.ndarray) or mask.dtype != bool or mask.shape != (n,):
+                raise ScreenerError("Filter must be a condition on columns, e.g. RSI < 30")
+            matches = np.flatnonzero(mask)
+
+            if sort:
+                key = sort.lower()
+                if key not in columns or columns[key].dtype == object:
+                    raise ScreenerError(f"Cannot sort by '{sort}'")
+                values = columns[key][matches]
+                score = np.where(np.isnan(values), -np.inf, values if descending else -values)
+                k = min(limit, len(matches))
+                if 0 < k < len(matches):
+                    top = np.argpartition(-score, k - 1)[:k]
+                else:
+                    top = np.arange(len(matches))
+                matches = matches[top[np.argsort(-score[top], kind='stable')]]
+            matches = matches[:limit]
+
+            fields = [names[f.lower()] for f in fields if f.lower() in names] if fields else self.columns
+            out = {}
+            for name in fields:
+                values = columns[name.lower()][matches]
+                if values.dtype == object:
+                    out[name] = values.tolist()
+                else:
+                    rounded = np.round(values, 4)
+                    out[name] = [None if np.isnan(v) else v for v in rounded.tolist()]
+        rows = [{name: out[name][j] for name in fields} for j in range(len(matches))]
+        return {'total': int(mask.sum()), 'results': rows}
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from .synthetic import synthetic_universe
+
+    parser = argparse.ArgumentParser(description="Screener benchmark")
+    parser.add_argument('--symbols', type=int, default=10_000)
+    parser.add_argument('--days', type=int, default=LOOKBACK_DAYS)
+    args = parser.parse_args()
+
+    histories = synthetic_universe(args.symbols, args.days)
+    sectors = ['Technology', 'Healthcare', 'Energy', 'Financials', 'Utilities']
+    screener = Screener(capacity=args.symbols)
+
+    started = time.perf_counter()
+    screener.build(histories)
+    build_seconds = time.perf_counter() - started
+    for i, t in enumerate(histories):
+        screener.set_fundamentals(t, sector=sectors[i % len(sectors)], marketCap=1e9 * (i + 1), pe=10 + i % 40)
+
+    filters = [
+        ("RSI < 30 and Close > SMA_30 and sector == 'Technology'", 'RSI'),
+        ("Change_pct > 1 and Volume > Volume_MA * 1.5", 'Change_pct'),
+        ("Close > SMA_10 > SMA_30 and sector in ['Energy', 'Utilities'] and pe < 25", 'marketCap'),
+    ]
+    print(f"📊 {len(screener)} symbols, table built in {build_seconds * 1000:.0f} ms")
+    for expression, sort in filters:
+        started = time.perf_counter()
+        for _ in range(20):
+            result = screener.query(expression, sort=sort, limit=50)
+        elapsed = (time.perf_counter() - started) / 20 * 1000
+        print(f"   {elapsed:6.2f} ms  {result['total']:5d} matches  {expression}")
+
+    store_history = next(iter(histories.values()))
+    started = time.perf_counter()
+    screener.update_indicators(['SYN0000'], store_history[['Close']].to_numpy()[-LOOKBACK_DAYS:],
+                               store_history[['Volume']].to_numpy()[-LOOKBACK_DAYS:])
+    print(f"✅ Single-ticker incremental refresh: {(time.perf_counter() - started) * 1000:.2f} ms")
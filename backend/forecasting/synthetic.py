@@ -0,0 +1,27 @@
+"""Synthetic OHLCV data for benchmarks that should not hit the network."""
+import numpy as np
+import pandas as pd
+
+
+def synthetic_ohlcv(n_days: int, seed: int = 0, start_price: float = 100.0,
+                    end: str = '2024-12-31') -> pd.DataFrame:
+    """Geometric Brownian motion daily bars on business days"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=end, periods=n_days, name='Date')
+    drift, vol = rng.normal(0.0003, 0.0002), rng.uniform(0.01, 0.03)
+    close = start_price * np.exp(np.cumsum(rng.normal(drift, vol, n_days)))
+    open_ = close * np.exp(rng.normal(0, vol / 3, n_days))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, vol / 2, n_days)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, vol / 2, n_days)))
+    volume = rng.lognormal(15, 0.5, n_days).round()
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low,
+                         'Close': close, 'Volume': volume}, index=index)
+
+
+def synthetic_universe(n_tickers: int, n_days: int, seed: int = 0) -> dict:
+    """{ticker: OHLCV frame} for n_tickers independent synthetic series"""
+    rng = np.random.default_rng(seed)
+    return {
+        f"SYN{i:04d}": synthetic_ohlcv(n_days, seed=seed + i, start_price=float(rng.uniform(10, 500)))
+        for i in range(n_tickers)
+    }
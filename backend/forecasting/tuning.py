@@ -0,0 +1,245 @@
+"""
+Hyperparameter search for the XGBoost forecaster.
+
+Random configurations are scored with successive halving: every surviving
+config is evaluated on the last `folds` walk-forward folds of each ticker in
+the group, the best 1/eta survive, and the survivors are re-scored on eta
+times more folds. Each fit holds out the end of its training window for early
+stopping, so weak configs stop long before n_estimators, and the tuned
+n_estimators is the median best iteration.
+
+Trials run across a process pool and are cached in a JSON-lines file keyed by
+(group, params, folds, data fingerprint), so a rerun only evaluates what is new.
+The winner per ticker or per sector is written to db/tuned_params.json, where
+config.params_for() picks it up.
+
+Run from the backend directory:
+    python -m forecasting.tuning --synthetic 8 --trials 16
+    python -m forecasting.tuning --sectors --tickers AAPL MSFT XOM CVX
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .backtest import WARMUP_ROWS, walk_forward_splits
+from .config import XGB_PARAMS, make_model, save_tuned_params
+from .features import feature_arrays
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # goes up from forecasting to backend
+TRIALS_PATH = os.path.join(BASE_DIR, "db", "tuning_trials.jsonl")
+
+SEARCH_SPACE = {
+    'learning_rate': ('log', 0.01, 0.3),
+    'max_depth': ('int', 2, 8),
+    'min_child_weight': ('int', 1, 20),
+    'subsample': ('float', 0.5, 1.0),
+    'colsample_bytree': ('float', 0.5, 1.0),
+    'reg_alpha': ('log', 1e-4, 1.0),
+    'reg_lambda': ('log', 1e-3, 10.0),
+}
+MAX_ESTIMATORS = 1000
+EARLY_STOPPING_ROUNDS = 30
+VALIDATION_ROWS = 42
+
+
+def sample_params(rng: np.random.Generator) -> dict:
+    """One random configuration from SEARCH_SPACE"""
+    params = {}
+    for name, (kind, low, high) in SEARCH_SPACE.items():
+        if kind == 'int':
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+
+class TrialCache:
+    """Append-only JSON-lines store of finished trials"""
+
+    def __init__(self, path: str = TRIALS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._trials = {}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        trial = json.loads(line)
+                        self._trials[trial['key']] = trial
+
+    def get(self, key: str) -> dict | None:
+        return self._trials.get(key)
+
+    def put(self, trial: dict):
+        with self._lock:
+            self._trials[trial['key']] = trial
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(trial) + '\n')
+
+
+def _fingerprint(arrays_by_ticker: dict) -> str:
+    """Changes whenever any ticker's history gains bars or is revised at the end"""
+    parts = [f"{t}:{len(a['close'])}:{a['close'][-1]:.6f}" for t, a in sorted(arrays_by_ticker.items())]
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+
+def trial_key(group: str, params: dict, n_folds: int, fingerprint: str) -> str:
+    payload = json.dumps([group, params, n_folds, fingerprint], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _evaluate(arrays_by_ticker: dict, params: dict, n_folds: int, step: int) -> dict:
+    """Out-of-sample next-day return RMSE over the last n_folds folds of every ticker"""
+    errors, best_iterations = [], []
+    model_params = {**params, 'n_estimators': MAX_ESTIMATORS, 'n_jobs': 1,
+                    'early_stopping_rounds': EARLY_STOPPING_ROUNDS}
+    for arrays in arrays_by_ticker.values():
+        X, log_return = arrays['X'], arrays['log_return']
+        splits = walk_forward_splits(len(log_return), step=step)[-n_folds:]
+        for _, train_end, test_end in splits:
+            # Early-stopping validation window = the tail of the training window
+            fit = np.arange(WARMUP_ROWS, train_end - 1 - VALIDATION_ROWS)
+            val = np.arange(train_end - 1 - VALIDATION_ROWS, train_end - 1)
+            test = np.arange(train_end, min(test_end, len(log_return) - 1))
+            if len(fit) < 50 or len(test) == 0:
+                continue
+            model = make_model(**model_params)
+            model.fit(X[fit], log_return[fit], eval_set=[(X[val], log_return[val])], verbose=False)
+            pred = model.predict(X[test])
+            errors.append((pred - log_return[test]) ** 2)
+            best_iterations.append(int(model.best_iteration) + 1)
+    if not errors:
+        return {'score': float('inf'), 'best_iteration': None}
+    return {'score': float(np.sqrt(np.mean(np.concatenate(errors)))),
+            'best_iteration': int(np.median(best_iterations))}
+
+
+def _run_trial(group, arrays_by_ticker, params, n_folds, step, key):
+    started = time.perf_counter()
+    result = _evaluate(arrays_by_ticker, params, n_folds, step)
+    return {'key': key, 'group': group, 'params': params, 'n_folds': n_folds,
+            'seconds': round(time.perf_counter() - started, 3), **result}
+
+
+def tune_group(group: str, histories: dict, n_trials: int = 16, eta: int = 3,
+               min_folds: int = 1, max_folds: int = 9, step: int = 63, seed: int = 42,
+               max_workers: int | None = None, cache: TrialCache | None = None) -> dict:
+    """Successive-halving search for one group ({ticker: OHLCV frame}); returns the best trial"""
+    cache = cache or TrialCache()
+    max_workers = max_workers or os.cpu_count() or 1
+    rng = np.random.default_rng(seed)
+    arrays_by_ticker = {t: feature_arrays(df) for t, df in histories.items()}
+    fingerprint = _fingerprint(arrays_by_ticker)
+
+    # The current defaults always compete against the random configs
+    defaults = {k: XGB_PARAMS[k] for k in SEARCH_SPACE}
+    configs = [defaults] + [sample_params(rng) for _ in range(n_trials - 1)]
+    n_folds = min_folds
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            keys = [trial_key(group, p, n_folds, fingerprint) for p in configs]
+            results = {k: cache.get(k) for k in keys}
+            pending = [(p, k) for p, k in zip(configs, keys) if results[k] is None]
+            print(f"🔎 {group}: {len(configs)} configs x {n_folds} folds "
+                  f"({len(configs) - len(pending)} cached)")
+
+            futures = [pool.submit(_run_trial, group, arrays_by_ticker, p, n_folds, step, k)
+                       for p, k in pending]
+            for future in futures:
+                trial = future.result()
+                cache.put(trial)
+                results[trial['key']] = trial
+
+            ranked = sorted((results[k] for k in keys), key=lambda t: t['score'])
+            if len(ranked) == 1 or n_folds >= max_folds:
+                break
+            configs = [t['params'] for t in ranked[:max(1, math.ceil(len(ranked) / eta))]]
+            n_folds = min(n_folds * eta, max_folds)
+
+    best = ranked[0]
+    print(f"🏆 {group}: RMSE {best['score']:.5f} with {best['best_iteration']} trees")
+    return best
+
+
+def tune(groups: dict, level: str = 'tickers', save: bool = True, **kwargs) -> dict:
+    """Tune every group ({group: {ticker: frame}}) and write winners at level 'tickers'/'sectors'
+
+    Sector winners also record each group's tickers as members of that sector.
+    """
+    if level not in ('tickers', 'sectors'):
+        raise ValueError("level must be 'tickers' or 'sectors'")
+    best = {}
+    for group, histories in groups.items():
+        trial = tune_group(group, histories, **kwargs)
+        if trial['best_iteration']:
+            best[group] = {**trial['params'], 'n_estimators': trial['best_iteration']}
+    if save and best:
+        members = {t: g for g in best for t in groups[g]} if level == 'sectors' else None
+        save_tuned_params(level, best, members=members)
+    return best
+
+
+def sector_groups(histories: dict, sectors: dict) -> dict:
+    """{sector: {ticker: frame}}; tickers without a known sector are left out"""
+    groups = {}
+    for ticker, df in histories.items():
+        if sectors.get(ticker):
+            groups.setdefault(sectors[ticker], {})[ticker] = df
+    return groups
+
+
+def yahoo_sectors(tickers) -> dict:
+    """{ticker: sector} from Yahoo's Ticker.info"""
+    import yfinance as yf
+
+    sectors = {}
+    for ticker in tickers:
+        try:
+            sectors[ticker] = (yf.Ticker(ticker).info or {}).get('sector')
+        except Exception as e:
+            print(f"⚠️ No sector for {ticker}: {e}")
+    return sectors
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tune forecaster hyperparameters")
+    parser.add_argument('--tickers', nargs='*', default=[])
+    parser.add_argument('--synthetic', type=int, default=0, help="tune N synthetic tickers instead")
+    parser.add_argument('--sectors', action='store_true', help="tune one config per sector, not per ticker")
+    parser.add_argument('--trials', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from .synthetic import synthetic_universe
+        histories = synthetic_universe(args.synthetic, 5 * 252)
+        sectors = {t: f"Sector{i % 3}" for i, t in enumerate(histories)}
+    else:
+        from .price_store import PriceStore
+        store = PriceStore()
+        histories = {t.upper(): store.history(t, period='5y') for t in args.tickers}
+        sectors = yahoo_sectors(histories) if args.sectors else {}
+
+    if args.sectors:
+        level, groups = 'sectors', sector_groups(histories, sectors)
+    else:
+        level, groups = 'tickers', {t: {t: df} for t, df in histories.items()}
+
+    started = time.perf_counter()
+    best = tune(groups, level=level, n_trials=args.trials, max_workers=args.workers,
+                save=not args.no_save)
+    print(json.dumps(best, indent=2))
+    print(f"✅ Tuned {len(best)} groups in {time.perf_counter() - started:.1f}s")
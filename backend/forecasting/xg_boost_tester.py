@@ -1,10 +1,14 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import matplotlib.pyplot as plt
-from xgboost import XGBRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 from sklearn.preprocessing import RobustScaler  # ADD THIS LINE
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forecasting.config import make_model
     
 
 def train_test_split(data, perc):  # trains with the first perc of the data and tests with the rest
@@ -19,17 +23,7 @@ def xgb_predict(train, test):
     X_test = test.iloc[:, :-1].values
     y_test = test.iloc[:, -1].values
 
-    model = XGBRegressor(
-        n_estimators=400,
-        learning_rate=0.1,  # Higher learning rate
-        max_depth=6,        # Deeper trees
-        min_child_weight=1, # Less conservative
-        subsample=0.9,
-        colsample_bytree=0.9,
-        reg_alpha=0.01,     # Much less regularization
-        reg_lambda=0.01,    # Much less regularization
-        random_state=42
-    )
+    model = make_model()  # same hyperparameters as the live forecaster
     
     model.fit(
         X, Y,
@@ -2,5 +2,6 @@
 
 from .llm import LLMClient
 from .rag import RAG, generate_response
+from .retriever import Document, HybridRetriever
 
-__all__ = ['LLMClient', 'RAG', 'generate_response']
\ No newline at end of file
+__all__ = ['LLMClient', 'RAG', 'generate_response', 'Document', 'HybridRetriever']
\ No newline at end of file
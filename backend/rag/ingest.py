@@ -0,0 +1,364 @@
+"""Incremental article ingestion for the rag module.
+
+`ArticleEmbeddingJob` follows the scraper's `article_changes` log (rows
+appended by triggers whenever an article is inserted, gets new text, is
+re-linked as a duplicate or deleted): every run picks up the changes past
+its watermark, re-chunks those articles (canonical articles with text) into
+overlapping word chunks, replaces their old chunks when the chunks differ,
+and embeds them through an `Embedder` backed by the content-addressed
+`EmbeddingStore`. Databases without the log fall back to following new
+article ids. A chunk seen
+before (a rebuild, a syndicated body under another headline) is a store
+hit and never reaches the model; only unseen chunks are encoded, in large
+batches. Chunk rows (`ChunkIndex`, shared with PDF ingestion) and the
+watermark live next to the embeddings, so a retriever can be rebuilt from
+the store without embedding anything.
+
+The headline is only prepended to an article's first chunk, so body chunks
+hash the same whichever outlet (headline) carried them.
+
+Benchmark (from the project root):
+    python -m backend.rag.ingest --articles 3000
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from .retriever import Document, HybridRetriever
+from .vector import BASE_DIR, Embedder, EmbeddingStore
+
+ARTICLES_DB = os.path.join(BASE_DIR, "db", "NewsArticles.db")
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+PAGE_ROWS = 500
+WATCH_SECONDS = 30
+_REMOVALS = "chunks:removed"  # ingest_state counter: bumped whenever chunk rows are deleted
+
+
+def chunk_text(text: str, size: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """Whitespace-normalized windows of `size` words, consecutive windows sharing `overlap` words."""
+    if overlap >= size:
+        raise ValueError("overlap must be smaller than size")
+    words = text.split()
+    if not words:
+        return []
+    step = size - overlap
+    return [" ".join(words[start:start + size])
+            for start in range(0, max(len(words) - overlap, 1), step)]
+
+
+class ChunkIndex:
+    """Chunk rows (text, tickers, date, metadata + embedding key) and per-source watermarks,
+    kept in the embedding store's database."""
+
+    def __init__(self, store: EmbeddingStore):
+        self.store = store
+        self.connection = sqlite3.connect(store.path, check_same_thread=False)
+        self.connection.executescript("""
+        CREATE TABLE IF NOT EXISTS chunks(
+            id TEXT PRIMARY KEY,
+            source TEXT,
+            doc_id INTEGER,
+            chunk_no INTEGER,
+            key BLOB,
+            text TEXT,
+            tickers TEXT,
+            datetime REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source, doc_id);
+        CREATE TABLE IF NOT EXISTS ingest_state(
+            source TEXT PRIMARY KEY,
+            last_id INTEGER
+        );
+        """)
+        try:
+            self.connection.execute("ALTER TABLE chunks ADD COLUMN metadata TEXT")
+        except sqlite3.OperationalError:
+            pass
+        self.connection.commit()
+
+    def add(self, records: list[tuple]) -> None:
+        """(id, source, doc_id, chunk_no, key, text, tickers, datetime, metadata json) rows (caller commits)."""
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO chunks (id, source, doc_id, chunk_no, key, text, tickers, datetime, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+
+    def document_chunks(self, source: str, doc_id: int) -> list[tuple]:
+        """(id, key, tickers, datetime) of a document's chunks, in order"""
+        return self.connection.execute(
+            "SELECT id, key, tickers, datetime FROM chunks WHERE source = ? AND doc_id = ? ORDER BY chunk_no",
+            (source, doc_id)).fetchall()
+
+    def remove_document(self, source: str, doc_id: int) -> None:
+        """Drop a document's chunks (caller commits)."""
+        self.connection.execute("DELETE FROM chunks WHERE source = ? AND doc_id = ?", (source, doc_id))
+        self._count_removal()
+
+    def _count_removal(self) -> None:
+        self.connection.execute(
+            "INSERT INTO ingest_state (source, last_id) VALUES (?, 1) "
+            "ON CONFLICT(source) DO UPDATE SET last_id = last_id + 1", (_REMOVALS,))
+
+    def version(self) -> tuple[int, int]:
+        """(highest chunk rowid, removal count): rows past the rowid are new; a changed removal
+        count means earlier rows were replaced or deleted (and rowids may be reused)."""
+        max_rowid = self.connection.execute("SELECT COALESCE(MAX(rowid), 0) FROM chunks").fetchone()[0]
+        return max_rowid, self.watermark(_REMOVALS)
+
+    def has_document(self, source: str, doc_id: int) -> bool:
+        return self.connection.execute(
+            "SELECT 1 FROM chunks WHERE source = ? AND doc_id = ? LIMIT 1", (source, doc_id)).fetchone() is not None
+
+    def watermark(self, source: str) -> int:
+        row = self.connection.execute("SELECT last_id FROM ingest_state WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else 0
+
+    def set_watermark(self, source: str, last_id: int) -> None:
+        self.connection.execute("INSERT OR REPLACE INTO ingest_state (source, last_id) VALUES (?, ?)", (source, last_id))
+
+    def reset(self, source: str) -> None:
+        """Forget a source's chunks and watermark (embeddings stay cached)."""
+        self.connection.execute("DELETE FROM chunks WHERE source = ?", (source,))
+        self.connection.execute("DELETE FROM ingest_state WHERE source = ?", (source,))
+        self._count_removal()
+        self.connection.commit()
+
+    def documents(self, source: Optional[str] = None, after: int = 0,
+                  upto: Optional[int] = None) -> tuple[list[Document], np.ndarray]:
+        """Ingested chunks (of one source, or all; with rowid in (after, upto]) as Documents,
+        with their stored embeddings."""
+        query = "SELECT id, key, text, tickers, datetime, metadata FROM chunks WHERE rowid > ?"
+        params: tuple = (after,)
+        if upto is not None:
+            query += " AND rowid <= ?"
+            params += (upto,)
+        if source is not None:
+            query += " AND source = ?"
+            params += (source,)
+        rows = self.connection.execute(query + " ORDER BY source, doc_id, chunk_no", params).fetchall()
+        vectors = self.store.get_many([r[1] for r in rows])
+        rows = [r for r in rows if r[1] in vectors]
+        documents = [Document(chunk_id, text, tuple(t for t in (tickers or "").split(",") if t), published,
+                              json.loads(metadata) if metadata else {})
+                     for chunk_id, _, text, tickers, published, metadata in rows]
+        dim = next(iter(vectors.values())).shape[0] if vectors else 0
+        matrix = np.vstack([vectors[r[1]] for r in rows]) if rows else np.zeros((0, dim), np.float32)
+        return documents, matrix
+
+    def build_retriever(self, embedder: Embedder, source: Optional[str] = None,
+                        upto: Optional[int] = None) -> HybridRetriever:
+        """HybridRetriever over the ingested chunks, without re-embedding."""
+        retriever = HybridRetriever(embedder)
+        retriever.add(*self.documents(source, upto=upto))
+        return retriever
+
+
+class ArticleEmbeddingJob:
+    """changed articles -> chunks -> embeddings, resumable from the last change processed."""
+
+    def __init__(self, articles_db: str = ARTICLES_DB, store: Optional[EmbeddingStore] = None,
+                 embedder: Optional[Embedder] = None, source: str = "articles"):
+        self.articles_db = articles_db
+        if store is None:
+            store = embedder.store if embedder is not None and embedder.store is not None else EmbeddingStore()
+        self.store = store
+        self.embedder = embedder if embedder is not None else Embedder(store=store)
+        if self.embedder.store is None:
+            self.embedder.store = self.store
+        self.source = source
+        self.index = ChunkIndex(store)
+
+    # ---------- State ----------
+    def _changes_query(self, articles: sqlite3.Connection) -> tuple[str, str]:
+        """(state key, SELECT of (seq, article id) past a watermark): the change log, or new ids."""
+        if articles.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'article_changes'").fetchone():
+            return f"{self.source}:changes", "SELECT seq, article_id FROM article_changes WHERE seq > ? ORDER BY seq"
+        return self.source, "SELECT id, id FROM articles WHERE id > ? ORDER BY id"
+
+    def watermark(self) -> int:
+        with self._articles() as articles:
+            return self.index.watermark(self._changes_query(articles)[0])
+
+    def reset(self) -> None:
+        """Forget chunks and the watermark (embeddings stay cached)."""
+        self.index.reset(self.source)
+        self.index.reset(f"{self.source}:changes")
+
+    def _articles(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.articles_db}?mode=ro", uri=True)
+
+    def pending(self) -> int:
+        """Article changes (new rows, new text, deletes...) since the last run."""
+        with self._articles() as articles:
+            key, query = self._changes_query(articles)
+            return articles.execute(f"SELECT COUNT(*) FROM ({query})", (self.index.watermark(key),)).fetchone()[0]
+
+    def _records(self, row: Optional[tuple]) -> list[tuple]:
+        """Chunk rows for one article row (none for duplicates, empty or deleted articles)."""
+        if row is None:
+            return []
+        row_id, headline, full_text, related, published, canonical_id = row
+        if canonical_id is not None or not full_text:
+            return []  # near-duplicates share their canonical's chunks
+        records = []
+        for n, chunk in enumerate(chunk_text(full_text)):
+            text = f"{headline}\n{chunk}" if n == 0 and headline else chunk
+            records.append((f"{self.source}:{row_id}:{n}", self.source, row_id, n,
+                            EmbeddingStore.key(self.embedder.name, text), text, related or "", published, None))
+        return records
+
+    # ---------- Job ----------
+    def run_once(self, limit: Optional[int] = None) -> dict:
+        """Re-chunk and embed articles changed since the watermark; returns throughput and cache stats.
+
+        `limit` caps the number of changes read. An article whose chunks come
+        out identical to the stored ones (e.g. only its sentiment changed)
+        is left alone; otherwise its old chunks are replaced.
+        """
+        hits, misses = self.embedder.store_hits, self.embedder.store_misses
+        stats = {"articles": 0, "changes": 0, "replaced": 0, "chunks": 0}
+        started = time.perf_counter()
+        articles = self._articles()
+        try:
+            key, query = self._changes_query(articles)
+            last = self.index.watermark(key)
+            while limit is None or stats["changes"] < limit:
+                page = PAGE_ROWS if limit is None else min(PAGE_ROWS, limit - stats["changes"])
+                changes = articles.execute(query + " LIMIT ?", (last, page)).fetchall()
+                if not changes:
+                    break
+                ids = list(dict.fromkeys(article_id for _, article_id in changes))
+                rows = {r[0]: r for r in articles.execute(f"""
+                    SELECT id, headline, full_text, related, datetime, canonical_id FROM articles
+                    WHERE id IN ({','.join('?' * len(ids))})""", ids)}
+                records, stale = [], []
+                for article_id in ids:
+                    new = self._records(rows.get(article_id))
+                    old = self.index.document_chunks(self.source, article_id)
+                    if [(r[0], r[4], r[6], r[7]) for r in new] == old:
+                        continue
+                    if old:
+                        stale.append(article_id)
+                    records.extend(new)
+                # Embed before touching the chunk rows: the store writes on its own connection
+                self.embedder.embed([r[5] for r in records])
+                for article_id in stale:
+                    self.index.remove_document(self.source, article_id)
+                self.index.add(records)
+                last = changes[-1][0]
+                self.index.set_watermark(key, last)
+                self.index.connection.commit()
+                stats["changes"] += len(changes)
+                stats["articles"] += len(ids)
+                stats["replaced"] += len(stale)
+                stats["chunks"] += len(records)
+        finally:
+            articles.close()
+        seconds = time.perf_counter() - started
+        stats["embedded"] = self.embedder.store_misses - misses
+        stats["cache_hits"] = self.embedder.store_hits - hits
+        stats["hit_rate"] = stats["cache_hits"] / stats["chunks"] if stats["chunks"] else None
+        stats["seconds"] = seconds
+        stats["chunks_per_sec"] = stats["chunks"] / seconds if seconds else None
+        return stats
+
+    def watch(self, interval: float = WATCH_SECONDS, stop: Optional[threading.Event] = None) -> None:
+        """Poll the change log and run whenever articles changed (until `stop` is set)."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if self.pending():
+                stats = self.run_once()
+                print(f"📊 Embedded {stats['chunks']} chunks from {stats['articles']} changed articles "
+                      f"({stats['chunks_per_sec']:.0f} chunks/s, {stats['hit_rate'] or 0:.0%} cache hits)")
+            stop.wait(interval)
+
+    def build_retriever(self) -> HybridRetriever:
+        """HybridRetriever over the ingested article chunks, without re-embedding."""
+        return self.index.build_retriever(self.embedder, self.source)
+
+
+__all__ = ["ArticleEmbeddingJob", "ChunkIndex", "chunk_text"]
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import shutil
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Incremental article embedding benchmark")
+    parser.add_argument("--articles", type=int, default=3000)
+    parser.add_argument("--syndicated", type=float, default=0.3, help="share of bodies reused under a new headline")
+    parser.add_argument("--dtype", default="float16", choices=["float16", "float32"])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f"w{i}" for i in range(20000)]
+    root = tempfile.mkdtemp()
+    try:
+        db = os.path.join(root, "NewsArticles.db")
+        articles = sqlite3.connect(db)
+        # Same articles table + change-log triggers as the scraper's setup_database
+        articles.executescript("""
+        CREATE TABLE articles (id INTEGER PRIMARY KEY AUTOINCREMENT, headline TEXT,
+                               full_text TEXT, related TEXT, datetime INTEGER, canonical_id INTEGER);
+        CREATE TABLE article_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, article_id INTEGER);
+        CREATE TRIGGER article_changes_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO article_changes(article_id) VALUES (new.id);
+        END;
+        CREATE TRIGGER article_changes_au AFTER UPDATE OF headline, full_text, related, datetime, canonical_id
+        ON articles BEGIN
+            INSERT INTO article_changes(article_id) VALUES (new.id);
+        END;
+        """)
+        bodies = []
+
+        def add_articles(n, missing=0.0):
+            for _ in range(n):
+                if bodies and rng.random() < args.syndicated:
+                    body = rng.choice(bodies)  # same wire body, another outlet's headline
+                else:
+                    body = " ".join(rng.choices(vocabulary, k=rng.randint(300, 900)))
+                    bodies.append(body)
+                articles.execute("INSERT INTO articles (headline, full_text, related, datetime) VALUES (?, ?, ?, ?)",
+                                 (" ".join(rng.choices(vocabulary, k=10)), None if rng.random() < missing else body,
+                                  rng.choice(["AAPL", "MSFT", "NVDA", "AAPL,MSFT"]), int(time.time())))
+            articles.commit()
+
+        add_articles(args.articles, missing=0.05)  # some fetches failed: no text yet
+        store = EmbeddingStore(os.path.join(root, "embeddings.db"), dtype=args.dtype)
+        job = ArticleEmbeddingJob(db, store=store)
+        print(f"📊 {args.articles} articles, model {job.embedder.name}, {args.dtype} store")
+
+        def show(label, s):
+            print(f"   {label:22s} {s['articles']:5d} articles, {s['chunks']:6d} chunks, "
+                  f"{s['embedded']:6d} embedded, hit rate {s['hit_rate']:6.1%}, {s['chunks_per_sec']:8.0f} chunks/s")
+
+        show("cold", job.run_once())
+        job.reset()
+        show("rebuild (same store)", job.run_once())
+        add_articles(args.articles // 10)
+        print(f"   {job.pending()} new rows")
+        show("incremental", job.run_once())
+        missing = [r[0] for r in articles.execute("SELECT id FROM articles WHERE full_text IS NULL")]
+        articles.executemany("UPDATE articles SET full_text = ? WHERE id = ?",
+                             [(" ".join(rng.choices(vocabulary, k=rng.randint(300, 900))), i) for i in missing])
+        articles.commit()
+        print(f"   {len(missing)} articles got their text later (refetch)")
+        show("late text", job.run_once())
+
+        started = time.perf_counter()
+        retriever = job.build_retriever()
+        print(f"   retriever over {len(retriever):,} chunks rebuilt from the store in "
+              f"{time.perf_counter() - started:.2f}s ({len(store):,} distinct vectors, "
+              f"{os.path.getsize(store.path) / 1e6:.1f} MB)")
+        print("✅ Done")
+    finally:
+        shutil.rmtree(root)
@@ -1,15 +1,20 @@
 """Robust LLM client wrapper for the rag module.
 
 This file provides a small wrapper around ChatOllama (if available).
-It exposes a synchronous `chat(prompt)` and an async `a_call(prompt)`.
-Both methods fall back to a deterministic mock response when the
-external library or runtime call fails, making it safe to import and
-use in environments without the model installed.
+It exposes a synchronous `chat(prompt)`, an async `a_call(prompt)` and
+an async token stream `a_stream(prompt)`. All of them fall back to a
+deterministic mock response when the external library or runtime call
+fails, making it safe to import and use in environments without the
+model installed.
 """
 from __future__ import annotations
 
 import asyncio
-from typing import Optional, TYPE_CHECKING
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from langchain_ollama import ChatOllama  # type: ignore
@@ -23,12 +28,73 @@ else:
         ChatOllama = None
 
 
+MOCK_TOKEN_DELAY = 0.02
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # goes up from rag to backend
+TIMINGS_PATH = os.path.join(BASE_DIR, "db", "llm_timings.jsonl")
+
+
+@dataclass
+class StreamMetrics:
+    """Timing of one streamed completion.
+
+    `ttft` is measured from `start()` (call it before retrieval to include
+    it); `tokens_per_sec` covers the generation after the first token.
+    Tokens are the chunks the model streams (one token each for Ollama).
+    """
+    started: Optional[float] = None
+    first_token: Optional[float] = None
+    finished: Optional[float] = None
+    tokens: int = 0
+    source: str = "model"
+
+    def start(self) -> None:
+        if self.started is None:
+            self.started = time.perf_counter()
+
+    def token(self) -> None:
+        now = time.perf_counter()
+        if self.first_token is None:
+            self.first_token = now
+        self.tokens += 1
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        if self.started is None or self.first_token is None:
+            return None
+        return self.first_token - self.started
+
+    @property
+    def tokens_per_sec(self) -> Optional[float]:
+        if self.first_token is None or self.finished is None or self.tokens < 2:
+            return None
+        elapsed = self.finished - self.first_token
+        return (self.tokens - 1) / elapsed if elapsed > 0 else None
+
+    def as_dict(self) -> dict:
+        total = None
+        if self.started is not None and self.finished is not None:
+            total = self.finished - self.started
+        return {"ttft": self.ttft, "tokens": self.tokens, "tokens_per_sec": self.tokens_per_sec,
+                "seconds": total, "source": self.source}
+
+
+def record_stream_metrics(row: dict, path: str = TIMINGS_PATH) -> None:
+    """Append one request's streaming metrics as a JSON line."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(row) + "\n")
+
+
 class LLMClient:
     """Simple wrapper for ChatOllama with safe fallbacks.
 
     Methods:
       - chat(prompt: str) -> str : synchronous wrapper (may call blocking client)
       - a_call(prompt: str) -> str : async wrapper (runs blocking client in thread)
+      - a_stream(prompt: str) -> AsyncIterator[str] : tokens as they are generated
     """
 
     def __init__(self, model: str = "llama3.1:8b", temperature: float = 0.4):
@@ -98,5 +164,44 @@ class LLMClient:
         await asyncio.sleep(0.02)
         return f"[mock async] LLM response for prompt: {prompt}"
 
+    async def a_stream(self, prompt: str, metrics: Optional[StreamMetrics] = None) -> AsyncIterator[str]:
+        """Yield the completion token by token.
 
-__all__ = ["LLMClient"]
\ No newline at end of file
+        Uses the client's `astream` (ChatOllama streams one token per
+        chunk). If the client is missing or fails before the first token,
+        a mock response is streamed word by word instead; a failure after
+        tokens were sent ends the stream. `metrics`, if given, is filled in
+        as tokens are yielded.
+        """
+        metrics = metrics if metrics is not None else StreamMetrics()
+        metrics.start()
+        emitted = False
+        if self.client is not None and hasattr(self.client, "astream"):
+            try:
+                async for chunk in self.client.astream(prompt):
+                    token = getattr(chunk, "content", str(chunk))
+                    if token:
+                        emitted = True
+                        metrics.token()
+                        yield token
+            except Exception:
+                if emitted:
+                    metrics.finish()
+                    return
+        elif self.client is not None:
+            # Client without streaming support: one chunk with the whole completion
+            text = await self.a_call(prompt)
+            emitted = True
+            metrics.token()
+            yield text
+
+        if not emitted:
+            metrics.source = "mock"
+            for i, word in enumerate(f"[mock stream] LLM response for prompt: {prompt}".split(" ")):
+                await asyncio.sleep(MOCK_TOKEN_DELAY)
+                metrics.token()
+                yield word if i == 0 else " " + word
+        metrics.finish()
+
+
+__all__ = ["LLMClient", "StreamMetrics", "record_stream_metrics"]
\ No newline at end of file
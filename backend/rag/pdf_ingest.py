@@ -0,0 +1,299 @@
+"""PDF and filing ingestion for the rag module.
+
+10-K/10-Q filings and research notes run to hundreds of pages, so nothing
+here holds a whole document: PyMuPDF loads one page at a time, and body
+text flows through a streaming chunker (CHUNK_WORDS-word windows with
+CHUNK_OVERLAP words of overlap, carried across page breaks). Tables found
+by `page.find_tables()` are cut out of the body text and become their own
+chunks (as markdown), so rows of figures are not smeared into prose.
+Detection only runs on pages with vector drawings: it looks for ruling
+lines, and on text-only pages it costs ~100x the text extraction itself.
+
+Documents are parsed in a process pool (PyMuPDF parsing is CPU-bound),
+with at most IN_FLIGHT documents queued per worker. The parent process
+embeds the chunks in large batches through the content-addressed
+`EmbeddingStore` (the model is loaded once) and indexes them into the same
+`ChunkIndex` as article chunks, so `HybridRetriever` searches both. A file
+whose content was already ingested is skipped.
+
+Benchmark (from the project root):
+    python -m backend.rag.pdf_ingest --dir path/to/pdfs
+    python -m backend.rag.pdf_ingest              generated sample filings
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+from .ingest import CHUNK_OVERLAP, CHUNK_WORDS, ChunkIndex
+from .vector import STORE_FLUSH, Embedder, EmbeddingStore
+
+try:
+    import pymupdf  # PyMuPDF
+except Exception:
+    pymupdf = None
+
+PDF_SOURCE = "pdf"
+WORKERS = max(1, min(4, os.cpu_count() or 1))
+IN_FLIGHT = 2
+
+_TICKER_IN_NAME = re.compile(r"^([A-Z]{1,5})[-_ ]")
+_PDF_DATE = re.compile(r"D:(\d{4})(\d{2})?(\d{2})?")
+
+
+def _require_pymupdf() -> None:
+    if pymupdf is None:
+        raise RuntimeError("PyMuPDF is needed for PDF ingestion (pip install PyMuPDF)")
+
+
+def file_doc_id(path: str) -> int:
+    """Stable integer id from the file's content (same file under another name = same id)."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return int.from_bytes(digest.digest()[:7], "big")
+
+
+def _pdf_date(value: Optional[str]) -> Optional[float]:
+    match = _PDF_DATE.match(value or "")
+    if not match:
+        return None
+    year, month, day = (int(g or 1) for g in match.groups())
+    try:
+        return datetime(year, month, day, tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def iter_pages(path: str) -> Iterator[tuple[int, str, list[str]]]:
+    """(page number, body text without tables, tables as markdown), one page at a time."""
+    _require_pymupdf()
+    with pymupdf.open(path) as doc:
+        for page in doc:
+            tables, boxes = [], []
+            # Ruled tables need vector lines; pages without drawings skip the (slow) detection
+            if page.get_cdrawings():
+                try:
+                    for table in page.find_tables().tables:
+                        boxes.append(pymupdf.Rect(table.bbox))
+                        tables.append(table.to_markdown())
+                except Exception:
+                    pass  # table detection is best effort; the text is still ingested
+            blocks = page.get_text("blocks", sort=True)
+            text = "\n".join(b[4] for b in blocks
+                             if b[6] == 0 and not any(pymupdf.Rect(b[:4]).intersects(box) for box in boxes))
+            yield page.number + 1, text, tables
+
+
+def iter_chunks(pages: Iterable[tuple[int, str, list[str]]], size: int = CHUNK_WORDS,
+                overlap: int = CHUNK_OVERLAP) -> Iterator[tuple[str, int, int, str]]:
+    """(text, first page, last page, kind) chunks from a page stream.
+
+    Body windows run across page breaks and share `overlap` words; each
+    table is yielded as its own "table" chunk. Only the current window of
+    words is kept in memory.
+    """
+    if overlap >= size:
+        raise ValueError("overlap must be smaller than size")
+    buffer: list[tuple[str, int]] = []
+    carried = 0  # words at the head of the buffer already sent as overlap
+    for page_no, text, tables in pages:
+        for table in tables:
+            yield table, page_no, page_no, "table"
+        buffer.extend((word, page_no) for word in text.split())
+        while len(buffer) >= size:
+            window = buffer[:size]
+            yield " ".join(w for w, _ in window), window[0][1], window[-1][1], "text"
+            del buffer[:size - overlap]
+            carried = overlap
+    if len(buffer) > carried:
+        yield " ".join(w for w, _ in buffer), buffer[0][1], buffer[-1][1], "text"
+
+
+def parse_pdf(path: str, doc_id: Optional[int] = None) -> dict:
+    """Parse and chunk one PDF (runs in a worker process)."""
+    _require_pymupdf()
+    started = time.perf_counter()
+    with pymupdf.open(path) as doc:
+        metadata, page_count = doc.metadata or {}, doc.page_count
+    match = _TICKER_IN_NAME.match(os.path.basename(path))
+    return {
+        "path": path,
+        "doc_id": doc_id if doc_id is not None else file_doc_id(path),
+        "title": metadata.get("title") or os.path.basename(path),
+        "tickers": (match.group(1),) if match else (),
+        "datetime": _pdf_date(metadata.get("creationDate")),
+        "pages": page_count,
+        "chunks": list(iter_chunks(iter_pages(path))),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+class PdfIngestor:
+    """PDFs -> page-streamed chunks (process pool) -> batched embeddings -> ChunkIndex."""
+
+    def __init__(self, store: Optional[EmbeddingStore] = None, embedder: Optional[Embedder] = None,
+                 workers: int = WORKERS):
+        _require_pymupdf()
+        if store is None:
+            store = embedder.store if embedder is not None and embedder.store is not None else EmbeddingStore()
+        self.store = store
+        self.embedder = embedder if embedder is not None else Embedder(store=store)
+        if self.embedder.store is None:
+            self.embedder.store = store
+        self.index = ChunkIndex(store)
+        self.workers = workers
+
+    def _flush(self, parsed: list[dict], stats: dict) -> None:
+        """Embed every chunk of the parsed documents in one batched call, then index them."""
+        records, texts = [], []
+        for doc in parsed:
+            for n, (text, first, last, kind) in enumerate(doc["chunks"]):
+                text = f"{doc['title']} (p. {first})\n{text}" if kind == "table" else text
+                metadata = {"path": doc["path"], "title": doc["title"], "pages": [first, last], "kind": kind}
+                records.append((f"{PDF_SOURCE}:{doc['doc_id']}:{n}", PDF_SOURCE, doc["doc_id"], n,
+                                EmbeddingStore.key(self.embedder.name, text), text, ",".join(doc["tickers"]),
+                                doc["datetime"], json.dumps(metadata)))
+                texts.append(text)
+                stats["tables"] += kind == "table"
+        self.embedder.embed(texts)
+        self.index.add(records)
+        self.index.connection.commit()
+        stats["chunks"] += len(records)
+
+    def ingest(self, paths: Iterable[str]) -> dict:
+        """Ingest PDFs in parallel; returns pages/sec and chunk/cache stats."""
+        hits, misses = self.embedder.store_hits, self.embedder.store_misses
+        stats = {"documents": 0, "skipped": 0, "failed": 0, "pages": 0, "chunks": 0, "tables": 0}
+        started = time.perf_counter()
+        todo = iter(paths)
+        parsed, parsed_chunks = [], 0
+        with ProcessPoolExecutor(self.workers) as pool:
+            running = set()
+
+            def submit_more():
+                # Keep at most IN_FLIGHT documents per worker queued: bounded memory for any number of files
+                while len(running) < self.workers * IN_FLIGHT:
+                    path = next(todo, None)
+                    if path is None:
+                        return
+                    doc_id = file_doc_id(path)
+                    if self.index.has_document(PDF_SOURCE, doc_id):
+                        stats["skipped"] += 1
+                        continue
+                    running.add(pool.submit(parse_pdf, path, doc_id))
+
+            submit_more()
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        doc = future.result()
+                    except Exception as e:
+                        stats["failed"] += 1
+                        print(f"⚠️ PDF ingestion failed: {e}")
+                        continue
+                    stats["documents"] += 1
+                    stats["pages"] += doc["pages"]
+                    parsed.append(doc)
+                    parsed_chunks += len(doc["chunks"])
+                if parsed_chunks >= STORE_FLUSH:
+                    self._flush(parsed, stats)
+                    parsed, parsed_chunks = [], 0
+                submit_more()
+        if parsed:
+            self._flush(parsed, stats)
+        seconds = time.perf_counter() - started
+        stats["embedded"] = self.embedder.store_misses - misses
+        stats["cache_hits"] = self.embedder.store_hits - hits
+        stats["seconds"] = seconds
+        stats["pages_per_sec"] = stats["pages"] / seconds if seconds else None
+        return stats
+
+
+__all__ = ["PdfIngestor", "iter_chunks", "iter_pages", "parse_pdf"]
+
+
+def _write_sample_filings(directory: str, documents: int, pages: int) -> list[str]:
+    """Synthetic filings: dense text pages, every fifth page with a ruled 5x4 table."""
+    import random
+
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    tickers = ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "JPM"]
+    paths = []
+    for d in range(documents):
+        ticker, year = tickers[d % len(tickers)], 2024 - d // len(tickers)
+        doc = pymupdf.open()
+        for p in range(pages):
+            page = doc.new_page()
+            body = " ".join(rng.choices(vocabulary, k=380))
+            if p % 5 == 2:
+                page.insert_textbox(pymupdf.Rect(50, 50, 545, 440), body, fontsize=9)
+                x0, y0, width, height = 60, 480, 120, 22
+                for r in range(6):
+                    page.draw_line((x0, y0 + r * height), (x0 + 4 * width, y0 + r * height))
+                for c in range(5):
+                    page.draw_line((x0 + c * width, y0), (x0 + c * width, y0 + 5 * height))
+                for r in range(5):
+                    for c in range(4):
+                        cell = "Segment" if c == 0 and r == 0 else f"{rng.uniform(1, 999):.1f}"
+                        page.insert_text((x0 + c * width + 4, y0 + r * height + 15), cell, fontsize=9)
+            else:
+                page.insert_textbox(pymupdf.Rect(50, 50, 545, 800), body, fontsize=9)
+        doc.set_metadata({"title": f"{ticker} Form 10-K {year}", "creationDate": f"D:{year + 1}0131000000"})
+        path = os.path.join(directory, f"{ticker}-10K-{year}.pdf")
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+    import resource
+    import shutil
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="PDF ingestion benchmark (pages/sec)")
+    parser.add_argument("--dir", help="directory of PDFs (default: generate sample filings)")
+    parser.add_argument("--documents", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    _require_pymupdf()
+    root = tempfile.mkdtemp()
+    try:
+        if args.dir:
+            paths = sorted(os.path.join(args.dir, f) for f in os.listdir(args.dir) if f.lower().endswith(".pdf"))
+        else:
+            paths = _write_sample_filings(root, args.documents, args.pages)
+        print(f"📊 {len(paths)} PDFs, {sum(os.path.getsize(p) for p in paths) / 1e6:.1f} MB")
+
+        for workers in sorted({1, args.workers}):
+            store = EmbeddingStore(os.path.join(root, f"embeddings-{workers}.db"))
+            ingestor = PdfIngestor(store, workers=workers)
+            s = ingestor.ingest(paths)
+            print(f"   {workers} worker(s): {s['pages']} pages in {s['seconds']:.2f}s = {s['pages_per_sec']:.0f} pages/s, "
+                  f"{s['chunks']} chunks ({s['tables']} tables), {s['embedded']} embedded, model {ingestor.embedder.name}")
+        again = ingestor.ingest(paths)
+        print(f"   re-run: {again['skipped']} unchanged files skipped in {again['seconds']:.2f}s")
+
+        retriever = ingestor.index.build_retriever(ingestor.embedder, PDF_SOURCE)
+        hit = retriever.search("Segment", k=1)[0]
+        peak_mb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+        print(f"   top hit for 'Segment': {hit.document.metadata['kind']} on pages {hit.document.metadata['pages']} "
+              f"of {os.path.basename(hit.document.metadata['path'])}")
+        print(f"   peak RSS {peak_mb:.0f} MB (largest single process)")
+        print("✅ Done")
+    finally:
+        shutil.rmtree(root)
@@ -6,17 +6,19 @@ and helper functions for generating responses using the LLM client.
 from __future__ import annotations
 
 import asyncio
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from .llm import LLMClient
+from .llm import LLMClient, StreamMetrics
+from .retriever import DateLike, Hit, HybridRetriever
 
 
 class RAG:
     """Main RAG implementation class."""
     
-    def __init__(self):
-        """Initialize RAG with an LLM client instance."""
+    def __init__(self, retriever: Optional[HybridRetriever] = None):
+        """Initialize RAG with an LLM client instance and an optional retriever."""
         self._llm: Optional[LLMClient] = None
+        self._retriever = retriever
     
     @property
     def llm(self) -> LLMClient:
@@ -25,15 +27,47 @@ class RAG:
             self._llm = LLMClient()
         return self._llm
 
+    @property
+    def retriever(self) -> HybridRetriever:
+        """Lazy initialization of the (empty) hybrid retriever."""
+        if self._retriever is None:
+            self._retriever = HybridRetriever()
+        return self._retriever
+
+    @retriever.setter
+    def retriever(self, retriever: HybridRetriever) -> None:
+        """Swap in a rebuilt retriever (searches already running finish on the old one)."""
+        self._retriever = retriever
+
+    async def retrieve(self, query: str, k: int = 5, ticker: Optional[str] = None,
+                       start: DateLike = None, end: DateLike = None) -> list[Hit]:
+        """BM25 + dense search fused with RRF, optionally filtered by ticker/date."""
+        return await self.retriever.a_search(query, k, ticker, start, end)
+
     async def a_call(self, prompt: str) -> str:
         """Async call to generate a response for the given prompt."""
         return await self.llm.a_call(prompt)
+
+    async def a_stream(self, prompt: str, metrics: Optional[StreamMetrics] = None) -> AsyncIterator[str]:
+        """Stream the response to the given prompt token by token."""
+        async for token in self.llm.a_stream(prompt, metrics):
+            yield token
     
     async def testllm(self, prompt: str) -> str:
         """Test method to verify LLM functionality."""
         return await self.llm.a_call(prompt)
 
 
+def build_prompt(query: str, hits: list[Hit]) -> str:
+    """Question plus the retrieved passages, numbered so the answer can cite them."""
+    if not hits:
+        return query
+    context = "\n\n".join(f"[{n}] {hit.document.text}" for n, hit in enumerate(hits, start=1))
+    return ("Answer the question using the numbered passages below. Cite passages like [1]. "
+            "If they do not contain the answer, say so.\n\n"
+            f"{context}\n\nQuestion: {query}\nAnswer:")
+
+
 async def generate_response(query: str) -> str:
     """Generate a response for the given query using the LLM.
     
@@ -46,7 +80,7 @@ async def generate_response(query: str) -> str:
 
 
 # Add proper exports
-__all__ = ['RAG', 'generate_response']
+__all__ = ['RAG', 'build_prompt', 'generate_response']
 
 
 # Simple test function
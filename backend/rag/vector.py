@@ -1,9 +1,241 @@
-class vector:
-    def __init__(self):
-        pass
-    async def embed(self, text: str) -> list[float]:
-        # Placeholder for embedding logic
-        pass
-    async def search(self, query: str) -> list[str]:
-        # Placeholder for search logic
-        pass
\ No newline at end of file
+"""Dense embeddings and vector search for the rag module.
+
+`Embedder` wraps a sentence-transformers model when it is installed and
+falls back to a deterministic hashing embedder otherwise, so retrieval
+keeps working (lexically) in environments without the model, the same
+way `LLMClient` falls back to a mock response.
+
+`EmbeddingStore` is a content-addressed cache of document embeddings: the
+key is a hash of (model, text), so a chunk that was embedded once is never
+embedded again, whichever article, rebuild or process it comes from.
+
+`VectorIndex` keeps L2-normalized document embeddings in one float32
+matrix; a search is a single matrix-vector product, optionally restricted
+to a boolean mask of allowed documents (ticker/date filters).
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer  # type: ignore
+except Exception:
+    SentenceTransformer = None
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+HASH_DIM = 384
+QUERY_CACHE_SIZE = 1024
+EMBED_BATCH = 256           # sentence-transformers batch for documents (CPU)
+STORE_FLUSH = 4096          # misses embedded + written per round
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # goes up from rag to backend
+DEFAULT_STORE = os.path.join(BASE_DIR, "db", "embeddings.db")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class HashingEmbedder:
+    """Signed feature hashing of words and word bigrams (no model download)."""
+
+    def __init__(self, dim: int = HASH_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def encode(self, texts: list[str], batch_size: int = 64) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _TOKEN.findall(text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(feature.encode())
+                out[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return _normalize(out)
+
+
+class EmbeddingStore:
+    """SQLite table of embeddings keyed by sha256(model, text), stored as float16 or float32."""
+
+    def __init__(self, path: str = DEFAULT_STORE, dtype: str = "float16"):
+        if dtype not in ("float16", "float32"):
+            raise ValueError("dtype must be float16 or float32")
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings(
+            key BLOB PRIMARY KEY,
+            dim INTEGER,
+            dtype TEXT,
+            vector BLOB
+        ) WITHOUT ROWID
+        """)
+        self.connection.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        return hashlib.sha256(f"{model}\0{text}".encode()).digest()
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, np.ndarray]:
+        """Stored vectors (as float32) for whichever keys are present."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self.connection.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch).fetchall()
+                for key, dtype, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=dtype).astype(np.float32)
+        return found
+
+    def put_many(self, keys: list[bytes], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors).astype(self.dtype)
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, dim, dtype, vector) VALUES (?, ?, ?, ?)",
+                [(k, v.shape[0], self.dtype.name, v.tobytes()) for k, v in zip(keys, vectors)])
+            self.connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class Embedder:
+    """Batched text embeddings with an LRU cache for query strings.
+
+    Uses sentence-transformers `model_name` when available, otherwise
+    `HashingEmbedder`. All vectors are L2-normalized float32. With a
+    `store`, document embeddings are looked up by content hash first and
+    only unseen texts are sent to the model.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, model: Optional[object] = None,
+                 cache_size: int = QUERY_CACHE_SIZE, store: Optional[EmbeddingStore] = None):
+        self.model = model
+        if self.model is None and SentenceTransformer is not None:
+            try:
+                self.model = SentenceTransformer(model_name)
+            except Exception:
+                self.model = None
+        if self.model is None:
+            self.model = HashingEmbedder()
+        self.name = getattr(self.model, "name", model_name)
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.store = store
+        self.store_hits = 0
+        self.store_misses = 0
+
+    def _encode(self, texts: list[str], batch_size: int) -> np.ndarray:
+        vectors = self.model.encode(texts, batch_size=batch_size)
+        return _normalize(np.asarray(vectors, dtype=np.float32))
+
+    def embed(self, texts: list[str], batch_size: int = EMBED_BATCH) -> np.ndarray:
+        """Embed documents in batches -> (len(texts), dim) float32.
+
+        With a store, cached vectors are reused and each distinct unseen
+        text is encoded once, STORE_FLUSH texts per model call + write.
+        """
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if self.store is None:
+            return self._encode(texts, batch_size)
+        keys = [EmbeddingStore.key(self.name, t) for t in texts]
+        found = self.store.get_many(list(set(keys)))
+        todo = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                todo.setdefault(key, text)
+        self.store_hits += len(texts) - len(todo)
+        self.store_misses += len(todo)
+        pending = list(todo.items())
+        for start in range(0, len(pending), STORE_FLUSH):
+            batch = pending[start:start + STORE_FLUSH]
+            vectors = self._encode([text for _, text in batch], batch_size)
+            self.store.put_many([key for key, _ in batch], vectors)
+            found.update(zip((key for key, _ in batch), vectors))
+        return np.vstack([found[k] for k in keys])
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed one query, reusing the vector for repeated (normalized) query text."""
+        key = " ".join(query.lower().split())
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return vector
+        vector = self._encode([key], 1)[0]  # queries never go to the store
+        with self._lock:
+            self.cache_misses += 1
+            self._cache[key] = vector
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    @property
+    def dim(self) -> int:
+        dim = getattr(self.model, "dim", None)
+        if dim is None:
+            dim = self.model.get_sentence_embedding_dimension()
+        return int(dim)
+
+
+class VectorIndex:
+    """Exact cosine search over normalized embeddings held in one matrix."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._vectors = np.empty((256, dim), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, embeddings: np.ndarray) -> None:
+        """Append embeddings; row i of the index is the i-th document added."""
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        needed = self._size + len(embeddings)
+        if needed > len(self._vectors):
+            grown = np.empty((max(needed, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        self._vectors[self._size:needed] = embeddings
+        self._size = needed
+
+    def search(self, query: np.ndarray, k: int = 10, mask: Optional[np.ndarray] = None,
+               n: Optional[int] = None) -> list[tuple[int, float]]:
+        """[(row, cosine)] of the k nearest documents, best first (only the first n, if given)."""
+        n = self._size if n is None else min(n, self._size)
+        if not n:
+            return []
+        scores = self._vectors[:n] @ query
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+__all__ = ["Embedder", "EmbeddingStore", "HashingEmbedder", "VectorIndex"]
@@ -0,0 +1,163 @@
+"""
+Shared market data access for the stock API.
+
+Wraps yfinance with bulk downloads (one request for many symbols) and a small
+TTL cache for `Ticker.info`, and computes per-symbol quote stats for a whole
+batch at once from the downloaded panel.
+"""
+import json
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+INFO_TTL_SECONDS = 15 * 60
+
+_info_cache = {}
+_info_lock = threading.Lock()
+
+
+def timeframe_for_days(days: int) -> tuple[str, str]:
+    """Map a requested chart length in days to a yfinance (period, interval)"""
+    if days <= 7:
+        return '5d', '1h'
+    elif days <= 30:
+        return '1mo', '1d'
+    elif days <= 90:
+        return '3mo', '1d'
+    elif days <= 365:
+        return '1y', '1d'
+    return 'max', '1wk'
+
+
+def get_info(symbol: str) -> dict:
+    """Ticker.info with a TTL cache; returns {} if Yahoo has nothing"""
+    key = symbol.upper()
+    now = time.time()
+    with _info_lock:
+        cached = _info_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    try:
+        info = yf.Ticker(symbol).info or {}
+    except Exception as e:
+        print(f"⚠️ Info fetch failed for {symbol}: {e}")
+        return {}
+
+    with _info_lock:
+        _info_cache[key] = (now + INFO_TTL_SECONDS, info)
+    return info
+
+
+def download_panel(symbols, period: str, interval: str = '1d') -> pd.DataFrame:
+    """Bulk-download OHLCV for many symbols in one call.
+
+    Returns a frame with (symbol, field) MultiIndex columns, even for a single symbol.
+    """
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+    if not symbols:
+        return pd.DataFrame()
+
+    panel = yf.download(symbols, period=period, interval=interval, group_by='ticker',
+                        auto_adjust=True, threads=True, progress=False)
+    if panel is None or panel.empty:
+        return pd.DataFrame()
+    if not isinstance(panel.columns, pd.MultiIndex):
+        panel.columns = pd.MultiIndex.from_product([symbols, panel.columns])
+    return panel
+
+
+def symbol_frame(panel: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """One symbol's OHLCV frame out of a bulk panel (empty if missing)"""
+    symbol = symbol.upper()
+    if panel.empty or symbol not in panel.columns.get_level_values(0):
+        return pd.DataFrame()
+    return panel[symbol].dropna(how='all')
+
+
+def _field(panel: pd.DataFrame, field: str, symbols) -> np.ndarray:
+    """dates x symbols array for one OHLCV field, NaN where missing"""
+    frame = panel.xs(field, axis=1, level=1).reindex(columns=symbols)
+    return frame.to_numpy(dtype=np.float64)
+
+
+def _last_valid(values: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(values)
+    rows = values.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    out = values[rows, np.arange(values.shape[1])]
+    out[~valid.any(axis=0)] = np.nan
+    return out
+
+
+def _first_valid(values: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(values)
+    rows = np.argmax(valid, axis=0)
+    out = values[rows, np.arange(values.shape[1])]
+    out[~valid.any(axis=0)] = np.nan
+    return out
+
+
+def quote_stats(panel: pd.DataFrame, symbols) -> dict:
+    """Price/change/open/high/low/volume for every symbol in one vectorized pass.
+
+    `panel` is a download_panel() result covering the current session.
+    Symbols without data are left out of the result.
+    """
+    symbols = [s.upper() for s in symbols]
+    if panel.empty or not symbols:
+        return {}
+
+    close = _last_valid(_field(panel, 'Close', symbols))
+    open_ = _first_valid(_field(panel, 'Open', symbols))
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        # Symbols with no bars produce all-NaN columns; they are dropped below
+        warnings.simplefilter('ignore', RuntimeWarning)
+        high = np.nanmax(_field(panel, 'High', symbols), axis=0)
+        low = np.nanmin(_field(panel, 'Low', symbols), axis=0)
+        change = close - open_
+        change_percent = np.where(open_ != 0, change / open_ * 100, 0.0)
+    volume = np.nan_to_num(_last_valid(_field(panel, 'Volume', symbols))).astype(np.int64)
+
+    columns = {
+        'price': np.round(close, 2).tolist(),
+        'change': np.round(change, 2).tolist(),
+        'changePercent': np.round(change_percent, 2).tolist(),
+        'open': np.round(open_, 2).tolist(),
+        'high': np.round(high, 2).tolist(),
+        'low': np.round(low, 2).tolist(),
+        'volume': volume.tolist(),
+    }
+    has_data = (~np.isnan(close)).tolist()
+    return {
+        symbol: {name: values[i] for name, values in columns.items()}
+        for i, symbol in enumerate(symbols) if has_data[i]
+    }
+
+
+def info_fields(symbol: str, info: dict) -> dict:
+    """The subset of Ticker.info the detail page shows"""
+    return {
+        'company': info.get('longName', symbol),
+        'avgVolume': int(info.get('averageVolume', 0) or 0),
+        'fiftyTwoWeekHigh': round(float(info.get('fiftyTwoWeekHigh', 0) or 0), 2),
+        'fiftyTwoWeekLow': round(float(info.get('fiftyTwoWeekLow', 0) or 0), 2),
+        'marketCap': info.get('marketCap', 0),
+        'peRatio': round(float(info.get('trailingPE', 0)), 2) if info.get('trailingPE') else 0,
+        'dividendYield': info.get('dividendYield', 0),
+        'sector': info.get('sector', 'N/A'),
+        'industry': info.get('industry', 'N/A'),
+    }
+
+
+SYMBOLS_PATH = os.path.join(os.path.dirname(__file__), 'stock_symbols.json')
+
+
+def load_universe(path: str = SYMBOLS_PATH) -> list:
+    """Symbols tracked server-wide (stock_symbols.json)"""
+    with open(path) as f:
+        return list(dict.fromkeys(json.load(f)['symbols']))
@@ -0,0 +1,133 @@
+"""
+Top movers over the whole symbol universe.
+
+`MoversTable` keeps the latest price, change percent and volume per symbol in
+flat NumPy arrays. Quote snapshots from the refresher update only the rows
+they mention, and top-k queries use np.argpartition so only the k winners get
+sorted.
+"""
+import threading
+
+import numpy as np
+
+KINDS = ('gainers', 'losers', 'active')
+
+
+class MoversTable:
+    """Array-backed latest-quote table answering top-k movers queries"""
+
+    def __init__(self, symbols=(), capacity: int = 256):
+        self._lock = threading.Lock()
+        self._index = {}
+        self._symbols = []
+        capacity = max(capacity, len(symbols))
+        self._price = np.full(capacity, np.nan)
+        self._change = np.full(capacity, np.nan)
+        self._change_percent = np.full(capacity, np.nan)
+        self._volume = np.zeros(capacity, dtype=np.int64)
+        for symbol in symbols:
+            self._slot(symbol)
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def _slot(self, symbol: str) -> int:
+        """Row for symbol, appending (and growing the arrays) if it is new"""
+        i = self._index.get(symbol)
+        if i is not None:
+            return i
+        i = len(self._symbols)
+        if i == len(self._price):
+            grow = len(self._price)
+            self._price = np.concatenate((self._price, np.full(grow, np.nan)))
+            self._change = np.concatenate((self._change, np.full(grow, np.nan)))
+            self._change_percent = np.concatenate((self._change_percent, np.full(grow, np.nan)))
+            self._volume = np.concatenate((self._volume, np.zeros(grow, dtype=np.int64)))
+        self._index[symbol] = i
+        self._symbols.append(symbol)
+        return i
+
+    def update(self, quotes: dict):
+        """Apply a symbol -> quote snapshot; symbols not present keep their last values"""
+        if not quotes:
+            return
+        with self._lock:
+            rows = np.fromiter((self._slot(s) for s in quotes), dtype=np.int64, count=len(quotes))
+            values = list(quotes.values())
+            self._price[rows] = [q.get('price', np.nan) for q in values]
+            self._change[rows] = [q.get('change', np.nan) for q in values]
+            self._change_percent[rows] = [q.get('changePercent', np.nan) for q in values]
+            self._volume[rows] = [q.get('volume', 0) or 0 for q in values]
+
+    def prices(self, symbols) -> np.ndarray:
+        """Latest price for each symbol (NaN for symbols the table has never seen)"""
+        with self._lock:
+            rows = np.fromiter((self._index.get(s, -1) for s in symbols), dtype=np.int64, count=len(symbols))
+            return np.where(rows >= 0, self._price[rows], np.nan)
+
+    def change_percents(self, symbols) -> np.ndarray:
+        """Latest change percent for each symbol (NaN for symbols the table has never seen)"""
+        with self._lock:
+            rows = np.fromiter((self._index.get(s, -1) for s in symbols), dtype=np.int64, count=len(symbols))
+            return np.where(rows >= 0, self._change_percent[rows], np.nan)
+
+    def top(self, kind: str = 'gainers', k: int = 10) -> list:
+        """Top-k symbols by change percent (gainers/losers) or by volume (active)"""
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+
+        with self._lock:
+            n = len(self._symbols)
+            if n == 0 or k <= 0:
+                return []
+            change_percent = self._change_percent[:n]
+            if kind == 'gainers':
+                score = np.where(np.isnan(change_percent), -np.inf, change_percent)
+            elif kind == 'losers':
+                score = np.where(np.isnan(change_percent), -np.inf, -change_percent)
+            else:
+                score = self._volume[:n].astype(np.float64)
+
+            k = min(k, n)
+            rows = np.argpartition(-score, k - 1)[:k] if k < n else np.arange(n)
+            rows = rows[np.argsort(-score[rows], kind='stable')]
+            rows = rows[np.isfinite(score[rows])]
+
+            return [
+                {
+                    'symbol': self._symbols[i],
+                    'price': float(self._price[i]),
+                    'change': float(self._change[i]),
+                    'changePercent': float(self._change_percent[i]),
+                    'volume': int(self._volume[i]),
+                }
+                for i in rows.tolist()
+            ]
+
+
+if __name__ == "__main__":
+    # Benchmark: incremental updates and top-k queries on a large universe
+    import timeit
+
+    rng = np.random.default_rng(0)
+    n = 10_000
+    symbols = [f"SYM{i}" for i in range(n)]
+    table = MoversTable(symbols)
+
+    def snapshot(size):
+        picked = rng.choice(n, size=size, replace=False)
+        return {
+            symbols[i]: {'price': 100.0, 'change': 1.0,
+                         'changePercent': float(rng.normal(0, 2)),
+                         'volume': int(rng.integers(1e5, 1e8))}
+            for i in picked
+        }
+
+    table.update(snapshot(n))
+    delta = snapshot(500)
+    runs = 200
+    t_update = timeit.timeit(lambda: table.update(delta), number=runs) / runs * 1000
+    print(f"update 500 of {n} symbols: {t_update:.3f} ms")
+    for kind in KINDS:
+        t_top = timeit.timeit(lambda: table.top(kind, 10), number=runs) / runs * 1000
+        print(f"top-10 {kind:<8}: {t_top:.3f} ms")
@@ -0,0 +1,287 @@
+"""
+Array-backed portfolio valuation and risk.
+
+`PortfolioBook` stores the positions of many portfolios CSR-style: one flat
+array each for symbol column, shares and cost basis, with `indptr` marking
+where each portfolio's positions start. Revaluing every portfolio against a
+price snapshot is one gather and one bincount. The risk metrics come from a
+single sparse (portfolios x symbols) @ (symbols x dates) product over the
+local price store, which gives every portfolio's value history at once.
+
+Risk assumes today's holdings were held over the whole window. That is what
+the sandbox shows: how risky the current portfolio is, not past trades.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+TRADING_DAYS = 252
+VAR_QUANTILE = 0.05
+
+
+def positions_from_transactions(transactions) -> dict:
+    """symbol -> (shares, cost basis) from sandbox Buy/Sell transactions, at average cost"""
+    positions = {}
+    for tx in sorted(transactions, key=lambda t: t.get('date', '')):
+        symbol = tx['symbol'].upper()
+        quantity = float(tx['quantity'])
+        shares, cost = positions.get(symbol, (0.0, 0.0))
+        if tx['action'].lower() == 'buy':
+            shares, cost = shares + quantity, cost + quantity * float(tx['price'])
+        else:
+            sold = min(quantity, shares)
+            cost = cost * (1 - sold / shares) if shares else 0.0
+            shares -= sold
+        positions[symbol] = (shares, cost)
+    return {s: p for s, p in positions.items() if p[0] > 0}
+
+
+class PortfolioBook:
+    """Positions of many portfolios in flat CSR arrays"""
+
+    def __init__(self):
+        self.ids = []
+        self.symbols = []
+        self._symbol_index = {}
+        self._cash = []
+        self._indptr = [0]
+        self._columns = []
+        self._shares = []
+        self._cost = []
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, portfolio_id, holdings: dict, cash: float = 0.0):
+        """Append a portfolio given {symbol: (shares, cost basis)}"""
+        for symbol, (shares, cost) in holdings.items():
+            symbol = symbol.upper()
+            if symbol not in self._symbol_index:
+                self._symbol_index[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+            self._columns.append(self._symbol_index[symbol])
+            self._shares.append(shares)
+            self._cost.append(cost)
+        self.ids.append(portfolio_id)
+        self._cash.append(cash)
+        self._indptr.append(len(self._columns))
+        self._arrays = None
+
+    @classmethod
+    def from_payload(cls, portfolios: list) -> 'PortfolioBook':
+        """Build from API payloads: {id, cash, holdings: [{symbol, shares, costBasis}]} or
+        {id, cash, transactions: [...]} as recorded by the sandbox"""
+        book = cls()
+        for i, p in enumerate(portfolios):
+            if 'transactions' in p:
+                holdings = positions_from_transactions(p['transactions'])
+            else:
+                holdings = {h['symbol']: (float(h['shares']), float(h.get('costBasis', 0.0)))
+                            for h in p.get('holdings', [])}
+            book.add(p.get('id', i), holdings, float(p.get('cash', 0.0)))
+        return book
+
+    def arrays(self) -> dict:
+        """The book as NumPy arrays (cached until the next add)"""
+        if self._arrays is None:
+            indptr = np.asarray(self._indptr, dtype=np.int64)
+            self._arrays = {
+                'indptr': indptr,
+                'columns': np.asarray(self._columns, dtype=np.int64),
+                'shares': np.asarray(self._shares, dtype=np.float64),
+                'cost': np.asarray(self._cost, dtype=np.float64),
+                'cash': np.asarray(self._cash, dtype=np.float64),
+                # Portfolio row of every position
+                'rows': np.repeat(np.arange(len(self.ids)), np.diff(indptr)),
+            }
+        return self._arrays
+
+    def matrix(self) -> sparse.csr_matrix:
+        """(portfolios x symbols) sparse matrix of shares"""
+        a = self.arrays()
+        return sparse.csr_matrix((a['shares'], a['columns'], a['indptr']),
+                                 shape=(len(self.ids), len(self.symbols)))
+
+    def value(self, prices: np.ndarray) -> dict:
+        """Revalue every portfolio against `prices` (aligned with self.symbols)
+
+        Positions without a price are carried at cost.
+        """
+        a = self.arrays()
+        n = len(self.ids)
+        position_price = np.asarray(prices, dtype=np.float64)[a['columns']]
+        position_value = np.where(np.isnan(position_price), a['cost'], a['shares'] * position_price)
+        holdings = np.bincount(a['rows'], weights=position_value, minlength=n)
+        cost = np.bincount(a['rows'], weights=a['cost'], minlength=n)
+        gain = holdings - cost
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gain_percent = np.where(cost > 0, gain / cost * 100, 0.0)
+        return {
+            'holdings_value': holdings, 'total_value': holdings + a['cash'], 'cash': a['cash'],
+            'cost': cost, 'gain': gain, 'gain_percent': gain_percent,
+            'position_price': position_price, 'position_value': position_value,
+        }
+
+    def value_history(self, closes: pd.DataFrame, fallback_prices=None) -> np.ndarray:
+        """(portfolios x dates) value of today's holdings plus cash over `closes`
+
+        `closes` is a dates x symbols frame (PriceStore.panel). Gaps are filled
+        forward, then backward; symbols with no history at all stay at
+        `fallback_prices` (or zero).
+        """
+        P = closes.reindex(columns=self.symbols).ffill().bfill()
+        if fallback_prices is not None:
+            P = P.fillna(pd.Series(np.asarray(fallback_prices, dtype=np.float64), index=self.symbols))
+        P = P.fillna(0.0).to_numpy(dtype=np.float64)
+        return np.asarray(self.matrix() @ P.T) + self.arrays()['cash'][:, None]
+
+    def risk(self, closes: pd.DataFrame, benchmark: pd.Series | None = None,
+             fallback_prices=None) -> dict:
+        """Return, annualized volatility, max drawdown, beta and 1-day historical VaR per portfolio"""
+        n = len(self.ids)
+        if len(closes) < 2:
+            nan = np.full(n, np.nan)
+            return {'return': nan, 'volatility': nan, 'max_drawdown': nan, 'beta': nan, 'var': nan}
+
+        V = self.value_history(closes, fallback_prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = V[:, 1:] / V[:, :-1] - 1
+            r[~np.isfinite(r)] = 0.0
+            total_return = np.where(V[:, 0] > 0, V[:, -1] / V[:, 0] - 1, np.nan)
+            drawdown = V / np.maximum.accumulate(V, axis=1) - 1
+        drawdown[~np.isfinite(drawdown)] = 0.0
+
+        beta = np.full(n, np.nan)
+        if benchmark is not None:
+            rb = benchmark.reindex(closes.index).ffill().bfill().pct_change().to_numpy()[1:]
+            if np.isfinite(rb).all():
+                rb = rb - rb.mean()
+                var_b = rb @ rb
+                if var_b > 0:
+                    beta = (r - r.mean(axis=1, keepdims=True)) @ rb / var_b
+
+        return {
+            'return': total_return,
+            'volatility': r.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS),
+            'max_drawdown': drawdown.min(axis=1),
+            'beta': beta,
+            # Loss not exceeded on 95% of days, in dollars at today's value
+            'var': -np.quantile(r, VAR_QUANTILE, axis=1) * V[:, -1],
+        }
+
+
+def _rounded(values, digits=2) -> list:
+    """Round and turn NaN into None for JSON"""
+    values = np.round(np.asarray(values, dtype=np.float64), digits)
+    return [None if np.isnan(v) else v for v in values.tolist()]
+
+
+def valuation_records(book: PortfolioBook, valuation: dict, include_holdings: bool = True) -> list:
+    """API shape: the PortfolioSummary fields plus per-holding rows for PortfolioTable"""
+    a = book.arrays()
+    columns = {k: _rounded(valuation[k]) for k in ('total_value', 'cash', 'holdings_value',
+                                                  'gain', 'gain_percent')}
+    if include_holdings:
+        position_gain = valuation['position_value'] - a['cost']
+        position = {
+            'price': _rounded(valuation['position_price']),
+            'value': _rounded(valuation['position_value']),
+            'gainLoss': _rounded(position_gain),
+            'shares': a['shares'].tolist(),
+        }
+    records = []
+    for i, pid in enumerate(book.ids):
+        record = {
+            'id': pid,
+            'totalValue': columns['total_value'][i],
+            'cashBalance': columns['cash'][i],
+            'holdingsValue': columns['holdings_value'][i],
+            'totalGainLoss': columns['gain'][i],
+            'totalGainLossPercent': columns['gain_percent'][i],
+        }
+        if include_holdings:
+            record['holdings'] = [
+                {'symbol': book.symbols[a['columns'][j]], 'shares': position['shares'][j],
+                 'price': position['price'][j], 'value': position['value'][j],
+                 'gainLoss': position['gainLoss'][j]}
+                for j in range(a['indptr'][i], a['indptr'][i + 1])
+            ]
+        records.append(record)
+    return records
+
+
+def risk_records(book: PortfolioBook, risk: dict) -> list:
+    columns = {
+        'return': _rounded(np.asarray(risk['return']) * 100),
+        'volatility': _rounded(np.asarray(risk['volatility']) * 100),
+        'maxDrawdown': _rounded(np.asarray(risk['max_drawdown']) * 100),
+        'beta': _rounded(risk['beta'], 3),
+        'var95': _rounded(risk['var']),
+    }
+    return [{'id': pid, **{k: v[i] for k, v in columns.items()}} for i, pid in enumerate(book.ids)]
+
+
+def load_closes(symbols, period: str = '1y', max_workers: int = 8, store=None) -> pd.DataFrame:
+    """dates x symbols closes from the local price store, downloading only what's missing"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from forecasting.price_store import PriceStore, _period_start
+
+    store = store or PriceStore()
+
+    def ensure(symbol):
+        try:
+            store.history(symbol, period=period)
+        except Exception as e:
+            print(f"⚠️ No price history for {symbol}: {e}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(ensure, symbols))
+    return store.panel(symbols, 'Close', start=_period_start(period))
+
+
+if __name__ == "__main__":
+    import time
+
+    from forecasting.synthetic import synthetic_universe
+
+    n_portfolios, n_positions, n_symbols = 10_000, 50, 500
+    rng = np.random.default_rng(0)
+    histories = synthetic_universe(n_symbols, TRADING_DAYS)
+    closes = pd.DataFrame({t: df['Close'] for t, df in histories.items()})
+    universe = list(closes.columns)
+    benchmark = closes.mean(axis=1)
+    prices = closes.iloc[-1].to_numpy()
+
+    started = time.perf_counter()
+    book = PortfolioBook()
+    for pid in range(n_portfolios):
+        picks = rng.choice(n_symbols, n_positions, replace=False)
+        shares = rng.integers(1, 100, n_positions).astype(float)
+        book.add(pid, {universe[j]: (shares[k], shares[k] * prices[j] * rng.uniform(0.8, 1.2))
+                       for k, j in enumerate(picks)}, cash=1000.0)
+    book.arrays()
+    build_seconds = time.perf_counter() - started
+
+    aligned = prices[[universe.index(s) for s in book.symbols]]
+    started = time.perf_counter()
+    valuation = book.value(aligned)
+    value_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    risk = book.risk(closes, benchmark)
+    risk_seconds = time.perf_counter() - started
+
+    print(f"📊 {n_portfolios} portfolios x {n_positions} positions, {len(closes)} days")
+    print(f"   build book:  {build_seconds * 1000:8.1f} ms")
+    print(f"   revalue all: {value_seconds * 1000:8.1f} ms")
+    print(f"   risk all:    {risk_seconds * 1000:8.1f} ms")
+    print(f"✅ Portfolio 0: value ${valuation['total_value'][0]:,.2f}, "
+          f"vol {risk['volatility'][0]:.1%}, max DD {risk['max_drawdown'][0]:.1%}, "
+          f"beta {risk['beta'][0]:.2f}, VaR95 ${risk['var'][0]:,.2f}")
@@ -0,0 +1,179 @@
+"""
+Live price fan-out.
+
+`PriceHub` listens to the QuoteRefresher (one upstream poll per interval for
+the union of all watched symbols), keeps the latest snapshot in memory and
+pushes only the symbols whose quote changed to the clients subscribed to
+them. Each client holds a `Subscription` that coalesces pending updates, so a
+slow client gets the latest price rather than an ever-growing backlog.
+"""
+import threading
+import time
+from collections import Counter
+
+QUOTE_FIELDS = ('price', 'change', 'changePercent', 'volume')
+
+
+class Subscription:
+    """One connected client: its symbols and the updates it has not read yet"""
+
+    __slots__ = ('symbols', '_pending', '_cond', 'closed')
+
+    def __init__(self, symbols):
+        self.symbols = frozenset(symbols)
+        self._pending = {}
+        self._cond = threading.Condition(threading.Lock())
+        self.closed = False
+
+    def push(self, updates: dict):
+        with self._cond:
+            self._pending.update(updates)
+            self._cond.notify()
+
+    def get(self, timeout: float | None = None) -> dict:
+        """Block until updates arrive (or timeout); returns and clears them"""
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            updates, self._pending = self._pending, {}
+            return updates
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class PriceHub:
+    """Latest-snapshot cache with per-symbol subscriber fan-out"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._subscribers = {}
+        self._watch_counts = Counter()
+
+    def watched_symbols(self) -> list:
+        """Union of symbols any client is subscribed to (a refresher symbol source)"""
+        with self._lock:
+            return list(self._watch_counts)
+
+    def subscribe(self, symbols) -> Subscription:
+        """Register a client; it immediately receives the cached quotes it asked for"""
+        sub = Subscription(s.upper() for s in symbols)
+        with self._lock:
+            for symbol in sub.symbols:
+                self._subscribers.setdefault(symbol, set()).add(sub)
+                self._watch_counts[symbol] += 1
+            snapshot = {s: self._latest[s] for s in sub.symbols if s in self._latest}
+        if snapshot:
+            sub.push(snapshot)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            for symbol in sub.symbols:
+                subs = self._subscribers.get(symbol)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[symbol]
+                self._watch_counts[symbol] -= 1
+                if self._watch_counts[symbol] <= 0:
+                    del self._watch_counts[symbol]
+        sub.close()
+
+    def publish(self, quotes: dict) -> int:
+        """Refresher listener: diff against the cache and push changed symbols.
+
+        Returns the number of symbols that changed.
+        """
+        changed = {}
+        with self._lock:
+            for symbol, quote in quotes.items():
+                slim = {f: quote.get(f) for f in QUOTE_FIELDS}
+                if self._latest.get(symbol) != slim:
+                    self._latest[symbol] = slim
+                    changed[symbol] = slim
+
+            # Group per subscriber so each client is woken once per snapshot
+            deliveries = {}
+            for symbol, quote in changed.items():
+                for sub in self._subscribers.get(symbol, ()):
+                    deliveries.setdefault(sub, {})[symbol] = quote
+
+        for sub, updates in deliveries.items():
+            sub.push(updates)
+        return len(changed)
+
+
+if __name__ == "__main__":
+    # Load test: fake upstream, 1,000 subscribers, fan-out latency and memory per connection
+    import random
+    import tracemalloc
+
+    from quotes import QuoteRefresher
+
+    N_SYMBOLS, N_CLIENTS, SYMBOLS_PER_CLIENT, ROUNDS = 200, 1_000, 5, 10
+    rng = random.Random(0)
+    universe = [f"SYM{i}" for i in range(N_SYMBOLS)]
+    prices = {s: 100.0 for s in universe}
+    upstream_calls = []
+
+    def fake_upstream(symbols):
+        upstream_calls.append(len(symbols))
+        quotes = {}
+        for s in symbols:
+            # Roughly half the symbols move each tick
+            if rng.random() < 0.5:
+                prices[s] = round(prices[s] * (1 + rng.gauss(0, 0.002)), 2)
+            quotes[s] = {'price': prices[s], 'change': 0.0, 'changePercent': 0.0, 'volume': 0}
+        return quotes
+
+    hub = PriceHub()
+    refresher = QuoteRefresher([], interval=3600, fetch=fake_upstream)
+    refresher.add_symbol_source(hub.watched_symbols)
+    refresher.subscribe(hub.publish)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    subs = [hub.subscribe(rng.sample(universe, SYMBOLS_PER_CLIENT)) for _ in range(N_CLIENTS)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    per_conn = sum(stat.size_diff for stat in after.compare_to(before, 'filename')) / N_CLIENTS
+
+    latencies = []
+    latency_lock = threading.Lock()
+    published_at = [0.0]
+
+    def client(sub):
+        while not sub.closed:
+            if sub.get(timeout=1.0):
+                received = time.perf_counter()
+                with latency_lock:
+                    latencies.append(received - published_at[0])
+
+    threads = [threading.Thread(target=client, args=(sub,), daemon=True) for sub in subs]
+    for t in threads:
+        t.start()
+
+    publish_times = []
+    for _ in range(ROUNDS):
+        published_at[0] = time.perf_counter()
+        refresher.refresh_once()
+        publish_times.append(time.perf_counter() - published_at[0])
+        time.sleep(0.2)
+
+    for sub in subs:
+        hub.unsubscribe(sub)
+    for t in threads:
+        t.join(timeout=2)
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"clients: {N_CLIENTS} | upstream calls: {len(upstream_calls)} "
+          f"(max {max(upstream_calls)} symbols each)")
+    print(f"refresh+publish: {sum(publish_times) / ROUNDS * 1000:.2f} ms avg | deliveries: {len(latencies)}")
+    print(f"fan-out latency p50: {p50:.2f} ms | p99: {p99:.2f} ms")
+    print(f"memory per connection: {per_conn / 1024:.2f} KiB (excluding thread stacks)")
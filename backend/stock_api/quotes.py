@@ -0,0 +1,100 @@
+"""
+Background quote refresher.
+
+Polls upstream quotes for the whole symbol universe with one bulk download per
+interval and hands each snapshot to subscribed listeners (movers table, price
+hub, ...), so consumers never call Yahoo themselves.
+"""
+import threading
+import time
+import traceback
+
+from market_data import download_panel, quote_stats
+
+REFRESH_SECONDS = 60
+
+
+def fetch_quotes(symbols) -> dict:
+    """Default upstream: one yfinance bulk download for every symbol"""
+    return quote_stats(download_panel(symbols, period='1d'), symbols)
+
+
+class QuoteRefresher:
+    """Polls `fetch(symbols)` every `interval` seconds and notifies listeners.
+
+    Listeners are called as `listener(quotes)` with a dict of
+    symbol -> quote (see market_data.quote_stats) from the refresher thread.
+    """
+
+    def __init__(self, symbols, interval: float = REFRESH_SECONDS, fetch=fetch_quotes, name: str = 'quotes'):
+        self.symbols = list(symbols)
+        self.name = name
+        self.symbol_sources = []
+        self.interval = interval
+        self.fetch = fetch
+        self.last_refresh = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def add_symbol_source(self, source):
+        """Register a callable returning extra symbols to poll (e.g. watched by clients)"""
+        with self._lock:
+            self.symbol_sources.append(source)
+
+    def current_symbols(self) -> list:
+        """Base symbols plus everything the registered sources currently want"""
+        with self._lock:
+            sources = list(self.symbol_sources)
+        symbols = dict.fromkeys(self.symbols)
+        for source in sources:
+            symbols.update(dict.fromkeys(source()))
+        return list(symbols)
+
+    def refresh_once(self) -> dict:
+        """Fetch one snapshot and deliver it to every listener"""
+        started = time.perf_counter()
+        quotes = self.fetch(self.current_symbols())
+        self.last_refresh = time.time()
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(quotes)
+            except Exception as e:
+                print(f"⚠️ Listener for {self.name} failed: {e}")
+                traceback.print_exc()
+        print(f"🔄 Refreshed {len(quotes)} {self.name} in {time.perf_counter() - started:.2f}s")
+        return quotes
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_once()
+            except Exception as e:
+                print(f"❌ Refresh of {self.name} failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the polling thread (no-op if already running)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name.replace(' ', '-')}-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -1,15 +1,32 @@
 import sys
 import os
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import yfinance as yf
-from sklearn.preprocessing import RobustScaler
 from sklearn.metrics import mean_squared_error, r2_score
-from xgboost import XGBRegressor
-from datetime import date, timedelta
 import pandas as pd
 import numpy as np
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from forecasting.config import make_model, params_for
+from forecasting.multi_horizon import RollingState, training_set, recursive_forecast, future_dates
+from forecasting.forecasters import FORECASTERS, fit_predict, load_states, save_states, record_timings
+from forecasting.ensemble import BANDS, forecast_ensemble
+from market_data import get_info
+
+# Every value accepted for ?model=; 'ensemble' is served from the precomputed table
+MODELS = sorted([*FORECASTERS, 'ensemble'])
+FORECASTS_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db', 'forecasts.db')
+
+# Ensemble cache misses are filled off the request thread, one ticker at a time
+_ensemble_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ensemble')
+_ensemble_pending = set()
+_ensemble_lock = threading.Lock()
+
 def train_test_split(data, perc):
     """Split data into train/test - trains with the first (1-perc) and tests with the rest"""
     n = int(len(data) * (1 - perc))
@@ -17,8 +34,9 @@ def train_test_split(data, perc):
 
 def get_next_30_day_predictions(ticker, num_past_days_to_use="1y", forecast_days=30):
     """
-    Improved forecasting using the test set approach instead of iterative prediction.
-    Returns predictions for the next N days based on historical patterns.
+    Recursive multi-day forecast: a next-day return model is rolled forward one
+    business day at a time, updating the rolling features with each predicted close.
+    Returns (forecast_df, mse, r2) where the metrics come from a held-out last 20%.
     """
     
     print(f"📊 Fetching data for {ticker}...")
@@ -29,85 +47,46 @@ def get_next_30_day_predictions(ticker, num_past_days_to_use="1y", forecast_days
         print(f"⚠️ Insufficient data for {ticker}")
         return None, None, None
     
-    # --- Feature engineering ---
-    df['SMA_10'] = df['Close'].rolling(10).mean()
-    df['SMA_30'] = df['Close'].rolling(30).mean()
-    df['Volatility'] = df['Close'].rolling(10).std()
-    df['Volume_MA'] = df['Volume'].rolling(10).mean()
-    
-    # Create target - next day's closing price
-    df['target'] = df['Close'].shift(-1)
-    
-    # Drop NaN values
-    df.dropna(inplace=True)
+    # --- Feature engineering (scale-free features, next-day log return target) ---
+    history = df[['Open', 'High', 'Low', 'Close', 'Volume']].dropna()
+    X, y, close = training_set(history)
     
-    if len(df) < 50:
+    if len(X) < 50:
         print(f"⚠️ Insufficient data after feature engineering for {ticker}")
         return None, None, None
     
-    print(f"✅ Data prepared: {len(df)} rows")
-    
-    # Prepare training data
-    training_df = df.copy()
-    feature_cols = ['Open', 'High', 'Low', 'Close', 'Volume', 
-                    'SMA_10', 'SMA_30', 'Volatility', 'Volume_MA']
-    
-    # Split into train/test (use last 20% as test to simulate future predictions)
-    train_constant = 0.2  # Use 20% for test (simulates future)
-    train, test = train_test_split(training_df, train_constant)
-    
-    print(f"📈 Train size: {len(train)}, Test size: {len(test)}")
-    
-    # Scale features
-    scaler = RobustScaler()
-    train[feature_cols] = scaler.fit_transform(train[feature_cols])
-    test[feature_cols] = scaler.transform(test[feature_cols])
-    
-    # Train XGBoost model with better hyperparameters
-    model = XGBRegressor(
-        n_estimators=400,
-        learning_rate=0.1,
-        max_depth=6,
-        min_child_weight=1,
-        subsample=0.9,
-        colsample_bytree=0.9,
-        reg_alpha=0.01,
-        reg_lambda=0.01,
-        random_state=42
-    )
+    print(f"✅ Data prepared: {len(X)} rows")
+    
+    # Hold out the last 20% to measure next-day accuracy out of sample
+    train_constant = 0.2
+    n_train = int(len(X) * (1 - train_constant))
+    
+    print(f"📈 Train size: {n_train}, Test size: {len(X) - n_train}")
+    
+    # Tuned overrides from forecasting.tuning (ticker, else its sector), if any, else the defaults
+    params = params_for(ticker, get_info(ticker).get('sector'))
     
     print(f"🤖 Training model...")
-    model.fit(
-        train[feature_cols], 
-        train['target'],
-        eval_set=[(test[feature_cols], test['target'])],
-        verbose=False
-    )
-    
-    # Predict on test set
-    y_pred = model.predict(test[feature_cols])
-    y_test = test['target'].values
-    
-    # Calculate metrics
+    model = make_model(**params)
+    model.fit(X[:n_train], y[:n_train], verbose=False)
+    
+    # Metrics are on prices so they stay comparable with the old close-price model
+    y_pred = close[n_train:] * np.exp(model.predict(X[n_train:]))
+    y_test = close[n_train:] * np.exp(y[n_train:])
     mse = mean_squared_error(y_test, y_pred)
     r2 = r2_score(y_test, y_pred)
     
     print(f"📊 Model Performance - MSE: {mse:.2f}, R2: {r2:.4f}")
     
-    # Take the last N predictions as "forecast" for next N days
-    # This simulates what the model thinks the next N days will look like
-    forecast_predictions = y_pred[-min(forecast_days, len(y_pred)):]
-    
-    # Get the corresponding dates from the test set
-    test_dates = test.index[-len(forecast_predictions):]
-    
-    # Create future dates starting from the last date in the dataset
-    last_date = df.index[-1]
-    future_dates = [last_date + timedelta(days=i+1) for i in range(len(forecast_predictions))]
+    # Refit on everything, then roll forward from the latest bar
+    model = make_model(**params)
+    model.fit(X, y, verbose=False)
+    state = RollingState.from_histories([history])
+    forecast_predictions = recursive_forecast(model.predict, state, forecast_days)[0]
     
     # Create forecast DataFrame
     forecast_df = pd.DataFrame({
-        'Date': future_dates,
+        'Date': future_dates(history.index[-1], forecast_days),
         'Predicted_Close': forecast_predictions
     })
     
@@ -117,7 +96,170 @@ def get_next_30_day_predictions(ticker, num_past_days_to_use="1y", forecast_days
     
     return forecast_df, mse, r2
 
+def get_model_predictions(ticker, model="xgboost", num_past_days_to_use="1y", forecast_days=30):
+    """
+    Forecast with any registered model (xgboost, arima, prophet, ar, drift, naive).
+    xgboost goes through get_next_30_day_predictions; the others warm-start from
+    their last fit for this ticker. Returns (forecast_df, mse, r2); metrics are
+    only computed for xgboost.
+    """
+    if model == "xgboost":
+        return get_next_30_day_predictions(ticker, num_past_days_to_use, forecast_days)
+    if model == "ensemble":
+        return get_ensemble_predictions(ticker, num_past_days_to_use, forecast_days), None, None
+    if model not in FORECASTERS:
+        raise ValueError(f"Unknown model '{model}'")
+    
+    print(f"📊 Fetching data for {ticker}...")
+    df = yf.Ticker(ticker).history(period=num_past_days_to_use)
+    history = df[['Open', 'High', 'Low', 'Close', 'Volume']].dropna()
+    if history.empty:
+        print(f"⚠️ Insufficient data for {ticker}")
+        return None, None, None
+    
+    warm_start = load_states().get(model, {}).get(ticker)
+    print(f"🤖 Fitting {model} for {ticker} (warm start: {bool(warm_start)})...")
+    result = fit_predict(model, ticker, history, forecast_days, warm_start=warm_start)
+    if result['state']:
+        save_states({model: {ticker: result['state']}})
+    record_timings([{'ticker': ticker, 'model': model, 'fit_seconds': result['fit_seconds'],
+                     'predict_seconds': result['predict_seconds'],
+                     'warm_started': result['warm_started']}])
+    print(f"⏱️ {model} fit {result['fit_seconds']:.2f}s, predict {result['predict_seconds']:.2f}s")
+    
+    forecast_df = pd.DataFrame({
+        'Date': future_dates(history.index[-1], forecast_days),
+        'Predicted_Close': result['forecast']
+    })
+    return forecast_df, None, None
+
+def setup_forecasts_db(db_path=FORECASTS_DB):
+    """Tables for precomputed ensemble forecasts: one run row and horizon band rows per ticker"""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path)
+    band_cols = ', '.join(f'{name} REAL' for name in BANDS.values())
+    connection.executescript(f"""
+        CREATE TABLE IF NOT EXISTS ensemble_runs (
+            ticker TEXT PRIMARY KEY,
+            generated_at TEXT NOT NULL,
+            weights TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS ensemble_forecasts (
+            ticker TEXT NOT NULL,
+            date TEXT NOT NULL,
+            predicted_price REAL NOT NULL,
+            {band_cols},
+            PRIMARY KEY (ticker, date)
+        );
+    """)
+    return connection
+
+def save_ensemble_forecasts(forecasts, db_path=FORECASTS_DB):
+    """Replace the stored ensemble forecast of every ticker in {ticker: forecast_df}"""
+    generated_at = datetime.now().isoformat(timespec='seconds')
+    band_names = list(BANDS.values())
+    placeholders = ', '.join('?' * (3 + len(band_names)))
+    with setup_forecasts_db(db_path) as connection:
+        for ticker, df in forecasts.items():
+            connection.execute("DELETE FROM ensemble_forecasts WHERE ticker = ?", (ticker,))
+            dates = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
+            rows = zip([ticker] * len(df), dates, *(df[c].astype(float) for c in ['Predicted_Close', *band_names]))
+            connection.executemany(
+                f"INSERT INTO ensemble_forecasts (ticker, date, predicted_price, {', '.join(band_names)}) "
+                f"VALUES ({placeholders})", rows)
+            connection.execute("INSERT OR REPLACE INTO ensemble_runs VALUES (?, ?, ?)",
+                               (ticker, generated_at, json.dumps(df.attrs.get('weights', {}))))
+    connection.close()
+
+def load_ensemble_forecast(ticker, max_age_hours=24, db_path=FORECASTS_DB):
+    """The stored ensemble forecast frame (weights in df.attrs), or None if missing or stale"""
+    if not os.path.exists(db_path):
+        return None
+    connection = sqlite3.connect(db_path)
+    try:
+        run = connection.execute("SELECT generated_at, weights FROM ensemble_runs WHERE ticker = ?",
+                                 (ticker,)).fetchone()
+        if run is None or datetime.fromisoformat(run[0]) < datetime.now() - timedelta(hours=max_age_hours):
+            return None
+        df = pd.read_sql_query(
+            f"SELECT date AS Date, predicted_price AS Predicted_Close, {', '.join(BANDS.values())} "
+            "FROM ensemble_forecasts WHERE ticker = ? ORDER BY date", connection, params=(ticker,))
+    finally:
+        connection.close()
+    df['Date'] = pd.to_datetime(df['Date'])
+    df.attrs['weights'] = json.loads(run[1])
+    df.attrs['generated_at'] = run[0]
+    return df
+
+def get_ensemble_predictions(ticker, num_past_days_to_use="1y", forecast_days=30):
+    """
+    Ensemble forecast with bands, read from the batch job's table. When the
+    batch hasn't covered the ticker today, the XGBoost point forecast is
+    returned without band columns (df.attrs['bands_pending']) and the ensemble
+    is computed and stored in the background for the next request.
+    """
+    stored = load_ensemble_forecast(ticker)
+    if stored is not None and len(stored) >= forecast_days:
+        print(f"✅ Using precomputed ensemble forecast for {ticker} ({stored.attrs['generated_at']})")
+        return stored.iloc[:forecast_days]
+    
+    schedule_ensemble(ticker, num_past_days_to_use, forecast_days)
+    forecast_df, _, _ = get_next_30_day_predictions(ticker, num_past_days_to_use, forecast_days)
+    if forecast_df is not None:
+        forecast_df.attrs['bands_pending'] = True
+    return forecast_df
+
+def schedule_ensemble(ticker, num_past_days_to_use="1y", forecast_days=30):
+    """Compute and store one ticker's ensemble in the background (at most once in flight per ticker)"""
+    with _ensemble_lock:
+        if ticker in _ensemble_pending:
+            return
+        _ensemble_pending.add(ticker)
+    
+    def run():
+        try:
+            df = yf.Ticker(ticker).history(period=num_past_days_to_use)
+            history = df[['Open', 'High', 'Low', 'Close', 'Volume']].dropna()
+            forecasts = forecast_ensemble({ticker: history}, forecast_days, max_workers=1)
+            if ticker in forecasts:
+                save_ensemble_forecasts(forecasts)
+                print(f"✅ Stored background ensemble forecast for {ticker}")
+            else:
+                print(f"⚠️ No ensemble forecast for {ticker}")
+        except Exception as e:
+            print(f"⚠️ Background ensemble failed for {ticker}: {e}")
+        finally:
+            with _ensemble_lock:
+                _ensemble_pending.discard(ticker)
+    
+    print(f"🔮 Ensemble for {ticker} not precomputed, computing it in the background")
+    _ensemble_executor.submit(run)
+
+def run_ensemble_batch(tickers, period="2y", forecast_days=30, max_workers=None):
+    """Precompute ensemble forecasts and bands for many tickers from the local price store"""
+    from forecasting.price_store import PriceStore
+    
+    store = PriceStore()
+    histories = {}
+    for ticker in tickers:
+        try:
+            histories[ticker] = store.history(ticker, period=period)
+        except Exception as e:
+            print(f"⚠️ Skipping {ticker}: {e}")
+    
+    print(f"🔮 Ensemble forecasting {len(histories)} tickers...")
+    forecasts = forecast_ensemble(histories, forecast_days, max_workers=max_workers)
+    save_ensemble_forecasts(forecasts)
+    print(f"✅ Stored {len(forecasts)} ensemble forecasts in {FORECASTS_DB}")
+    return forecasts
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--ensemble':
+        # Daily batch: python save_forecasting_to_db.py --ensemble [TICKER ...]
+        from market_data import load_universe
+        run_ensemble_batch(sys.argv[2:] or load_universe())
+        sys.exit(0)
+    
     # Test the function
     ticker = 'AAPL'
     print(f"Testing forecast for {ticker}...\n")
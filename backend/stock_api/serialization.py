@@ -0,0 +1,154 @@
+"""
+Column-wise serialization of price and forecast DataFrames into API response shapes.
+
+Rounding, date formatting and type conversion run once per column with NumPy
+instead of once per row, and responses are encoded with orjson when it is
+installed (falling back to the stdlib json module otherwise).
+"""
+import json
+
+import numpy as np
+import pandas as pd
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def format_dates(index) -> list:
+    """Format a DatetimeIndex (tz-aware or naive) as 'YYYY-MM-DD' strings"""
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is not None:
+        # Drop the timezone but keep the exchange-local wall time, like strftime did
+        idx = idx.tz_localize(None)
+    days = idx.values.astype('datetime64[D]')
+    return np.datetime_as_string(days, unit='D').tolist()
+
+
+def history_to_chart_data(history: pd.DataFrame) -> list:
+    """Convert a yfinance history frame to [{'date', 'price', 'volume'}, ...]"""
+    if history is None or history.empty:
+        return []
+
+    close = history['Close'].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(close)
+    if not valid.all():
+        history = history[valid]
+        close = close[valid]
+
+    dates = format_dates(history.index)
+    prices = np.round(close, 2).tolist()
+    volumes = np.nan_to_num(history['Volume'].to_numpy(dtype=np.float64)).astype(np.int64).tolist()
+
+    return [
+        {'date': d, 'price': p, 'volume': v}
+        for d, p, v in zip(dates, prices, volumes)
+    ]
+
+
+def _first_column(df: pd.DataFrame, names):
+    for name in names:
+        if name in df.columns:
+            return df[name]
+    return None
+
+
+def forecast_to_records(predict_df: pd.DataFrame) -> list:
+    """Convert a forecast frame to [{'date', 'price'}, ...]
+
+    Accepts the 'Date'/'Predicted_Close' columns returned by
+    get_next_30_day_predictions as well as 'date'/'predicted_price'/'price'.
+    """
+    if predict_df is None or predict_df.empty:
+        return []
+
+    date_col = _first_column(predict_df, ('Date', 'date'))
+    price_col = _first_column(predict_df, ('Predicted_Close', 'predicted_price', 'price'))
+    if price_col is None:
+        return []
+
+    prices = np.round(price_col.to_numpy(dtype=np.float64), 2).tolist()
+    if date_col is None:
+        dates = [''] * len(prices)
+    else:
+        dates = format_dates(pd.to_datetime(date_col))
+
+    return [{'date': d, 'price': p} for d, p in zip(dates, prices)]
+
+
+def forecast_bands_to_records(predict_df: pd.DataFrame) -> list:
+    """Prediction bands of an ensemble forecast frame as [{'date', 'lower_90', ...}, ...]
+
+    Returns [] for frames without band columns (every single-model forecast).
+    """
+    if predict_df is None or predict_df.empty:
+        return []
+    band_cols = [c for c in ('lower_90', 'lower_50', 'upper_50', 'upper_90') if c in predict_df.columns]
+    if not band_cols:
+        return []
+
+    dates = format_dates(pd.to_datetime(predict_df['Date']))
+    columns = {c: np.round(predict_df[c].to_numpy(dtype=np.float64), 2).tolist() for c in band_cols}
+    return [{'date': d, **{c: columns[c][i] for c in band_cols}} for i, d in enumerate(dates)]
+
+
+def dumps(payload) -> bytes:
+    """Encode a payload to JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_json_default).encode('utf-8')
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_response(payload, status: int = 200) -> Response:
+    """Drop-in replacement for flask.jsonify backed by the fast encoder"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def _legacy_chart_data(history: pd.DataFrame) -> list:
+    chart_data = []
+    for index, row in history.iterrows():
+        chart_data.append({
+            'date': index.strftime('%Y-%m-%d'),
+            'price': round(float(row['Close']), 2),
+            'volume': int(row['Volume'])
+        })
+    return chart_data
+
+
+def _synthetic_history(n_points: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    index = pd.date_range(end='2024-01-01', periods=n_points, freq='D', tz='America/New_York')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_points)))
+    return pd.DataFrame({
+        'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+        'Volume': rng.integers(1_000_000, 50_000_000, n_points).astype(float),
+    }, index=index)
+
+
+if __name__ == "__main__":
+    # Microbenchmark: per-request chart serialization cost (build + encode)
+    import timeit
+
+    encoder = 'orjson' if orjson is not None else 'json'
+    for n_points in (1_000, 10_000):
+        history = _synthetic_history(n_points)
+        assert _legacy_chart_data(history) == history_to_chart_data(history)
+
+        legacy = lambda: json.dumps(_legacy_chart_data(history))
+        fast = lambda: dumps(history_to_chart_data(history))
+
+        runs = 20
+        legacy_ms = min(timeit.repeat(legacy, number=runs, repeat=3)) / runs * 1000
+        fast_ms = min(timeit.repeat(fast, number=runs, repeat=3)) / runs * 1000
+        print(f"{n_points:>6} points | iterrows+json: {legacy_ms:8.2f} ms | "
+              f"vectorized+{encoder}: {fast_ms:6.2f} ms | {legacy_ms / fast_ms:5.1f}x")
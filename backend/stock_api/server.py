@@ -1,11 +1,28 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import yfinance as yf
 import os
-import json
-from save_forecasting_to_db import get_next_30_day_predictions
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from save_forecasting_to_db import get_model_predictions, MODELS
+from serialization import (history_to_chart_data, forecast_to_records, forecast_bands_to_records,
+                           format_dates, json_response, dumps)
+from downsample import chart_indices, lttb
+from market_data import (timeframe_for_days, get_info, info_fields,
+                         download_panel, symbol_frame, quote_stats, load_universe)
+from quotes import QuoteRefresher, fetch_quotes
+from movers import MoversTable, KINDS as MOVER_KINDS
+from price_hub import PriceHub
+from portfolio import PortfolioBook, valuation_records, risk_records, load_closes
+from forecasting.strategies import STRATEGIES, SIZINGS, backtest_strategy
+from forecasting.price_store import PriceStore
+from forecasting.correlation import CorrelationService
+from forecasting.screener import Screener, ScreenerError
+from webScraper.search import DB_PATH as NEWS_DB_PATH, connect as news_connect, ensure_fts, search_articles, news_items
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+import threading
 import traceback
+import sqlite3
+import numpy as np
+import pandas as pd
 
 app = Flask(__name__)
 
@@ -18,6 +35,46 @@ else:
 # Thread pool for async tasks
 executor = ThreadPoolExecutor(max_workers=4)
 
+# Universe-wide quotes polled once per interval and shared by all consumers
+universe = load_universe()
+quote_refresher = QuoteRefresher(universe, interval=int(os.getenv('QUOTE_REFRESH_SECONDS', 60)))
+movers_table = MoversTable(universe)
+quote_refresher.subscribe(movers_table.update)
+price_hub = PriceHub()
+quote_refresher.add_symbol_source(price_hub.watched_symbols)
+quote_refresher.subscribe(price_hub.publish)
+
+# One store per process so its listeners (correlations, ...) see every ingested bar
+price_store = PriceStore()
+
+# Completed daily bars for the whole universe, appended to the store every interval so its
+# listeners stay current for symbols nobody requests (started with the correlation/screener services)
+BAR_REFRESH_SECONDS = int(os.getenv('BAR_REFRESH_SECONDS', 6 * 3600))
+
+def fetch_daily_bars(symbols):
+    """symbol -> last few daily bars, from one bulk download"""
+    panel = download_panel(symbols, period='5d')
+    return {s: symbol_frame(panel, s) for s in symbols}
+
+def ingest_daily_bars(bars_by_symbol):
+    """Append completed sessions to every stored history, then apply the day to the correlations"""
+    stored = set(price_store.tickers())
+    today = pd.Timestamp.today().normalize()
+    for symbol, bars in bars_by_symbol.items():
+        if bars.empty or symbol.upper() not in stored:
+            continue  # histories that were never loaded are back-filled by PriceStore.history
+        dates = pd.DatetimeIndex(bars.index)
+        dates = dates.tz_localize(None) if dates.tz is not None else dates
+        price_store.append(symbol, bars[dates.normalize() < today])  # today's bar is still forming
+    if correlation_service is not None:
+        correlation_service.flush()
+
+bar_refresher = QuoteRefresher(universe, interval=BAR_REFRESH_SECONDS, fetch=fetch_daily_bars, name='daily bars')
+bar_refresher.subscribe(ingest_daily_bars)
+
+STREAM_MAX_SYMBOLS = 50
+STREAM_KEEPALIVE_SECONDS = 15
+
 @app.route('/api/stocks', methods=['GET'])
 def get_stocks():
     # Get pagination parameters from query string
@@ -79,12 +136,12 @@ def get_stocks():
         'hasMore': (offset + limit) < len(symbols)
     })
 
-def get_forecast_with_timeout(symbol, timeout=None):
+def get_forecast_with_timeout(symbol, timeout=None, model='xgboost'):
     """Run forecast without timeout"""
     try:
-        print(f"🔮 Running forecast for {symbol} (no timeout)...")
+        print(f"🔮 Running {model} forecast for {symbol} (no timeout)...")
         # Pass symbol string, not ticker object
-        result = get_next_30_day_predictions(symbol)
+        result = get_model_predictions(symbol, model=model)
         return result
     except Exception as e:
         print(f"❌ Forecast error: {e}")
@@ -96,28 +153,22 @@ def get_stock_detail(symbol):
     try:
         # Get timeframe from query params (default to 1 month)
         days = request.args.get('days', default=30, type=int)
+        # Optional cap on chart points; larger series are downsampled with LTTB
+        max_points = request.args.get('maxPoints', default=None, type=int)
+        # Forecasting model (xgboost, arima, prophet, ar, drift, naive, ensemble)
+        model = request.args.get('model', default='xgboost')
+        if model not in MODELS:
+            return jsonify({'error': f'model must be one of {MODELS}'}), 400
+        if max_points is not None and max_points < 1:
+            return jsonify({'error': 'maxPoints must be a positive integer'}), 400
         
         print(f"📊 Fetching stock detail for {symbol}...")
         
         ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = get_info(symbol)
         
         # Get historical data based on timeframe
-        if days <= 7:
-            period = '5d'
-            interval = '1h'
-        elif days <= 30:
-            period = '1mo'
-            interval = '1d'
-        elif days <= 90:
-            period = '3mo'
-            interval = '1d'
-        elif days <= 365:
-            period = '1y'
-            interval = '1d'
-        else:
-            period = 'max'
-            interval = '1wk'
+        period, interval = timeframe_for_days(days)
         
         history = ticker.history(period=period, interval=interval)
         
@@ -133,22 +184,20 @@ def get_stock_detail(symbol):
         change_percent = (change / open_price) * 100
         
         # Format historical data for chart
-        chart_data = []
-        for index, row in history.iterrows():
-            chart_data.append({
-                'date': index.strftime('%Y-%m-%d'),
-                'price': round(float(row['Close']), 2),
-                'volume': int(row['Volume'])
-            })
+        if max_points is not None:
+            history = history.iloc[chart_indices(symbol, period, interval, history, max_points)]
+        chart_data = history_to_chart_data(history)
         
         print(f"✅ Historical data: {len(chart_data)} points")
         
         # Get forecast data (no timeout - let it take as long as needed)
         print(f"🔮 Starting forecast for {symbol}... (this may take a while)")
         forecast_data = []
+        forecast_bands = []
+        forecast_weights = None
         
         # Pass the symbol string, not the ticker object
-        predict_df, mse, r2 = get_forecast_with_timeout(symbol)
+        predict_df, mse, r2 = get_forecast_with_timeout(symbol, model=model)
         
         if predict_df is not None and not predict_df.empty:
             print(f"✅ Forecast successful: {len(predict_df)} points")
@@ -157,26 +206,10 @@ def get_stock_detail(symbol):
             
             # Convert pandas DataFrame to list of dictionaries
             try:
-                forecast_data = json.loads(predict_df.to_json(orient='records', date_format='iso'))
-                
-                # Format each forecast point - handle your actual column names
-                formatted_forecast = []
-                for item in forecast_data:
-                    # Your function returns 'Date' and 'Predicted_Close'
-                    date_val = item.get('Date', item.get('date', ''))
-                    price_val = item.get('Predicted_Close', item.get('predicted_price', item.get('price', 0)))
-                    
-                    # Convert timestamp to date string if needed
-                    if isinstance(date_val, (int, float)):
-                        from datetime import datetime
-                        date_val = datetime.fromtimestamp(date_val / 1000).strftime('%Y-%m-%d')
-                    
-                    formatted_forecast.append({
-                        'date': date_val,
-                        'price': round(float(price_val), 2)
-                    })
-                
-                forecast_data = formatted_forecast
+                forecast_data = forecast_to_records(predict_df)
+                # null while a missed ensemble is still being computed in the background
+                forecast_bands = None if predict_df.attrs.get('bands_pending') else forecast_bands_to_records(predict_df)
+                forecast_weights = predict_df.attrs.get('weights')
                 print(f"📈 Forecast formatted: {len(forecast_data)} points")
                 print(f"📊 Sample formatted data: {forecast_data[:2]}")
             except Exception as e:
@@ -188,7 +221,6 @@ def get_stock_detail(symbol):
         
         response_data = {
             'symbol': symbol,
-            'company': info.get('longName', symbol),
             'price': round(current_price, 2),
             'change': round(change, 2),
             'changePercent': round(change_percent, 2),
@@ -196,26 +228,467 @@ def get_stock_detail(symbol):
             'high': round(float(today_history['High'].max()), 2) if not today_history.empty else 0,
             'low': round(float(today_history['Low'].min()), 2) if not today_history.empty else 0,
             'volume': int(today_history['Volume'].iloc[-1]) if not today_history.empty else 0,
-            'avgVolume': int(info.get('averageVolume', 0)),
-            'fiftyTwoWeekHigh': round(float(info.get('fiftyTwoWeekHigh', 0)), 2),
-            'fiftyTwoWeekLow': round(float(info.get('fiftyTwoWeekLow', 0)), 2),
-            'marketCap': info.get('marketCap', 0),
-            'peRatio': round(float(info.get('trailingPE', 0)), 2) if info.get('trailingPE') else 0,
-            'dividendYield': info.get('dividendYield', 0),
-            'sector': info.get('sector', 'N/A'),
-            'industry': info.get('industry', 'N/A'),
+            **info_fields(symbol, info),
             'chartData': chart_data,
-            'forecastData': forecast_data
+            'forecastModel': model,
+            'forecastData': forecast_data,
+            'forecastBands': forecast_bands,
+            'forecastWeights': forecast_weights
         }
         
         print(f"🎉 Response ready for {symbol}")
-        return jsonify(response_data)
+        return json_response(response_data)
         
     except Exception as e:
         print(f"❌ Error fetching {symbol}: {e}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+BATCH_MAX_SYMBOLS = 200
+BATCH_FIELDS = {'quote', 'info', 'chart', 'forecast'}
+
+def _body_int(body, key, default):
+    """Positive int from a JSON body, like the query string's type=int; ValueError otherwise"""
+    value = body.get(key, default)
+    if value is None:
+        return default
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        raise ValueError(f'{key} must be a positive integer')
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{key} must be a positive integer') from None
+    if value <= 0:
+        raise ValueError(f'{key} must be a positive integer')
+    return value
+
+@app.route('/api/stocks/batch', methods=['POST'])
+def get_stocks_batch():
+    """
+    Details for many symbols in one request, streamed as NDJSON (one symbol per line).
+
+    Body: {"symbols": [...], "fields": ["quote", "info", "chart", "forecast"],
+           "days": 30, "maxPoints": 250, "model": "xgboost"}
+    Quotes and charts come from shared bulk downloads; info and forecasts are
+    resolved concurrently and each line is flushed as soon as its symbol is done.
+    """
+    body = request.get_json(silent=True) or {}
+    symbols = list(dict.fromkeys(str(s).upper() for s in body.get('symbols', []) if s))
+    fields = set(body.get('fields') or ['quote', 'info'])
+    model = body.get('model', 'xgboost')
+    try:
+        days = _body_int(body, 'days', 30)
+        max_points = _body_int(body, 'maxPoints', None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not symbols:
+        return jsonify({'error': 'symbols is required'}), 400
+    if len(symbols) > BATCH_MAX_SYMBOLS:
+        return jsonify({'error': f'At most {BATCH_MAX_SYMBOLS} symbols per batch'}), 400
+    if not fields <= BATCH_FIELDS:
+        return jsonify({'error': f'Unknown fields: {sorted(fields - BATCH_FIELDS)}'}), 400
+    if model not in MODELS:
+        return jsonify({'error': f'model must be one of {MODELS}'}), 400
+
+    print(f"📦 Batch request: {len(symbols)} symbols, fields={sorted(fields)}")
+
+    # Shared bulk fetches: one download for today's quotes, one for charts
+    quotes = {}
+    if 'quote' in fields:
+        quotes = quote_stats(download_panel(symbols, period='1d'), symbols)
+
+    chart_panel = None
+    if 'chart' in fields:
+        period, interval = timeframe_for_days(days)
+        chart_panel = download_panel(symbols, period=period, interval=interval)
+
+    def resolve(symbol):
+        record = {'symbol': symbol}
+        if 'quote' in fields:
+            if symbol not in quotes:
+                return {'symbol': symbol, 'error': 'No data available for this symbol'}
+            record.update(quotes[symbol])
+        if 'info' in fields:
+            record.update(info_fields(symbol, get_info(symbol)))
+        if chart_panel is not None:
+            history = symbol_frame(chart_panel, symbol)
+            if max_points and not history.empty:
+                history = history.iloc[chart_indices(symbol, period, interval, history, max_points)]
+            record['chartData'] = history_to_chart_data(history)
+        if 'forecast' in fields:
+            predict_df, mse, r2 = get_forecast_with_timeout(symbol, model=model)
+            record['forecastData'] = forecast_to_records(predict_df)
+            record['forecastBands'] = (None if predict_df is not None and predict_df.attrs.get('bands_pending')
+                                       else forecast_bands_to_records(predict_df))
+        return record
+
+    def generate():
+        futures = {executor.submit(resolve, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                print(f"❌ Batch error for {futures[future]}: {e}")
+                record = {'symbol': futures[future], 'error': str(e)}
+            yield dumps(record) + b'\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/movers', methods=['GET'])
+def get_movers():
+    """Top gainers/losers/most active across the whole universe"""
+    kind = request.args.get('kind', default='gainers')
+    limit = request.args.get('limit', default=10, type=int)
+    if kind not in MOVER_KINDS:
+        return jsonify({'error': f'kind must be one of {list(MOVER_KINDS)}'}), 400
+
+    # The first request waits for one snapshot; after that the refresher keeps it current
+    if quote_refresher.last_refresh is None:
+        quote_refresher.refresh_once()
+    quote_refresher.start()
+
+    return json_response({
+        'kind': kind,
+        'movers': movers_table.top(kind, limit),
+        'universe': len(movers_table),
+        'asOf': quote_refresher.last_refresh
+    })
+
+@app.route('/api/stream/prices', methods=['GET'])
+def stream_prices():
+    """
+    Server-Sent Events feed of live quotes: /api/stream/prices?symbols=AAPL,MSFT
+
+    Every browser shares the single upstream poll; each event carries only the
+    subscribed symbols whose quote changed since the last event.
+    """
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    if not symbols:
+        return jsonify({'error': 'symbols is required'}), 400
+    if len(symbols) > STREAM_MAX_SYMBOLS:
+        return jsonify({'error': f'At most {STREAM_MAX_SYMBOLS} symbols per stream'}), 400
+
+    quote_refresher.start()
+    sub = price_hub.subscribe(symbols)
+
+    def generate():
+        try:
+            while True:
+                updates = sub.get(timeout=STREAM_KEEPALIVE_SECONDS)
+                if sub.closed:
+                    break
+                if updates:
+                    yield b'data: ' + dumps(updates) + b'\n\n'
+                else:
+                    yield b': keepalive\n\n'
+        finally:
+            # Runs when the client disconnects and the WSGI server closes the generator
+            price_hub.unsubscribe(sub)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(generate(), mimetype='text/event-stream', headers=headers)
+
+PORTFOLIO_MAX = 10000
+RISK_PERIODS = {'3mo', '6mo', '1y', '2y', '5y'}
+
+def _portfolio_book():
+    """PortfolioBook from the request body, or an error response"""
+    portfolios = (request.get_json(silent=True) or {}).get('portfolios')
+    if not isinstance(portfolios, list) or not portfolios:
+        return None, (jsonify({'error': 'portfolios must be a non-empty list'}), 400)
+    if len(portfolios) > PORTFOLIO_MAX:
+        return None, (jsonify({'error': f'At most {PORTFOLIO_MAX} portfolios per request'}), 400)
+    try:
+        return PortfolioBook.from_payload(portfolios), None
+    except (KeyError, TypeError, ValueError) as e:
+        return None, (jsonify({'error': f'Invalid portfolio: {e}'}), 400)
+
+def _latest_prices(symbols):
+    """Latest price per symbol from the shared quote snapshot, fetching only what it lacks"""
+    prices = movers_table.prices(symbols)
+    missing = [s for s, p in zip(symbols, prices) if p != p]
+    if missing:
+        movers_table.update(fetch_quotes(missing))
+        prices = movers_table.prices(symbols)
+    quote_refresher.start()
+    return prices
+
+@app.route('/api/portfolio/value', methods=['POST'])
+def value_portfolios():
+    """
+    Revalue many portfolios in one pass against the latest quotes.
+
+    Body: {"portfolios": [{"id": ..., "cash": 1000,
+                           "holdings": [{"symbol": "AAPL", "shares": 10, "costBasis": 1500}]
+                           or "transactions": [sandbox Transaction, ...]}],
+           "holdings": true}
+    """
+    book, error = _portfolio_book()
+    if error:
+        return error
+    include_holdings = (request.get_json(silent=True) or {}).get('holdings', True)
+
+    valuation = book.value(_latest_prices(book.symbols))
+    return json_response({
+        'portfolios': valuation_records(book, valuation, include_holdings),
+        'asOf': quote_refresher.last_refresh
+    })
+
+@app.route('/api/portfolio/risk', methods=['POST'])
+def portfolio_risk():
+    """
+    Return, volatility, max drawdown, beta and 1-day 95% VaR of current holdings.
+
+    Body: same portfolios as /api/portfolio/value, plus "period" (default 1y)
+    and "benchmark" (default SPY).
+    """
+    book, error = _portfolio_book()
+    if error:
+        return error
+    body = request.get_json(silent=True) or {}
+    period = body.get('period', '1y')
+    benchmark = body.get('benchmark', 'SPY').upper()
+    if period not in RISK_PERIODS:
+        return jsonify({'error': f'period must be one of {sorted(RISK_PERIODS)}'}), 400
+
+    closes = load_closes(list(dict.fromkeys([*book.symbols, benchmark])), period, store=price_store)
+    bench = closes[benchmark] if benchmark in closes.columns else None
+    risk = book.risk(closes, bench, fallback_prices=_latest_prices(book.symbols))
+    return json_response({
+        'period': period,
+        'benchmark': benchmark,
+        'portfolios': risk_records(book, risk)
+    })
+
+STRATEGY_PERIODS = {'1y', '2y', '5y', '10y'}
+STRATEGY_PARAMS = {'fast': int, 'slow': int, 'lookback': int, 'window': int, 'entry': float, 'short': bool}
+STRATEGY_CURVE_SYMBOLS = 10
+
+def _equity_records(dates, equity, max_points):
+    """LTTB-downsampled [{'date', 'value'}] of an equity curve"""
+    idx = lttb(np.arange(len(equity)), equity, max_points)
+    values = np.round(equity[idx], 4).tolist()
+    return [{'date': d, 'value': v} for d, v in zip(format_dates(dates[idx]), values)]
+
+def _metric_records(metrics):
+    """Per-column metric arrays -> JSON-ready lists of floats"""
+    names = {'total_return': 'totalReturn', 'cagr': 'cagr', 'sharpe': 'sharpe',
+             'max_drawdown': 'maxDrawdown', 'trades': 'trades', 'exposure': 'exposure'}
+    return {names[k]: np.round(np.asarray(v, dtype=np.float64), 4).tolist() for k, v in metrics.items()}
+
+@app.route('/api/strategy/backtest', methods=['GET'])
+def strategy_backtest():
+    """
+    Run one strategy over many symbols' history in a single vectorized pass.
+
+    /api/strategy/backtest?strategy=sma_crossover&fast=10&slow=30&symbols=AAPL,MSFT
+        &period=5y&costBps=5&sizing=equal&maxPoints=250
+    Without symbols the whole universe is used. Equity curves per symbol are
+    included for up to STRATEGY_CURVE_SYMBOLS symbols; the portfolio and the
+    buy-and-hold benchmark curves are always included.
+    """
+    strategy = request.args.get('strategy', default='sma_crossover')
+    period = request.args.get('period', default='5y')
+    sizing = request.args.get('sizing', default='equal')
+    cost_bps = request.args.get('costBps', default=5.0, type=float)
+    max_points = request.args.get('maxPoints', default=250, type=int)
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()] or universe
+    if strategy not in STRATEGIES:
+        return jsonify({'error': f'strategy must be one of {sorted(STRATEGIES)}'}), 400
+    if period not in STRATEGY_PERIODS:
+        return jsonify({'error': f'period must be one of {sorted(STRATEGY_PERIODS)}'}), 400
+    if sizing not in SIZINGS:
+        return jsonify({'error': f'sizing must be one of {list(SIZINGS)}'}), 400
+
+    params = {}
+    for name, cast in STRATEGY_PARAMS.items():
+        if name in request.args:
+            params[name] = request.args.get(name).lower() == 'true' if cast is bool else request.args.get(name, type=cast)
+    try:
+        closes = load_closes(symbols, period, store=price_store).dropna(how='all')
+        if len(closes) < 2:
+            return jsonify({'error': 'No price history available for these symbols'}), 404
+        close = closes.to_numpy(dtype=np.float64)
+        result = backtest_strategy(close, strategy, params, cost_bps, sizing)
+        benchmark = backtest_strategy(close, 'buy_and_hold', cost_bps=cost_bps)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    tickers = list(closes.columns)
+    per_ticker = _metric_records(result['metrics'])
+    rows = [{'symbol': t, **{k: v[i] for k, v in per_ticker.items()}} for i, t in enumerate(tickers)]
+    rows.sort(key=lambda r: r['totalReturn'], reverse=True)
+
+    response = {
+        'strategy': strategy, 'params': params, 'sizing': sizing, 'costBps': cost_bps,
+        'period': period, 'start': format_dates(closes.index[:1])[0], 'end': format_dates(closes.index[-1:])[0],
+        'portfolio': {**_metric_records(result['portfolio_metrics']),
+                      'equity': _equity_records(closes.index, result['portfolio_equity'], max_points)},
+        'benchmark': {**_metric_records(benchmark['portfolio_metrics']),
+                      'equity': _equity_records(closes.index, benchmark['portfolio_equity'], max_points)},
+        'results': rows,
+    }
+    if len(tickers) <= STRATEGY_CURVE_SYMBOLS:
+        response['curves'] = {t: _equity_records(closes.index, result['equity'][:, i], max_points)
+                              for i, t in enumerate(tickers)}
+    return json_response(response)
+
+correlation_service = None
+_correlation_lock = threading.Lock()
+
+def get_correlation_service():
+    """Open the persisted correlation matrix (building it on first use) and keep it fed by the daily ingest"""
+    global correlation_service
+    with _correlation_lock:
+        if correlation_service is None:
+            if CorrelationService.exists():
+                service = CorrelationService()
+                service.catch_up(price_store)  # bars stored while the server was down
+            else:
+                print(f"📊 Building correlation matrix for {len(universe)} symbols...")
+                service = CorrelationService.build(load_closes(universe, '6mo', store=price_store))
+            price_store.subscribe(service.on_bars)
+            correlation_service = service
+            bar_refresher.start()
+    return correlation_service
+
+@app.route('/api/correlations/<symbol>', methods=['GET'])
+def get_correlations(symbol):
+    """Most or least correlated symbols to `symbol` over the rolling window"""
+    kind = request.args.get('kind', default='most')
+    limit = request.args.get('limit', default=10, type=int)
+    if kind not in ('most', 'least'):
+        return jsonify({'error': "kind must be 'most' or 'least'"}), 400
+
+    service = get_correlation_service()
+    symbol = symbol.upper()
+    if symbol not in service.index:
+        return jsonify({'error': f'{symbol} is not in the correlation universe'}), 404
+
+    return json_response({
+        'symbol': symbol,
+        'kind': kind,
+        'window': service.window,
+        'asOf': format_dates([service.last_date])[0] if service.last_date is not None else None,
+        'results': service.most_correlated(symbol, limit, least=(kind == 'least'))
+    })
+
+screener = None
+_screener_lock = threading.Lock()
+SCREENER_MAX_LIMIT = 500
+
+def _load_fundamentals(table, symbols):
+    """Fill sector / market cap / P/E from the cached Ticker.info (runs in the background)"""
+    for symbol in symbols:
+        try:
+            info = get_info(symbol)
+            table.set_fundamentals(symbol, sector=info.get('sector'), marketCap=info.get('marketCap'),
+                                   pe=info.get('trailingPE'))
+        except Exception as e:
+            print(f"⚠️ No fundamentals for {symbol}: {e}")
+
+def get_screener():
+    """Build the screener table for the universe on first use; the daily bar ingest keeps it current"""
+    global screener
+    with _screener_lock:
+        if screener is None:
+            print(f"📊 Building screener table for {len(universe)} symbols...")
+            table = Screener(store=price_store, capacity=len(universe))
+            load_closes(universe, '1y', store=price_store)  # makes sure every history is stored
+            table.build({s: df for s in universe if (df := price_store.load(s)) is not None})
+            price_store.subscribe(table.on_bars)
+            executor.submit(_load_fundamentals, table, universe)
+            screener = table
+            bar_refresher.start()
+    return screener
+
+@app.route('/api/screener', methods=['GET'])
+def screen_stocks():
+    """
+    Filter the universe on indicator and fundamental columns.
+
+    /api/screener?filter=RSI < 30 and Close > SMA_30 and sector == 'Technology'
+        &sort=RSI&order=asc&limit=50&fields=symbol,Close,RSI
+    """
+    expression = request.args.get('filter', default='').strip() or None
+    sort = request.args.get('sort')
+    order = request.args.get('order', default='desc')
+    limit = max(0, min(request.args.get('limit', default=50, type=int), SCREENER_MAX_LIMIT))
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or None
+    if order not in ('asc', 'desc'):
+        return jsonify({'error': "order must be 'asc' or 'desc'"}), 400
+
+    table = get_screener()
+    try:
+        result = table.query(expression, sort, descending=(order == 'desc'), limit=limit, fields=fields)
+    except ScreenerError as e:
+        return jsonify({'error': str(e), 'columns': table.columns}), 400
+
+    return json_response({
+        'filter': expression,
+        'universe': len(table),
+        'asOf': table.updated_at.isoformat() if table.updated_at is not None else None,
+        **result
+    })
+
+news_search_ready = False
+_news_search_lock = threading.Lock()
+NEWS_MAX_LIMIT = 100
+
+def _epoch(value, end_of_day=False):
+    """Unix seconds from a date / datetime string or epoch number (None passes through)"""
+    if value is None or value == '':
+        return None
+    if value.isdigit():
+        return int(value)
+    ts = pd.Timestamp(value)
+    if end_of_day and ts == ts.normalize() and len(value) <= 10:
+        ts = ts + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    return int(ts.timestamp())
+
+@app.route('/api/news/search', methods=['GET'])
+def search_news():
+    """
+    Full-text search over scraped articles, best match first.
+
+    /api/news/search?q=earnings guidance&ticker=NVDA&start=2024-01-01&end=2024-03-31&limit=20
+    """
+    global news_search_ready
+    query = request.args.get('q', default='').strip() or None
+    ticker = request.args.get('ticker', default='').strip() or None
+    limit = max(1, min(request.args.get('limit', default=20, type=int), NEWS_MAX_LIMIT))
+    offset = max(request.args.get('offset', default=0, type=int), 0)
+    try:
+        start = _epoch(request.args.get('start'))
+        end = _epoch(request.args.get('end'), end_of_day=True)
+    except ValueError:
+        return jsonify({'error': 'start/end must be dates (YYYY-MM-DD) or unix seconds'}), 400
+
+    if not os.path.exists(NEWS_DB_PATH):
+        return jsonify({'error': 'No news database yet, run the scraper first'}), 503
+    connection = news_connect()
+    try:
+        if not news_search_ready:
+            with _news_search_lock:
+                if not news_search_ready:
+                    ensure_fts(connection)  # indexes existing articles once
+                    news_search_ready = True
+        rows = search_articles(query, ticker, start, end, limit, offset, connection=connection)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except sqlite3.OperationalError as e:
+        return jsonify({'error': f'News database unavailable: {e}'}), 503
+    finally:
+        connection.close()
+
+    return json_response({
+        'query': query,
+        'ticker': ticker.upper() if ticker else None,
+        'count': len(rows),
+        'results': news_items(rows, movers_table.change_percents)
+    })
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'message': 'API is running'})
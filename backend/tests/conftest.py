@@ -0,0 +1,9 @@
+import os
+import sys
+
+# backend/ for the packages; stock_api and webScraper modules import each other
+# flat, as when they are run from their own directories
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (BACKEND, os.path.join(BACKEND, 'stock_api'), os.path.join(BACKEND, 'webScraper')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
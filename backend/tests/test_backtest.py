@@ -0,0 +1,65 @@
+"""Walk-forward folds: contiguous test windows and no look-ahead in training."""
+import numpy as np
+import pytest
+
+from forecasting import backtest
+from forecasting.backtest import WARMUP_ROWS, walk_forward_splits
+
+
+def test_expanding_folds_tile_the_history():
+    splits = walk_forward_splits(1000, initial_train=250, step=63)
+    assert splits[0] == (0, 250, 313)
+    assert all(start == 0 for start, _, _ in splits)
+    for (_, _, test_end), (_, next_train_end, _) in zip(splits, splits[1:]):
+        assert next_train_end == test_end  # each test window starts where the last one ended
+    assert splits[-1][2] == 1000
+
+
+def test_rolling_folds_keep_a_fixed_window():
+    splits = walk_forward_splits(600, initial_train=200, step=100, window='rolling', train_size=150)
+    assert splits == [(50, 200, 300), (150, 300, 400), (250, 400, 500), (350, 500, 600)]
+
+
+def test_no_folds_without_enough_history():
+    assert walk_forward_splits(250, initial_train=250) == []
+    with pytest.raises(ValueError):
+        walk_forward_splits(500, window='sliding')
+
+
+class _RecordingModel:
+    """Stands in for XGBoost; column 0 of X carries the row index"""
+
+    fits = []
+
+    def __init__(self, **params):
+        pass
+
+    def fit(self, X, y, verbose=False):
+        _RecordingModel.fits.append(X[:, 0].astype(int))
+        return self
+
+    def predict(self, X):
+        return np.zeros(len(X))
+
+
+def test_training_rows_end_before_the_fold(monkeypatch):
+    n = 400
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    X = np.zeros((n, 7), dtype=np.float32)
+    X[:, 0] = np.arange(n)
+    arrays = {'X': X, 'log_return': np.append(np.diff(np.log(close)), np.nan), 'close': close,
+              'open': close, 'high': close, 'low': close, 'volume': np.full(n, 1e6)}
+    monkeypatch.setattr(backtest, 'make_model', _RecordingModel)
+    _RecordingModel.fits = []
+
+    folds = list(enumerate(walk_forward_splits(n, initial_train=150, step=50)))
+    rows = backtest._run_folds('T', arrays, folds, (1, 5), {})
+
+    assert len(_RecordingModel.fits) == len(folds)
+    for (_, (_, train_end, _)), trained in zip(folds, _RecordingModel.fits):
+        # Row t's target is close[t + 1], so the last usable row is train_end - 2
+        assert trained.min() >= WARMUP_ROWS
+        assert trained.max() == train_end - 2
+    for row in rows:
+        assert row['train_end'] <= row['test_end'] - row['n_test']
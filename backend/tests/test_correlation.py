@@ -0,0 +1,58 @@
+"""Incremental rolling correlations against a full recompute of the window."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting import correlation
+from forecasting.correlation import CorrelationService
+
+
+@pytest.fixture
+def closes():
+    rng = np.random.default_rng(0)
+    common = rng.normal(0, 0.01, (160, 1))
+    returns = common * rng.uniform(0, 1.5, 6) + rng.normal(0, 0.01, (160, 6))
+    index = pd.bdate_range('2024-01-01', periods=160)
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index,
+                        columns=[f"S{i}" for i in range(6)])
+
+
+def _expected(closes: pd.DataFrame, window: int) -> np.ndarray:
+    log_returns = np.log(closes / closes.shift(1)).to_numpy()[1:]
+    return np.corrcoef(log_returns[-window:].T)
+
+
+def test_pushed_days_match_full_recompute(closes, tmp_path, monkeypatch):
+    monkeypatch.setattr(correlation, 'REBUILD_EVERY', 10_000)  # only the rank-one updates
+    service = CorrelationService.build(closes.iloc[:70], window=40, root=str(tmp_path))
+    log_returns = np.log(closes / closes.shift(1)).to_numpy()
+    for t in range(70, len(closes)):
+        service.push(log_returns[t], closes.index[t])
+
+    expected = _expected(closes, 40)
+    for i, symbol in enumerate(service.symbols):
+        np.testing.assert_allclose(service.correlations(symbol), expected[i], atol=1e-9)
+    np.testing.assert_allclose(service.covariance(), np.cov(log_returns[-40:].T), atol=1e-12)
+
+
+def test_on_bars_applies_a_date_once_every_symbol_reports(closes, tmp_path):
+    service = CorrelationService.build(closes.iloc[:100], window=40, root=str(tmp_path))
+    day = closes.iloc[100:101]
+    for symbol in service.symbols[:-1]:
+        service.on_bars(symbol, day[[symbol]].rename(columns={symbol: 'Close'}))
+    assert service.last_date == closes.index[99]
+    service.on_bars('S5', day[['S5']].rename(columns={'S5': 'Close'}))
+    assert service.last_date == closes.index[100]
+
+    expected = _expected(closes.iloc[:101], 40)
+    np.testing.assert_allclose(service.correlations('S0'), expected[0], atol=1e-9)
+
+
+def test_reopened_store_keeps_the_window(closes, tmp_path):
+    built = CorrelationService.build(closes, window=30, root=str(tmp_path))
+    reopened = CorrelationService(str(tmp_path))
+    np.testing.assert_allclose(reopened.correlations('S2'), built.correlations('S2'))
+    ranked = reopened.most_correlated('S0', k=5)
+    values = [r['correlation'] for r in ranked]
+    assert 'S0' not in [r['symbol'] for r in ranked]
+    assert values == sorted(values, reverse=True)
@@ -0,0 +1,47 @@
+"""MinHash/LSH near-duplicate detection and canonical linking."""
+import sqlite3
+
+import numpy as np
+
+from dedup import ArticleDeduper, MinHashLSH, minhash, shingles, similarity
+
+STORY = ("The Federal Reserve left interest rates unchanged on Wednesday and signalled "
+         "that slowing inflation could allow cuts later this year, officials said")
+
+
+def _jaccard(a: str, b: str, k: int = 3) -> float:
+    x, y = shingles(a, k), shingles(b, k)
+    return len(x & y) / len(x | y)
+
+
+def test_signature_estimates_jaccard():
+    other = STORY.replace("Wednesday", "Thursday").replace("officials said", "according to officials")
+    estimate = float(similarity(minhash(STORY), minhash(other))[0])
+    assert abs(estimate - _jaccard(STORY, other)) < 0.15
+    assert minhash("") is None
+    np.testing.assert_array_equal(minhash(STORY), minhash(STORY.upper()))
+
+
+def test_lsh_finds_near_duplicates_only():
+    index = MinHashLSH()
+    index.add("original", minhash(STORY))
+    index.add("unrelated", minhash("Apple unveiled a new phone at its annual event in Cupertino on Tuesday"))
+    rewritten = STORY + " - Reuters"
+    matches = index.query(minhash(rewritten))
+    assert [key for key, _ in matches] == ["original"]
+    assert index.query(minhash("Oil prices rose after OPEC agreed to extend production cuts")) == []
+
+
+def test_deduper_links_to_canonical_and_persists():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE articles (id INTEGER PRIMARY KEY, headline TEXT)")
+    deduper = ArticleDeduper(connection)
+    signature = deduper.signature(STORY, "fulltext")
+    assert deduper.find(signature, "fulltext") is None
+    deduper.add(1, signature, "fulltext")
+    connection.commit()
+
+    reloaded = ArticleDeduper(connection)
+    match = reloaded.find(reloaded.signature(STORY + " Markets rallied.", "fulltext"), "fulltext")
+    assert match is not None and match[0] == 1 and match[1] >= reloaded.threshold
+    assert reloaded.find(reloaded.signature(STORY, "headline"), "headline") is None  # kinds are separate
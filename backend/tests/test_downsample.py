@@ -0,0 +1,50 @@
+"""LTTB keeps the endpoints and exactly the requested number of points."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsample import chart_indices, lttb, minmax
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    return np.arange(1000, dtype=float), np.cumsum(rng.normal(0, 1, 1000))
+
+
+@pytest.mark.parametrize('n_out', [3, 10, 250, 999])
+def test_lttb_count_and_endpoints(series, n_out):
+    kept = lttb(*series, n_out)
+    assert len(kept) == n_out
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_lttb_small_requests(series):
+    assert lttb(*series, 2).tolist() == [0, 999]
+    assert lttb(*series, 1).tolist() == [999]
+    assert lttb(*series, 0).tolist() == []
+
+
+def test_lttb_returns_everything_when_asked_for_more(series):
+    assert lttb(*series, 1000).tolist() == list(range(1000))
+    assert lttb(*series, 5000).tolist() == list(range(1000))
+
+
+def test_lttb_keeps_a_spike():
+    y = np.zeros(500)
+    y[321] = 10.0
+    assert 321 in lttb(np.arange(500), y, 20)
+
+
+def test_minmax_keeps_extremes(series):
+    x, y = series
+    kept = minmax(y, 50)
+    assert {0, 999, int(np.argmin(y)), int(np.argmax(y))} <= set(kept.tolist())
+
+
+def test_chart_indices_serves_cached_tiers(series):
+    history = pd.DataFrame({'Close': series[1]}, index=pd.date_range('2000-01-01', periods=1000))
+    assert len(chart_indices('TEST', 'max', '1d', history, 300)) == 250  # largest tier <= 300
+    assert len(chart_indices('TEST', 'max', '1d', history, 50)) == 50
+    assert len(chart_indices('TEST', 'max', '1d', history, 5000)) == 1000
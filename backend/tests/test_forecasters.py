@@ -0,0 +1,47 @@
+"""Batched AR fits against one least-squares fit per series."""
+import numpy as np
+
+from forecasting.forecasters import ARForecaster, _fit_ar_universe, ar_forecast_batch, fit_ar_batch
+from forecasting.synthetic import synthetic_universe
+
+
+def _lstsq_ar(returns: np.ndarray, order: int) -> np.ndarray:
+    lags = np.column_stack([returns[order - k:len(returns) - k] for k in range(1, order + 1)])
+    X = np.column_stack([np.ones(len(lags)), lags])
+    return np.linalg.lstsq(X, returns[order:], rcond=None)[0]
+
+
+def test_batch_matches_per_series_least_squares():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0, 0.01, (4, 300))
+    coefs = fit_ar_batch(returns, order=5)
+    for i in range(4):
+        np.testing.assert_allclose(coefs[i], _lstsq_ar(returns[i], 5), rtol=1e-4, atol=1e-6)
+
+
+def test_nan_padding_leaves_shorter_series_unchanged():
+    rng = np.random.default_rng(1)
+    long, short = rng.normal(0, 0.01, 300), rng.normal(0, 0.01, 120)
+    padded = np.vstack([long, np.concatenate([np.full(180, np.nan), short])])
+    coefs = fit_ar_batch(padded, order=3)
+    np.testing.assert_allclose(coefs[0], _lstsq_ar(long, 3), rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(coefs[1], _lstsq_ar(short, 3), rtol=1e-4, atol=1e-6)
+
+
+def test_universe_fit_matches_single_ticker_forecaster():
+    histories = synthetic_universe(3, 260)
+    histories['SYN0001'] = histories['SYN0001'].iloc[-90:]  # a recent listing
+    results = _fit_ar_universe(histories, horizon=10, persist=False)
+    for ticker, history in histories.items():
+        single = ARForecaster().fit(history)
+        np.testing.assert_allclose(results[ticker]['state']['coefs'], single.coefs[0], rtol=1e-4, atol=1e-6)
+        np.testing.assert_allclose(results[ticker]['forecast'], single.predict(10), rtol=1e-9)
+
+
+def test_forecast_rolls_the_recursion_forward():
+    closes = np.array([[100.0, 101.0, 102.0]])
+    coefs = np.array([[0.01, 0.5, 0.0]])  # r_t = 0.01 + 0.5 r_{t-1}
+    path = ar_forecast_batch(closes, coefs, horizon=2)
+    r1 = 0.01 + 0.5 * np.log(102 / 101)
+    r2 = 0.01 + 0.5 * r1
+    np.testing.assert_allclose(path[0], [102 * np.exp(r1), 102 * np.exp(r1 + r2)])
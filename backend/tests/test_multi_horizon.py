@@ -0,0 +1,45 @@
+"""RollingState's O(1) updates against pandas rolling windows."""
+import numpy as np
+import pandas as pd
+
+from forecasting.features import add_features, feature_arrays, relative_features
+from forecasting.multi_horizon import LONG_WINDOW, RollingState, future_dates
+from forecasting.synthetic import synthetic_ohlcv
+
+
+def test_at_origins_matches_feature_arrays():
+    arrays = feature_arrays(synthetic_ohlcv(120, seed=1))
+    origins = np.arange(LONG_WINDOW - 1, 120)
+    state = RollingState.at_origins(arrays, origins)
+    np.testing.assert_allclose(state.features(), arrays['X'][origins], rtol=1e-5, atol=1e-6)
+
+
+def test_push_tracks_pandas_rolling():
+    df = synthetic_ohlcv(200, seed=2)
+    state = RollingState.from_histories([df.iloc[:LONG_WINDOW]])
+    for t in range(LONG_WINDOW, len(df)):
+        state.push(df['Close'].to_numpy()[t:t + 1], df['Volume'].to_numpy()[t:t + 1])
+
+    expected = relative_features(add_features(df.copy())).iloc[-1]
+    got = dict(zip(expected.index, state.features()[0]))
+    # Rolling columns are exact; Open/High/Low of a pushed bar are synthetic
+    for column in ('SMA_10_rel', 'SMA_30_rel', 'Volatility_rel', 'Volume_rel'):
+        assert np.isclose(got[column], expected[column], rtol=1e-4, atol=1e-6), column
+    prev, close = df['Close'].iloc[-2], df['Close'].iloc[-1]
+    assert np.isclose(got['Open_rel'], prev / close - 1, rtol=1e-5)
+    assert np.isclose(got['High_rel'], max(prev, close) / close - 1, rtol=1e-5)
+    assert np.isclose(got['Low_rel'], min(prev, close) / close - 1, rtol=1e-5)
+
+
+def test_push_without_volume_uses_moving_average():
+    df = synthetic_ohlcv(LONG_WINDOW, seed=3)
+    state = RollingState.from_histories([df, df])
+    volume_ma = state.volume_ma.copy()
+    state.push(np.array([101.0, 99.0]))
+    np.testing.assert_allclose(state.volume, volume_ma)
+    np.testing.assert_allclose(state.close, [101.0, 99.0])
+
+
+def test_future_dates_are_business_days_after_last():
+    dates = future_dates(pd.Timestamp('2024-01-05'), 3)  # a Friday
+    assert list(dates) == list(pd.to_datetime(['2024-01-08', '2024-01-09', '2024-01-10']))
@@ -0,0 +1,41 @@
+"""Reciprocal-rank fusion and the hybrid retriever's filters."""
+import pytest
+
+from rag.retriever import BM25Index, Document, HybridRetriever, reciprocal_rank_fusion
+
+
+def test_rrf_scores_and_order():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+    assert [row for row, _ in fused] == [1, 3, 2]
+    scores = dict(fused)
+    assert scores[1] == pytest.approx(1 / 61 + 1 / 62)
+    assert scores[3] == pytest.approx(1 / 63 + 1 / 61)
+    assert scores[2] == pytest.approx(1 / 62)
+
+
+def test_rrf_of_one_ranking_keeps_its_order():
+    assert [row for row, _ in reciprocal_rank_fusion([[7, 4, 9]])] == [7, 4, 9]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_bm25_prefers_rarer_terms():
+    index = BM25Index()
+    for text in ["apple earnings beat", "apple stock falls", "apple apple apple", "merger talks"]:
+        index.add(text)
+    hits = index.search("earnings apple", k=4)
+    assert hits[0][0] == 0
+    assert 3 not in [row for row, _ in hits]
+
+
+def test_hybrid_filters_by_ticker_and_date():
+    retriever = HybridRetriever()
+    retriever.add([
+        Document(id="a", text="Nvidia raises guidance on data center demand", tickers=["NVDA"], datetime=100.0),
+        Document(id="b", text="Nvidia guidance disappoints investors", tickers=["NVDA"], datetime=300.0),
+        Document(id="c", text="AMD raises guidance", tickers=["AMD"], datetime=200.0),
+    ])
+    assert {h.document.id for h in retriever.search("guidance", ticker="nvda")} == {"a", "b"}
+    assert [h.document.id for h in retriever.search("guidance", ticker="NVDA", start=200)] == ["b"]
+    assert retriever.search("guidance", ticker="MSFT") == []
+    with pytest.raises(ValueError):
+        retriever.search("guidance", mode="fuzzy")
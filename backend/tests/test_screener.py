@@ -0,0 +1,97 @@
+"""Screener filter grammar: what it accepts, what it evaluates to, what it rejects."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting.screener import Screener, ScreenerError, parse_filter
+from forecasting.synthetic import synthetic_universe
+
+SECTORS = ['Technology', 'Energy', 'Utilities']
+
+
+@pytest.fixture(scope='module')
+def screener():
+    histories = synthetic_universe(30, 300, seed=3)
+    table = Screener()
+    table.build(histories)
+    for i, ticker in enumerate(histories):
+        table.set_fundamentals(ticker, sector=SECTORS[i % 3], pe=5.0 + i)
+    table.histories = histories
+    return table
+
+
+@pytest.fixture(scope='module')
+def rows(screener):
+    return pd.DataFrame(screener.query(limit=1000)['results']).set_index('symbol')
+
+
+def _symbols(screener, expression, **kwargs):
+    return {r['symbol'] for r in screener.query(expression, limit=1000, **kwargs)['results']}
+
+
+def test_indicators_match_pandas_rolling(screener, rows):
+    for ticker, df in screener.histories.items():
+        close = df['Close']
+        expected = [close.iloc[-1], close.rolling(10).mean().iloc[-1],
+                    close.rolling(30).mean().iloc[-1], close.rolling(10).std().iloc[-1]]
+        got = rows.loc[ticker, ['Close', 'SMA_10', 'SMA_30', 'Volatility']].astype(float)
+        np.testing.assert_allclose(got, expected, rtol=0, atol=1e-4)  # results are rounded to 4 places
+    assert rows['RSI'].between(0, 100).all()
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ("RSI < 50", lambda r: r['RSI'] < 50),
+    ("rsi < 50 and sector == 'Energy'", lambda r: (r['RSI'] < 50) & (r['sector'] == 'Energy')),
+    ("not (Close > SMA_30) or pe >= 30", lambda r: ~(r['Close'] > r['SMA_30']) | (r['pe'] >= 30)),
+    ("10 < pe <= 20", lambda r: (r['pe'] > 10) & (r['pe'] <= 20)),
+    ("sector in ['Energy', 'Utilities']", lambda r: r['sector'].isin(['Energy', 'Utilities'])),
+    ("sector not in ('Energy',)", lambda r: r['sector'] != 'Energy'),
+    ("Close - SMA_10 > -Volatility * 2", lambda r: r['Close'] - r['SMA_10'] > -r['Volatility'] * 2),
+])
+def test_filters_match_pandas(screener, rows, expression, expected):
+    assert _symbols(screener, expression) == set(rows.index[expected(rows)])
+
+
+def test_sort_and_limit(screener, rows):
+    result = screener.query("pe > 0", sort='pe', descending=False, limit=5)
+    assert [r['pe'] for r in result['results']] == sorted(rows['pe'])[:5]
+    assert result['total'] == len(rows)
+    assert screener.query(None, limit=-1)['results'] == []
+
+
+@pytest.mark.parametrize('expression', [
+    "__import__('os').system('true')",
+    "Close.real > 1",
+    "RSI < 30 if True else 1",
+    "[x for x in RSI]",
+    "lambda: 1",
+    "RSI < None",
+    "(" * 300 + "RSI" + ")" * 300,
+    " + ".join(["RSI"] * 50_000) + " > 1",
+    "RSI <",
+])
+def test_rejects_syntax_outside_the_grammar(screener, expression):
+    with pytest.raises(ScreenerError):
+        screener.query(expression)
+
+
+@pytest.mark.parametrize('expression', [
+    "Unknown > 1",
+    "sector * 100000000 == 'x'",
+    "sector > 1",
+    "sector in 'Energy'",
+    "RSI + 1",
+])
+def test_rejects_invalid_evaluation(screener, expression):
+    with pytest.raises(ScreenerError):
+        screener.query(expression)
+
+
+def test_rejects_unknown_sort_column(screener):
+    with pytest.raises(ScreenerError):
+        screener.query(None, sort='sector')
+
+
+def test_parse_filter_returns_the_tree():
+    tree = parse_filter("RSI < 30 and pe > 5")
+    assert type(tree.body).__name__ == 'BoolOp'
@@ -0,0 +1,227 @@
+# Near-duplicate article detection (MinHash + LSH)
+#
+# Wire stories show up once per outlet in Finnhub general news. Every article
+# gets a MinHash signature of its word shingles, and the signatures are banded
+# into an LSH index, so a new article is only compared against the few stored
+# articles that share a band with it, not the whole corpus. A candidate is a
+# duplicate when its estimated Jaccard similarity is >= THRESHOLD; it is linked
+# to the canonical (first seen) article via articles.canonical_id and skips the
+# fetch/extract/score work.
+#
+# Two passes: "headline" (headline + summary, before fetching) and "fulltext"
+# (after extraction, catches the same body under a rewritten headline).
+#
+# Benchmark (run from backend/webScraper):
+#     python dedup.py --articles 100000
+
+import re
+import sqlite3
+import zlib
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32                      # 32 bands x 4 rows: pairs above ~0.5 Jaccard become candidates
+THRESHOLD = 0.7                 # estimated Jaccard needed to call it a duplicate
+SHINGLE_WORDS = {"headline": 2, "fulltext": 3}
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+# ---------- Signatures ----------
+def shingles(text: str, k: int = 3) -> set:
+    """Set of k-word shingles of the lowercased text (the words themselves if shorter than k)"""
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    if len(words) < k:
+        return set(words)
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash(text: str, k: int = 3) -> np.ndarray | None:
+    """NUM_PERM uint32 MinHash signature of the text's shingles (None for empty text)"""
+    grams = shingles(text, k)
+    if not grams:
+        return None
+    hv = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+    # Universal hashing (a*x + b) mod p, one permutation per column
+    permuted = ((hv[:, None] * _A + _B) % _MERSENNE) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of signature a to each row of b"""
+    return (np.atleast_2d(b) == a).mean(axis=1)
+
+
+# ---------- Index ----------
+class MinHashLSH:
+    """Banded LSH over MinHash signatures"""
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.rows = num_perm // bands
+        self.bands = bands
+        self._buckets = [{} for _ in range(bands)]
+        self._keys = []
+        self._signatures = np.empty((256, num_perm), dtype=np.uint32)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _band_keys(self, signature: np.ndarray):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key, signature: np.ndarray):
+        slot = len(self._keys)
+        if slot == len(self._signatures):
+            self._signatures = np.concatenate((self._signatures, np.empty_like(self._signatures)))
+        self._signatures[slot] = signature
+        self._keys.append(key)
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band, []).append(slot)
+
+    def query(self, signature: np.ndarray, threshold: float = THRESHOLD) -> list:
+        """[(key, similarity)] of stored signatures at or above threshold, most similar first"""
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band, ()))
+        if not candidates:
+            return []
+        slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        scores = similarity(signature, self._signatures[slots])
+        keep = scores >= threshold
+        order = np.argsort(-scores[keep], kind="stable")
+        return [(self._keys[s], float(scores[keep][i]))
+                for i, s in zip(order, slots[keep][order])]
+
+
+# ---------- Articles ----------
+def ensure_dedup(connection: sqlite3.Connection):
+    """canonical_id column on articles + the table of stored signatures"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("ALTER TABLE articles ADD COLUMN canonical_id INTEGER")
+    except sqlite3.OperationalError:
+        pass
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS article_minhash(
+        id INTEGER,
+        kind TEXT,
+        signature BLOB,
+        PRIMARY KEY (id, kind)
+    )
+    """)
+    connection.commit()
+
+
+class ArticleDeduper:
+    """LSH indexes of canonical articles, loaded from and saved to article_minhash"""
+
+    def __init__(self, connection: sqlite3.Connection, threshold: float = THRESHOLD):
+        ensure_dedup(connection)
+        self.connection = connection
+        self.threshold = threshold
+        self.indexes = {kind: MinHashLSH() for kind in SHINGLE_WORDS}
+        for row_id, kind, blob in connection.execute("SELECT id, kind, signature FROM article_minhash"):
+            if kind in self.indexes:
+                self.indexes[kind].add(row_id, np.frombuffer(blob, dtype=np.uint32))
+
+    def signature(self, text: str, kind: str = "headline") -> np.ndarray | None:
+        return minhash(text, SHINGLE_WORDS[kind])
+
+    def find(self, signature: np.ndarray | None, kind: str = "headline") -> tuple[int, float] | None:
+        """(canonical article id, similarity) of the closest stored near-duplicate, if any"""
+        if signature is None:
+            return None
+        matches = self.indexes[kind].query(signature, self.threshold)
+        return matches[0] if matches else None
+
+    def add(self, row_id: int, signature: np.ndarray | None, kind: str = "headline"):
+        """Register a canonical article (caller commits)"""
+        if signature is None:
+            return
+        self.indexes[kind].add(row_id, signature)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO article_minhash (id, kind, signature) VALUES (?, ?, ?)",
+            (row_id, kind, signature.tobytes()))
+
+
+def headline_text(article: dict) -> str:
+    return f"{article.get('headline') or ''} {article.get('summary') or ''}"
+
+
+# ---------- Benchmark ----------
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate benchmark")
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f"w{i}" for i in range(30_000)]
+
+    def story():
+        return " ".join(rng.choices(vocabulary, k=40))
+
+    def rewrite(text):
+        """Another outlet's copy: a couple of words swapped and the outlet name added"""
+        words = text.split()
+        for _ in range(2):
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+        return "outlet " + " ".join(words)
+
+    texts, truth = [], []
+    for i in range(args.articles):
+        if texts and rng.random() < args.duplicate_rate:
+            original = truth[rng.randrange(len(texts))]
+            texts.append(rewrite(texts[original]))
+            truth.append(original)
+        else:
+            texts.append(story())
+            truth.append(i)
+
+    started = time.perf_counter()
+    signatures = [minhash(t, SHINGLE_WORDS["headline"]) for t in texts]
+    signature_ms = (time.perf_counter() - started) / len(texts) * 1000
+
+    index = MinHashLSH()
+    found, true_dupes, correct, false_links = 0, 0, 0, 0
+    started = time.perf_counter()
+    for i, sig in enumerate(signatures):
+        match = index.query(sig)
+        if truth[i] != i:
+            true_dupes += 1
+        if match:
+            found += 1
+            if truth[match[0][0]] == truth[i]:
+                correct += 1
+            else:
+                false_links += 1
+        else:
+            index.add(i, sig)
+    lsh_ms = (time.perf_counter() - started) / len(texts) * 1000
+
+    # Brute force for comparison: compare against every stored signature
+    matrix = np.vstack(signatures)
+    started = time.perf_counter()
+    for i in range(len(texts) - args.queries, len(texts)):
+        similarity(signatures[i], matrix[:i]).max()
+    brute_ms = (time.perf_counter() - started) / args.queries * 1000
+
+    print(f"📊 {args.articles:,} articles, {true_dupes:,} true near-duplicates")
+    print(f"   signature:      {signature_ms:.3f} ms/article")
+    print(f"   LSH lookup:     {lsh_ms:.3f} ms/article (index of {len(index):,})")
+    print(f"   brute force:    {brute_ms:.3f} ms/article at full size")
+    print(f"   dedup rate {found / len(texts):.1%}, recall {correct / max(true_dupes, 1):.1%}, "
+          f"false links {false_links}")
+    print("✅ Done")
@@ -0,0 +1,234 @@
+# Per-domain extractor routing learned from past fetches
+#
+# get_fulltext used to try trafilatura -> newspaper3k -> readability ->
+# article-tag for every page. Sites are consistent, so the router keeps
+# per-domain (attempts, successes, seconds) for each extractor and for the
+# AMP/canonical second fetch, and per domain:
+#   - tries extractors in order of past success rate (ties keep the default order)
+#   - skips extractors that failed MIN_ATTEMPTS times without ever succeeding
+#     (they are re-probed on EXPLORE of pages so a site change is noticed)
+#   - skips the AMP/canonical refetch once it was tried MIN_ATTEMPTS times and
+#     never produced the page that was used
+#
+# Stats live in the extractor_stats table next to articles. On first use they
+# are seeded from articles.fetch_status ("status:http|extractor|html=N"): the
+# extractors run in a fixed order, so every one before the winner was tried
+# and failed.
+#
+# Benchmark (run from backend/webScraper):
+#     python extractor_router.py --simulate         synthetic domains / costs
+#     python extractor_router.py                    cached HTML of NewsArticles.db
+
+import random
+import sqlite3
+import threading
+from collections import defaultdict
+
+DEFAULT_ORDER = ("trafilatura", "newspaper3k", "readability", "article-tag")
+AMP_KEY = "amp-refetch"
+MIN_ATTEMPTS = 5
+EXPLORE = 0.05
+
+
+def parse_fetch_status(fetch_status: str | None) -> tuple[str | None, str | None]:
+    """(status, used_extractor) from 'ok:200|trafilatura|html=1234'"""
+    if not fetch_status:
+        return None, None
+    head, _, rest = fetch_status.partition("|")
+    status = head.split(":", 1)[0]
+    extractor = rest.split("|", 1)[0] if rest else None
+    return status, (None if extractor in (None, "", "None") else extractor)
+
+
+class ExtractorRouter:
+    """Per-domain extractor order and AMP decision from success statistics"""
+
+    def __init__(self, default_order=DEFAULT_ORDER, min_attempts: int = MIN_ATTEMPTS,
+                 explore: float = EXPLORE, seed: int | None = None):
+        self.default_order = tuple(default_order)
+        self.min_attempts = min_attempts
+        self.explore = explore
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # (domain, extractor) -> [attempts, successes, seconds]
+        self.stats = defaultdict(lambda: [0, 0, 0.0])
+
+    # ---------- Decisions ----------
+    def _never_works(self, domain: str, name: str) -> bool:
+        attempts, successes, _ = self.stats.get((domain, name), (0, 0, 0.0))
+        return attempts >= self.min_attempts and successes == 0
+
+    def plan(self, domain: str) -> list:
+        """Extractors to try on this domain, most likely to succeed first"""
+        with self._lock:
+            def rate(name):
+                attempts, successes, _ = self.stats.get((domain, name), (0, 0, 0.0))
+                return (successes + 1) / (attempts + 2)  # unseen extractors sit at 0.5
+
+            ranked = sorted(self.default_order, key=lambda n: -rate(n))  # stable: ties keep default order
+            keep = [n for n in ranked if not self._never_works(domain, n)]
+            if not keep or self._random.random() < self.explore:
+                return ranked
+            return keep
+
+    def use_amp(self, domain: str) -> bool:
+        """Whether the AMP/canonical second fetch is worth trying on this domain"""
+        with self._lock:
+            return not self._never_works(domain, AMP_KEY) or self._random.random() < self.explore
+
+    # ---------- Learning ----------
+    def record(self, domain: str, name: str, success: bool, seconds: float = 0.0):
+        with self._lock:
+            row = self.stats[(domain, name)]
+            row[0] += 1
+            row[1] += int(bool(success))
+            row[2] += seconds
+
+    def record_fetch_status(self, domain: str, fetch_status: str | None):
+        """Replay one stored article: extractors before the winner were tried and failed"""
+        status, winner = parse_fetch_status(fetch_status)
+        if not domain or status not in ("ok", "short", "empty"):
+            return  # no HTML was fetched (blocked/error/duplicate)
+        if winner in self.default_order:
+            tried = self.default_order[:self.default_order.index(winner)]
+            for name in tried:
+                self.record(domain, name, False)
+            self.record(domain, winner, True)
+        else:  # every extractor ran and came up short ("fallback-longest" / None)
+            for name in self.default_order:
+                self.record(domain, name, False)
+
+    def summary(self) -> dict:
+        """domain -> {extractor: (attempts, successes, avg seconds)}"""
+        out = defaultdict(dict)
+        with self._lock:
+            for (domain, name), (attempts, successes, seconds) in sorted(self.stats.items()):
+                out[domain][name] = (attempts, successes, seconds / attempts if attempts else 0.0)
+        return dict(out)
+
+    # ---------- Persistence ----------
+    @staticmethod
+    def ensure_table(connection: sqlite3.Connection):
+        connection.execute("""
+        CREATE TABLE IF NOT EXISTS extractor_stats(
+            domain TEXT,
+            extractor TEXT,
+            attempts INTEGER,
+            successes INTEGER,
+            seconds REAL,
+            PRIMARY KEY (domain, extractor)
+        )
+        """)
+        connection.commit()
+
+    @classmethod
+    def load(cls, connection: sqlite3.Connection, **kwargs) -> "ExtractorRouter":
+        """Stats from extractor_stats, seeded from articles.fetch_status when empty"""
+        cls.ensure_table(connection)
+        router = cls(**kwargs)
+        rows = connection.execute("SELECT domain, extractor, attempts, successes, seconds FROM extractor_stats").fetchall()
+        if rows:
+            for domain, name, attempts, successes, seconds in rows:
+                router.stats[(domain, name)] = [attempts, successes, seconds]
+        else:
+            try:
+                history = connection.execute(
+                    "SELECT source_domain, fetch_status FROM articles WHERE fetch_status IS NOT NULL").fetchall()
+            except sqlite3.OperationalError:
+                history = []
+            for domain, fetch_status in history:
+                router.record_fetch_status(domain, fetch_status)
+            router.save(connection)
+        return router
+
+    def save(self, connection: sqlite3.Connection):
+        with self._lock:
+            rows = [(d, n, a, s, t) for (d, n), (a, s, t) in self.stats.items()]
+        connection.executemany("""
+            INSERT OR REPLACE INTO extractor_stats (domain, extractor, attempts, successes, seconds)
+            VALUES (?, ?, ?, ?, ?)""", rows)
+        connection.commit()
+
+
+# ---------- Benchmark ----------
+def _simulate(n_domains: int = 40, pages: int = 4000):
+    """Synthetic sites: each has one or two extractors that work, costs per extractor in ms"""
+    rng = random.Random(0)
+    cost = {"trafilatura": 35.0, "newspaper3k": 60.0, "readability": 20.0, "article-tag": 4.0}
+    amp_cost = 250.0
+    domains = {}
+    for d in range(n_domains):
+        works = set(rng.sample(DEFAULT_ORDER, rng.choice([1, 1, 2])))
+        domains[f"site{d}.com"] = {"works": works, "amp_helps": rng.random() < 0.15}
+
+    def run(domain, router):
+        site = domains[domain]
+        spent = 0.0
+        if router is None or router.use_amp(domain):
+            spent += amp_cost
+            if router:
+                router.record(domain, AMP_KEY, site["amp_helps"])
+        order = router.plan(domain) if router else DEFAULT_ORDER
+        for name in order:
+            spent += cost[name]
+            ok = name in site["works"] and rng.random() < 0.95
+            if router:
+                router.record(domain, name, ok, cost[name] / 1000)
+            if ok:
+                return spent, True
+        return spent, False
+
+    stream = [rng.choice(list(domains)) for _ in range(pages)]
+    baseline = [run(d, None) for d in stream]
+    router = ExtractorRouter(seed=0)
+    routed = [run(d, router) for d in stream]
+    return baseline, routed
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from urllib.parse import urlparse
+
+    parser = argparse.ArgumentParser(description="Extractor router benchmark")
+    parser.add_argument("--simulate", action="store_true", help="synthetic sites instead of the HTML cache")
+    parser.add_argument("--limit", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.simulate:
+        baseline, routed = _simulate()
+        b_ms = sum(t for t, _ in baseline) / len(baseline)
+        r_ms = sum(t for t, _ in routed) / len(routed)
+        b_ok = sum(ok for _, ok in baseline) / len(baseline)
+        r_ok = sum(ok for _, ok in routed) / len(routed)
+        print(f"📊 {len(baseline)} simulated pages (cost model, incl. learning from scratch)")
+        print(f"   fixed order: {b_ms:6.1f} ms/article, {b_ok:.1%} extracted")
+        print(f"   routed:      {r_ms:6.1f} ms/article, {r_ok:.1%} extracted")
+        print(f"✅ {1 - r_ms / b_ms:.0%} less extraction time per article")
+    else:
+        # Replays the saved corpus: cached HTML of stored articles, no network
+        import utils
+
+        utils.setup_database("NewsArticles")
+        rows = utils.cursor.execute(
+            "SELECT url, source_domain FROM articles WHERE canonical_id IS NULL ORDER BY id LIMIT ?",
+            (args.limit,)).fetchall()
+        rows = [(url, domain or urlparse(url).netloc) for url, domain in rows
+                if utils.get_html_cache().get(url) is not None]
+        if not rows:
+            raise SystemExit("❌ No cached HTML yet; run the scraper first (or use --simulate)")
+        half = len(rows) // 2
+        results = {}
+        for label, router in (("fixed order", None), ("routed", ExtractorRouter(seed=0))):
+            utils.ROUTER = router
+            if router:
+                for url, _ in rows[:half]:  # learn on the first half
+                    utils.get_fulltext(url, offline=True)
+            started = time.perf_counter()
+            ok = sum(utils.get_fulltext(url, offline=True)[1] == "ok" for url, _ in rows[half:])
+            results[label] = ((time.perf_counter() - started) / (len(rows) - half) * 1000, ok)
+        utils.ROUTER = None
+        print(f"📊 {len(rows) - half} cached articles (router learned on {half} others)")
+        for label, (ms, ok) in results.items():
+            print(f"   {label:12s} {ms:7.1f} ms/article, {ok} extracted")
+        print(f"✅ {1 - results['routed'][0] / results['fixed order'][0]:.0%} less extraction time per article")
@@ -27,7 +27,11 @@ try:
     db_path = Path(__file__).parent / "NewsArticles.db"
     with sqlite3.connect(str(db_path)) as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT id, headline FROM articles WHERE headline IS NOT NULL")
+        # Near-duplicates (canonical_id set by the scraper's dedup stage) reuse their canonical's score
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(articles)")}
+        has_canonical = "canonical_id" in columns
+        cursor.execute("SELECT id, headline FROM articles WHERE headline IS NOT NULL"
+                       + (" AND canonical_id IS NULL" if has_canonical else ""))
         rows = cursor.fetchall()
         ids = [row[0] for row in rows]
         financial_texts = [row[1] for row in rows]
@@ -59,6 +63,13 @@ try:
                     "UPDATE articles SET [Predicted Sentiment]=? WHERE id=?",
                     (capitalized_sentiment, ids[i])
                 )
+            if has_canonical:
+                cursor.execute("""
+                    UPDATE articles SET [Predicted Sentiment] = (
+                        SELECT c.[Predicted Sentiment] FROM articles c WHERE c.id = articles.canonical_id)
+                    WHERE canonical_id IS NOT NULL
+                """)
+                logging.info(f"Copied sentiment to {cursor.rowcount} near-duplicate articles.")
             conn.commit()
         else:
             logging.info("No headlines found in the database.")
@@ -0,0 +1,253 @@
+# Compressed on-disk cache of fetched article HTML
+#
+# Pages are stored once per distinct content: blobs/<ab>/<sha256>.zst (zstd, or
+# .zz zlib when zstandard isn't installed), named by the hash of the HTML. A
+# small SQLite index maps each URL (by its hash) to its blob plus the ETag /
+# Last-Modified the server sent, so a re-fetch can be a conditional GET
+# (304 = keep the cached copy). Extraction can be re-run over the whole cache
+# offline. The cache is capped at max_bytes of compressed blobs; the least
+# recently used URLs are evicted first.
+#
+# Benchmark (run from backend/webScraper):
+#     python html_cache.py --pages 2000
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zlib fallback, still readable once zstandard is installed
+    zstandard = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # goes up from webscraper to backend
+DEFAULT_ROOT = os.path.join(BASE_DIR, "db", "html_cache")
+DEFAULT_MAX_BYTES = int(os.getenv("HTML_CACHE_MAX_MB", 1024)) * 1024 * 1024
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 6
+EVICT_BATCH = 64            # least recently used URLs read per eviction query
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _compress(data: bytes) -> tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), ".zst"
+    return zlib.compress(data, ZLIB_LEVEL), ".zz"
+
+
+def _decompress(data: bytes, ext: str) -> bytes:
+    if ext == ".zst":
+        if zstandard is None:
+            raise RuntimeError("zstandard is needed to read .zst cache entries")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class HtmlCache:
+    """Content-addressed, compressed HTML blobs + URL index with HTTP validators"""
+
+    def __init__(self, root: str = DEFAULT_ROOT, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._accessed = {}  # url_hash -> access time, written in batches
+        self.connection = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self.connection.executescript("""
+        CREATE TABLE IF NOT EXISTS pages(
+            url_hash TEXT PRIMARY KEY,
+            url TEXT,
+            content_hash TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL,
+            accessed_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages(accessed_at);
+        CREATE INDEX IF NOT EXISTS idx_pages_content ON pages(content_hash);
+        CREATE TABLE IF NOT EXISTS blobs(
+            content_hash TEXT PRIMARY KEY,
+            ext TEXT,
+            size INTEGER,
+            stored_size INTEGER
+        );
+        """)
+        self.connection.commit()
+        # Running total of blob bytes on disk, so a write never has to sum the table
+        self._stored = self.connection.execute("SELECT COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()[0]
+
+    def _blob_path(self, content_hash: str, ext: str) -> str:
+        return os.path.join(self.root, "blobs", content_hash[:2], content_hash + ext)
+
+    # ---------- Reads ----------
+    def get(self, url: str) -> dict | None:
+        """{'html', 'etag', 'last_modified', 'fetched_at'} for a cached URL (marks it recently used)"""
+        url_hash = _sha256(url.encode())
+        with self._lock:
+            row = self.connection.execute("""
+                SELECT p.content_hash, b.ext, p.etag, p.last_modified, p.fetched_at
+                FROM pages p JOIN blobs b ON b.content_hash = p.content_hash
+                WHERE p.url_hash = ?""", (url_hash,)).fetchone()
+            if not row:
+                return None
+            self._accessed[url_hash] = time.time()
+            if len(self._accessed) >= 256:
+                self._flush_accessed()
+                self.connection.commit()
+        content_hash, ext, etag, last_modified, fetched_at = row
+        try:
+            with open(self._blob_path(content_hash, ext), "rb") as f:
+                html = _decompress(f.read(), ext).decode("utf-8", errors="replace")
+        except (OSError, zlib.error, RuntimeError):
+            return None
+        return {"html": html, "etag": etag, "last_modified": last_modified, "fetched_at": fetched_at}
+
+    def _flush_accessed(self):
+        if self._accessed:
+            self.connection.executemany("UPDATE pages SET accessed_at = ? WHERE url_hash = ?",
+                                        [(t, h) for h, t in self._accessed.items()])
+            self._accessed = {}
+
+    def conditional_headers(self, entry: dict | None) -> dict:
+        """If-None-Match / If-Modified-Since for a cached entry"""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def urls(self) -> list:
+        """Every cached URL, most recently used first"""
+        with self._lock:
+            self._flush_accessed()
+            return [row[0] for row in self.connection.execute("SELECT url FROM pages ORDER BY accessed_at DESC")]
+
+    def stats(self) -> dict:
+        with self._lock:
+            pages = self.connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            blobs, size, stored = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()
+        return {"pages": pages, "blobs": blobs, "html_bytes": size, "stored_bytes": stored,
+                "ratio": size / stored if stored else None, "codec": "zstd" if zstandard else "zlib"}
+
+    # ---------- Writes ----------
+    def put(self, url: str, html: str, etag: str | None = None, last_modified: str | None = None):
+        """Store a fetched page and its validators, then evict down to max_bytes"""
+        data = html.encode("utf-8")
+        content_hash = _sha256(data)
+        now = time.time()
+        with self._lock:
+            known = self.connection.execute(
+                "SELECT 1 FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+            if not known:
+                blob, ext = _compress(data)
+                path = self._blob_path(content_hash, ext)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = path + ".tmp"
+                with open(tmp, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp, path)
+                self.connection.execute("INSERT INTO blobs (content_hash, ext, size, stored_size) VALUES (?, ?, ?, ?)",
+                                        (content_hash, ext, len(data), len(blob)))
+                self._stored += len(blob)
+            previous = self.connection.execute(
+                "SELECT content_hash FROM pages WHERE url_hash = ?", (_sha256(url.encode()),)).fetchone()
+            self.connection.execute("""
+                INSERT OR REPLACE INTO pages (url_hash, url, content_hash, etag, last_modified, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (_sha256(url.encode()), url, content_hash, etag, last_modified, now, now))
+            if previous and previous[0] != content_hash:
+                self._drop_orphan(previous[0])
+            self._evict()
+            self.connection.commit()
+
+    def touch(self, url: str):
+        """A conditional GET returned 304: the cached copy is current as of now"""
+        now = time.time()
+        with self._lock:
+            self.connection.execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url_hash = ?",
+                                    (now, now, _sha256(url.encode())))
+            self.connection.commit()
+
+    def _drop_orphan(self, content_hash: str):
+        """Delete a blob once no URL points at it"""
+        if self.connection.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone():
+            return
+        row = self.connection.execute(
+            "SELECT ext, stored_size FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+        self.connection.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+        if row:
+            self._stored -= row[1]
+            try:
+                os.remove(self._blob_path(content_hash, row[0]))
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Drop least recently used URLs until the stored blobs fit in max_bytes"""
+        if self._stored <= self.max_bytes:
+            return
+        self._flush_accessed()
+        # Oldest URLs a batch at a time (idx_pages_accessed), never the whole index
+        while self._stored > self.max_bytes:
+            batch = self.connection.execute(
+                "SELECT url_hash, content_hash FROM pages ORDER BY accessed_at LIMIT ?", (EVICT_BATCH,)).fetchall()
+            if not batch:
+                break
+            for url_hash, content_hash in batch:
+                self.connection.execute("DELETE FROM pages WHERE url_hash = ?", (url_hash,))
+                self._drop_orphan(content_hash)  # lowers _stored once no URL uses the blob
+                if self._stored <= self.max_bytes:
+                    break
+
+
+# ---------- Benchmark ----------
+if __name__ == "__main__":
+    import argparse
+    import random
+    import shutil
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="HTML cache write/read benchmark")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--max-mb", type=float, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = [f"word{i}" for i in range(5000)]
+    boilerplate = "<nav>" + " ".join(f"<a href='/s/{i}'>Section {i}</a>" for i in range(300)) + "</nav>"
+
+    def page(i):
+        body = "".join(f"<p>{' '.join(rng.choices(words, k=60))}</p>" for _ in range(25))
+        return f"<html><head><title>Story {i}</title></head><body>{boilerplate}<article>{body}</article></body></html>"
+
+    pages = {f"https://news.example.com/story/{i}": page(i) for i in range(args.pages)}
+    root = tempfile.mkdtemp()
+    try:
+        cache = HtmlCache(root, max_bytes=int(args.max_mb * 1024 * 1024))
+        started = time.perf_counter()
+        for url, html in pages.items():
+            cache.put(url, html, etag=f'"{hash(url)}"')
+        write_s = time.perf_counter() - started
+
+        urls = cache.urls()
+        started = time.perf_counter()
+        read_bytes = sum(len(cache.get(url)["html"]) for url in urls)
+        read_s = time.perf_counter() - started
+
+        s = cache.stats()
+        print(f"📊 {args.pages} pages ({sum(map(len, pages.values())) / 1e6:.0f} MB HTML), codec {s['codec']}")
+        print(f"   write: {args.pages / write_s:8.0f} pages/s")
+        print(f"   read:  {len(urls) / read_s:8.0f} pages/s ({read_bytes / read_s / 1e6:.0f} MB/s)")
+        print(f"   kept {s['pages']} pages under the {args.max_mb:g} MB cap "
+              f"({s['stored_bytes'] / 1e6:.1f} MB stored, {s['ratio']:.1f}x compression)")
+        print(f"✅ LRU kept the newest: {urls[0]}")
+    finally:
+        shutil.rmtree(root)
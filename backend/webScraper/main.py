@@ -9,13 +9,9 @@ if __name__ == "__main__":
     # 1) One-shot fetch+extract+insert (uses robust HTML fetch + fallbacks)
     newImp.articleToDB(db_name="NewsArticles")
 
-    # 2) (Optional) Retry any rows that inserted with empty full_text or fetch errors
-    #    Useful if some sites throttled you the first pass.
-    try:
-        newImp.refetch_failures(db_name="NewsArticles", limit=200)
-    except AttributeError:
-        # If you didn't add refetch_failures yet, you can ignore this.
-        pass
+    # 2) Retry rows that inserted with empty full_text or fetch errors (persistent queue,
+    #    per-domain backoff; sites that throttled you are paused, not hammered)
+    newImp.refetch_failures(db_name="NewsArticles", limit=200)
 
     # 3) Quick sanity check
     newImp.quick_dbcheck()
@@ -0,0 +1,295 @@
+# Persistent retry queue for article fetches that failed
+#
+# Articles stored as blocked / error / short / empty go into retry_queue (in the
+# articles DB) and are re-fetched later:
+#   - each item waits BASE_DELAY * 2^attempts (capped) before its next try and is
+#     given up after MAX_ATTEMPTS
+#   - a 404/410 gives the item up at once; other 4xx only retry the item
+#   - each domain backs off the same way after network errors and 5xx
+#   - a 401/403/429 opens the domain's circuit: nothing is sent to it for
+#     CIRCUIT_COOLDOWN * 2^(trips-1); the first request after that is the probe
+# Due items are fetched concurrently, one worker per domain (requests to the same
+# site stay sequential); results are written back on the calling thread.
+#
+# Demo against a local server that throttles (run from backend/webScraper):
+#     python retry_queue.py
+
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+BASE_DELAY = 60.0              # seconds before an item's first retry, doubles per attempt
+MAX_DELAY = 6 * 3600.0
+CIRCUIT_COOLDOWN = 15 * 60.0   # domain pause after 401/403/429, doubles per trip
+MAX_ATTEMPTS = 6
+THROTTLE_CODES = (401, 403, 429)
+GONE_CODES = (404, 410)        # dead link: no point retrying
+RETRY_STATUSES = ("blocked", "error", "short", "empty")
+
+
+def domain_failure(status: str, http_status: int | None) -> bool:
+    """Network error or 5xx: the site itself is struggling, not just this one URL"""
+    return status == "error" and (http_status is None or http_status >= 500)
+
+
+class RetryQueue:
+    """retry_queue (per article) + domain_backoff (per site) tables"""
+
+    def __init__(self, connection: sqlite3.Connection, base_delay: float = BASE_DELAY,
+                 circuit_cooldown: float = CIRCUIT_COOLDOWN, max_attempts: int = MAX_ATTEMPTS,
+                 clock=time.time):
+        self.connection = connection
+        self.base_delay = base_delay
+        self.circuit_cooldown = circuit_cooldown
+        self.max_attempts = max_attempts
+        self.clock = clock
+        connection.executescript("""
+        CREATE TABLE IF NOT EXISTS retry_queue(
+            article_id INTEGER PRIMARY KEY,     -- articles.id
+            url TEXT,
+            domain TEXT,
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at REAL DEFAULT 0,
+            state TEXT DEFAULT 'pending',       -- pending | recovered | gave_up
+            last_status TEXT,
+            last_http INTEGER,
+            updated_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_retry_queue_due ON retry_queue(state, next_attempt_at);
+        CREATE TABLE IF NOT EXISTS domain_backoff(
+            domain TEXT PRIMARY KEY,
+            failures INTEGER DEFAULT 0,
+            trips INTEGER DEFAULT 0,
+            next_allowed_at REAL DEFAULT 0
+        );
+        """)
+        connection.commit()
+
+    def _delay(self, base: float, n: int) -> float:
+        """base * 2^(n-1), capped, with +-10% jitter so retries don't line up"""
+        return min(base * 2 ** max(n - 1, 0), MAX_DELAY) * random.uniform(0.9, 1.1)
+
+    # ---------- Queue ----------
+    def enqueue_failures(self) -> int:
+        """Queue every canonical article whose fetch failed or came back short"""
+        placeholders = " OR ".join("a.fetch_status LIKE ?" for _ in RETRY_STATUSES)
+        cursor = self.connection.execute(f"""
+            INSERT OR IGNORE INTO retry_queue (article_id, url, domain, updated_at)
+            SELECT a.id, a.url, a.source_domain, ?
+            FROM articles a
+            WHERE a.canonical_id IS NULL
+              AND ({placeholders} OR (a.fetch_status IS NULL AND COALESCE(TRIM(a.full_text), '') = ''))
+        """, (self.clock(), *[f"{s}:%" for s in RETRY_STATUSES]))
+        for row_id, url in self.connection.execute(
+                "SELECT article_id, url FROM retry_queue WHERE domain IS NULL").fetchall():
+            self.connection.execute("UPDATE retry_queue SET domain = ? WHERE article_id = ?",
+                                    (urlparse(url or "").netloc, row_id))
+        self.connection.commit()
+        return cursor.rowcount
+
+    def due(self, limit: int = 200) -> list:
+        """[(article_id, url, domain, attempts)] ready now, skipping backed-off / open-circuit domains"""
+        now = self.clock()
+        return self.connection.execute("""
+            SELECT q.article_id, q.url, q.domain, q.attempts
+            FROM retry_queue q LEFT JOIN domain_backoff d ON d.domain = q.domain
+            WHERE q.state = 'pending' AND q.next_attempt_at <= ? AND COALESCE(d.next_allowed_at, 0) <= ?
+            ORDER BY q.attempts, q.next_attempt_at
+            LIMIT ?""", (now, now, limit)).fetchall()
+
+    def next_due_at(self) -> float | None:
+        """Earliest time any pending item can run (item and domain backoff both respected)"""
+        row = self.connection.execute("""
+            SELECT MIN(MAX(q.next_attempt_at, COALESCE(d.next_allowed_at, 0)))
+            FROM retry_queue q LEFT JOIN domain_backoff d ON d.domain = q.domain
+            WHERE q.state = 'pending'""").fetchone()
+        return row[0]
+
+    # ---------- Outcomes ----------
+    def record(self, item: tuple, status: str, http_status: int | None):
+        """Apply one fetch outcome to the item and its domain (caller commits)"""
+        article_id, _, domain, attempts = item
+        now = self.clock()
+        attempts += 1
+        if status == "ok":
+            state, next_at = "recovered", now
+        elif attempts >= self.max_attempts or http_status in GONE_CODES:
+            state, next_at = "gave_up", now
+        else:
+            state, next_at = "pending", now + self._delay(self.base_delay, attempts)
+        self.connection.execute("""
+            UPDATE retry_queue SET attempts = ?, next_attempt_at = ?, state = ?, last_status = ?,
+                                   last_http = ?, updated_at = ?
+            WHERE article_id = ?""", (attempts, next_at, state, status, http_status, now, article_id))
+
+        self.connection.execute("INSERT OR IGNORE INTO domain_backoff (domain) VALUES (?)", (domain,))
+        if http_status in THROTTLE_CODES:
+            trips = self.connection.execute(
+                "SELECT trips FROM domain_backoff WHERE domain = ?", (domain,)).fetchone()[0] + 1
+            self.connection.execute("UPDATE domain_backoff SET trips = ?, next_allowed_at = ? WHERE domain = ?",
+                                    (trips, now + self._delay(self.circuit_cooldown, trips), domain))
+        elif domain_failure(status, http_status):
+            failures = self.connection.execute(
+                "SELECT failures FROM domain_backoff WHERE domain = ?", (domain,)).fetchone()[0] + 1
+            self.connection.execute("UPDATE domain_backoff SET failures = ?, next_allowed_at = ? WHERE domain = ?",
+                                    (failures, now + self._delay(self.base_delay, failures), domain))
+        elif status == "ok" or http_status:
+            # The site answered: close the circuit and reset its backoff
+            self.connection.execute(
+                "UPDATE domain_backoff SET failures = 0, trips = 0, next_allowed_at = 0 WHERE domain = ?", (domain,))
+
+    def stats(self) -> dict:
+        """Lifetime queue counts and recovery rate"""
+        counts = dict(self.connection.execute("SELECT state, COUNT(*) FROM retry_queue GROUP BY state").fetchall())
+        total = sum(counts.values())
+        open_circuits = self.connection.execute(
+            "SELECT COUNT(*) FROM domain_backoff WHERE trips > 0 AND next_allowed_at > ?", (self.clock(),)).fetchone()[0]
+        return {
+            "pending": counts.get("pending", 0), "recovered": counts.get("recovered", 0),
+            "gave_up": counts.get("gave_up", 0), "open_circuits": open_circuits,
+            "recovery_rate": counts.get("recovered", 0) / total if total else None,  # of everything queued
+        }
+
+
+def _fetch_domain(items: list, fetch, per_domain_delay: float) -> list:
+    """Fetch one domain's items in order; stop once the site throttles or fails (it backs off)"""
+    results = []
+    for i, item in enumerate(items):
+        if i and per_domain_delay:
+            time.sleep(per_domain_delay)
+        try:
+            result = fetch(item[1])
+        except Exception as e:
+            result = (None, "error", str(e), None, {})
+        results.append((item, result))
+        if result[3] in THROTTLE_CODES or domain_failure(result[1], result[3]):
+            break  # circuit opens / domain backs off; the rest stays queued
+    return results
+
+
+def run_retries(queue: RetryQueue, fetch, on_result=None, limit: int = 200, max_workers: int = 8,
+                per_domain_delay: float = 0.5) -> dict:
+    """
+    Fetch due items concurrently (one worker per domain) and record the outcomes.
+    fetch(url) -> (text, status, error, http_status, meta), like get_fulltext;
+    on_result(item, result) writes the article back.
+    """
+    started = time.perf_counter()
+    items = queue.due(limit)
+    by_domain = {}
+    for item in items:
+        by_domain.setdefault(item[2], []).append(item)
+
+    metrics = {"attempted": 0, "recovered": 0, "failed": 0, "throttled": 0, "deferred": 0}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_fetch_domain, domain_items, fetch, per_domain_delay)
+                   for domain_items in by_domain.values()]
+        for future in as_completed(futures):
+            for item, result in future.result():
+                text, status, error, http_status, meta = result
+                queue.record(item, status, http_status)
+                if on_result:
+                    on_result(item, result)
+                metrics["attempted"] += 1
+                metrics["recovered" if status == "ok" else "failed"] += 1
+                metrics["throttled"] += http_status in THROTTLE_CODES
+    queue.connection.commit()
+    metrics["deferred"] = len(items) - metrics["attempted"]
+    metrics["recovery_rate"] = metrics["recovered"] / metrics["attempted"] if metrics["attempted"] else None
+    metrics["seconds"] = time.perf_counter() - started
+    return metrics
+
+
+# ---------- Demo ----------
+if __name__ == "__main__":
+    import argparse
+    import http.server
+    import threading
+
+    import requests
+
+    parser = argparse.ArgumentParser(description="Retry queue against a local throttling server")
+    parser.add_argument("--articles", type=int, default=60)
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    def make_site(behaviour):
+        """Local stand-in: 'ok', 'flaky' (503 half the time), 'throttle' (429 for the first 5
+        requests, then fine), 'forbidden' (always 403)"""
+        state = {"requests": 0}
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                state["requests"] += 1
+                code = 200
+                if behaviour == "flaky" and random.random() < 0.5:
+                    code = 503
+                elif behaviour == "throttle" and state["requests"] <= 5:
+                    code = 429
+                elif behaviour == "forbidden":
+                    code = 403
+                body = (" ".join(["word"] * 200) if code == 200 else "nope").encode()
+                self.send_response(code)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *a):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{server.server_port}", state
+
+    random.seed(0)
+    sites = {b: make_site(b) for b in ("ok", "flaky", "throttle", "forbidden")}
+    session = requests.Session()
+
+    def fetch(url):
+        try:
+            resp = session.get(url, timeout=5)
+        except requests.RequestException as e:
+            return None, "error", str(e), None, {}
+        if resp.status_code in THROTTLE_CODES:
+            return None, "blocked", "no_html", resp.status_code, {}
+        if not resp.ok:
+            return None, "error", "no_html", resp.status_code, {}
+        return resp.text, "ok", None, resp.status_code, {}
+
+    connection = sqlite3.connect(":memory:")
+    connection.execute("""CREATE TABLE articles (id INTEGER PRIMARY KEY, url TEXT, full_text TEXT,
+                          fetch_status TEXT, source_domain TEXT, canonical_id INTEGER)""")
+    for i in range(args.articles):
+        base, _ = sites[list(sites)[i % len(sites)]]
+        connection.execute("INSERT INTO articles (url, fetch_status, source_domain) VALUES (?, ?, ?)",
+                           (f"{base}/story/{i}", "error:None|None|html=0", urlparse(base).netloc))
+
+    queue = RetryQueue(connection, base_delay=0.2, circuit_cooldown=0.5, max_attempts=5)
+    print(f"📊 Queued {queue.enqueue_failures()} failed articles on {len(sites)} local sites")
+    started = time.time()
+    round_no = 0
+    while time.time() - started < args.seconds:
+        round_no += 1
+        m = run_retries(queue, fetch, limit=100, max_workers=4, per_domain_delay=0.0)
+        s = queue.stats()
+        if m["attempted"]:
+            print(f"   {time.time() - started:5.1f}s: attempted {m['attempted']:3d}, recovered {m['recovered']:3d}, "
+                  f"throttled {m['throttled']}, deferred {m['deferred']:3d} | pending {s['pending']}, "
+                  f"open circuits {s['open_circuits']}")
+        if not s["pending"]:
+            break
+        wait = (queue.next_due_at() or 0) - time.time()
+        time.sleep(min(max(wait, 0.01), 1.0))
+
+    s = queue.stats()
+    requests_sent = {b: st["requests"] for b, (_, st) in sites.items()}
+    print(f"   requests per site: {requests_sent}")
+    recovered_by_site = dict(connection.execute("""
+        SELECT a.source_domain, SUM(q.state = 'recovered') FROM retry_queue q
+        JOIN articles a ON a.id = q.article_id GROUP BY a.source_domain""").fetchall())
+    print("   recovered per site: " + ", ".join(
+        f"{b} {recovered_by_site.get(urlparse(base).netloc, 0)}" for b, (base, _) in sites.items()))
+    print(f"✅ Recovered {s['recovered']}, gave up {s['gave_up']}, pending {s['pending']} "
+          f"in {time.time() - started:.1f}s, recovery rate {s['recovery_rate']:.0%}")
@@ -0,0 +1,250 @@
+# Full-text search over the scraped articles (SQLite FTS5)
+#
+# articles_fts is an external-content FTS5 index over articles(headline, summary,
+# full_text, related), so the text is stored once and triggers keep the index in
+# sync on every insert/update/delete. Queries are ranked with bm25 (headline and
+# ticker hits weigh more than body hits) and return a highlighted snippet of the
+# body (or summary).
+#
+# Benchmark against the old LIKE scan (run from backend/webScraper):
+#     python search.py --articles 1000000
+
+import os
+import re
+import sqlite3
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # goes up from webscraper to backend
+DB_PATH = os.path.join(BASE_DIR, "db", "NewsArticles.db")
+
+# bm25 column weights, in articles_fts column order
+BM25_WEIGHTS = {"headline": 10.0, "summary": 4.0, "full_text": 1.0, "related": 20.0}
+SNIPPET_TOKENS = 24
+
+
+# ---------- Schema ----------
+def ensure_fts(connection: sqlite3.Connection):
+    """Create articles_fts + sync triggers if missing and index any existing rows"""
+    cursor = connection.cursor()
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='articles_fts'").fetchone()
+    cursor.executescript("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        headline, summary, full_text, related,
+        content='articles', content_rowid='id',
+        tokenize='porter unicode61'
+    );
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, headline, summary, full_text, related)
+        VALUES (new.id, new.headline, new.summary, new.full_text, new.related);
+    END;
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, headline, summary, full_text, related)
+        VALUES ('delete', old.id, old.headline, old.summary, old.full_text, old.related);
+    END;
+    CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF headline, summary, full_text, related ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, headline, summary, full_text, related)
+        VALUES ('delete', old.id, old.headline, old.summary, old.full_text, old.related);
+        INSERT INTO articles_fts(rowid, headline, summary, full_text, related)
+        VALUES (new.id, new.headline, new.summary, new.full_text, new.related);
+    END;
+    CREATE INDEX IF NOT EXISTS idx_articles_datetime ON articles(datetime);
+    """)
+    if not exists:
+        # Index rows that were scraped before the FTS table existed
+        cursor.execute("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+    connection.commit()
+
+
+# ---------- Queries ----------
+def _phrase(term: str) -> str:
+    """Quote user text as an FTS5 string so operators/punctuation can't change the query"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match(query: str | None = None, ticker: str | None = None) -> str | None:
+    """FTS5 MATCH expression: every keyword must appear; ticker matches related or headline"""
+    parts = []
+    if query:
+        # Keep quoted phrases together, AND the remaining words
+        for phrase, word in re.findall(r'"([^"]+)"|(\S+)', query):
+            term = phrase or word
+            if term.upper() in ("AND", "OR", "NOT"):
+                continue
+            parts.append(_phrase(term))
+    if ticker:
+        parts.append("{related headline} : " + _phrase(ticker.upper()))
+    return " AND ".join(parts) or None
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    connection = sqlite3.connect(db_path, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def _with_snippet(row: dict) -> dict:
+    """Body snippet if the body matched, else the summary's (the headline is shown anyway)"""
+    body, summary = row.pop("body_snippet"), row.pop("summary_snippet")
+    if body and "<mark>" in body:
+        row["snippet"] = body
+    elif summary and "<mark>" in summary:
+        row["snippet"] = summary
+    else:
+        row["snippet"] = summary or body
+    return row
+
+
+def search_articles(query: str | None = None, ticker: str | None = None,
+                    start: int | None = None, end: int | None = None,
+                    limit: int = 20, offset: int = 0, connection: sqlite3.Connection | None = None) -> list:
+    """BM25-ranked articles matching keywords/ticker, optionally within [start, end] unix seconds
+
+    Without keywords or ticker the newest articles in the date range are returned.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")  # SQLite reads LIMIT -1 as no limit
+    own = connection is None
+    connection = connection or connect()
+    match = build_match(query, ticker)
+    filters, params = [], []
+    if start is not None:
+        filters.append("a.datetime >= ?")
+        params.append(int(start))
+    if end is not None:
+        filters.append("a.datetime <= ?")
+        params.append(int(end))
+    try:
+        if match:
+            weights = ", ".join(str(w) for w in BM25_WEIGHTS.values())
+            where = " AND ".join(["articles_fts MATCH ?", *filters])
+            sql = f"""
+                SELECT a.id, a.headline, a.source, a.url, a.datetime, a.related,
+                       snippet(articles_fts, 2, '<mark>', '</mark>', '…', {SNIPPET_TOKENS}) AS body_snippet,
+                       snippet(articles_fts, 1, '<mark>', '</mark>', '…', {SNIPPET_TOKENS}) AS summary_snippet,
+                       bm25(articles_fts, {weights}) AS score
+                FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+                WHERE {where}
+                ORDER BY score
+                LIMIT ? OFFSET ?"""
+            rows = [_with_snippet(dict(row)) for row in connection.execute(sql, [match, *params, limit, offset])]
+        else:
+            where = ("WHERE " + " AND ".join(filters)) if filters else ""
+            sql = f"""
+                SELECT a.id, a.headline, a.source, a.url, a.datetime, a.related,
+                       a.summary AS snippet, NULL AS score
+                FROM articles a {where}
+                ORDER BY a.datetime DESC
+                LIMIT ? OFFSET ?"""
+            rows = [dict(row) for row in connection.execute(sql, [*params, limit, offset])]
+    except sqlite3.OperationalError as e:
+        raise ValueError(f"Invalid search: {e}") from None
+    finally:
+        if own:
+            connection.close()
+    return rows
+
+
+def like_search(query: str, limit: int = 20, connection: sqlite3.Connection | None = None) -> list:
+    """The old way: substring scan over full_text (kept for the benchmark)"""
+    connection = connection or connect()
+    rows = connection.execute(
+        "SELECT id, headline FROM articles WHERE full_text LIKE ? ORDER BY datetime DESC LIMIT ?",
+        (f"%{query}%", limit)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def news_items(rows: list, change_percent=None) -> list:
+    """Search rows in the dashboard NewsSection shape
+
+    `text` is the plain snippet NewsCard renders; `snippet` keeps the <mark> tags.
+    `change_percent(symbols)` (e.g. MoversTable.change_percents) fills each stock's change.
+    """
+    items = []
+    for row in rows:
+        symbols = [s.strip() for s in (row["related"] or "").split(",") if s.strip()]
+        changes = change_percent(symbols) if change_percent and symbols else [None] * len(symbols)
+        stocks = []
+        for symbol, change in zip(symbols, changes):
+            known = change is not None and change == change  # not None / NaN
+            stocks.append({"symbol": symbol, "change": f"{change:+.2f}%" if known else "",
+                           "positive": bool(known and change >= 0)})
+        items.append({
+            "id": row["id"],
+            "title": row["headline"],
+            "source": row["source"],
+            "text": re.sub(r"</?mark>", "", row["snippet"] or ""),
+            "snippet": row["snippet"],
+            "url": row["url"],
+            "datetime": row["datetime"],
+            "stocks": stocks,
+            "score": row["score"],
+        })
+    return items
+
+
+# ---------- Benchmark ----------
+if __name__ == "__main__":
+    import argparse
+    import random
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="FTS5 vs LIKE search benchmark")
+    parser.add_argument("--articles", type=int, default=1_000_000)
+    parser.add_argument("--words", type=int, default=80, help="words of full_text per article")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f"w{i}" for i in range(20_000)] + [
+        "earnings", "guidance", "merger", "acquisition", "inflation", "rates", "chip", "lawsuit",
+        "dividend", "buyback", "layoffs", "outlook", "downgrade", "upgrade", "recall", "tariff"]
+    tickers = ["AAPL", "MSFT", "NVDA", "AMZN", "TSLA", "META", "GOOGL", "JPM", "XOM", "NFLX"]
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    connection = connect(path)
+    connection.execute("""
+    CREATE TABLE articles(
+        id INTEGER PRIMARY KEY AUTOINCREMENT, article_id INTEGER, category TEXT, datetime INTEGER,
+        headline TEXT, related TEXT, source TEXT, summary TEXT, full_text TEXT, url TEXT,
+        inserted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+    ensure_fts(connection)
+
+    started = time.perf_counter()
+    batch = []
+    for i in range(args.articles):
+        words = rng.choices(vocabulary, k=args.words)
+        if rng.random() < 1 / 20_000:
+            words[-1] = "bankruptcy"  # rare term: LIKE has to scan nearly every row
+        batch.append((i, "general", 1_600_000_000 + i * 60, " ".join(words[:10]),
+                      rng.choice(tickers) if rng.random() < 0.3 else "", "wire",
+                      " ".join(words[10:30]), " ".join(words), f"https://example.com/{i}"))
+        if len(batch) == 50_000:
+            connection.executemany("""INSERT INTO articles (article_id, category, datetime, headline,
+                related, source, summary, full_text, url) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", batch)
+            connection.commit()
+            batch = []
+    if batch:
+        connection.executemany("""INSERT INTO articles (article_id, category, datetime, headline,
+            related, source, summary, full_text, url) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", batch)
+        connection.commit()
+    print(f"📊 {args.articles:,} articles inserted (with FTS triggers) in {time.perf_counter() - started:.1f}s, "
+          f"db {os.path.getsize(path) / 1e6:.0f} MB")
+
+    def timed(fn, repeat=5):
+        fn()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = fn()
+        return (time.perf_counter() - started) / repeat * 1000, result
+
+    for term in ["merger", "w123", "bankruptcy"]:
+        fts_ms, hits = timed(lambda: search_articles(term, limit=20, connection=connection))
+        like_ms, _ = timed(lambda: like_search(term, limit=20, connection=connection), repeat=2)
+        print(f"   '{term}': FTS5 {fts_ms:7.2f} ms vs LIKE {like_ms:8.1f} ms ({len(hits)} hits)")
+    ticker_ms, hits = timed(lambda: search_articles("earnings", ticker="NVDA", limit=20, connection=connection))
+    print(f"   'earnings' + NVDA: FTS5 {ticker_ms:.2f} ms ({len(hits)} hits)")
+    range_ms, hits = timed(lambda: search_articles("dividend", start=1_600_000_000,
+                                                   end=1_600_000_000 + 60 * args.articles // 10,
+                                                   limit=20, connection=connection))
+    print(f"   'dividend' in first 10% of dates: FTS5 {range_ms:.2f} ms ({len(hits)} hits)")
+    print(f"✅ Snippet: {hits[0]['snippet'] if hits else None}")
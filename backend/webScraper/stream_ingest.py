@@ -0,0 +1,534 @@
+# Real-time news ingestion from the Finlight WebSocket
+#
+#   receive -> dedup -> fetch/extract (N workers) -> sentiment -> write
+#
+# Stages are joined by bounded asyncio queues. When a later stage falls behind,
+# the queues fill, `await queue.put` blocks and the receiver stops reading the
+# socket, so the backlog stays bounded (backpressure) instead of growing in
+# memory. The writer commits in micro-batches (BATCH_SIZE rows or FLUSH_SECONDS,
+# whichever comes first); the FTS triggers index each batch, so new articles
+# show up in /api/news/search within seconds.
+#
+# The Finlight SDK delivers articles through a sync callback that can't wait for
+# the pipeline, so the receiver speaks the same WebSocket protocol directly
+# (payload + clientNonce, sendArticle / pong / admit messages, ping, reconnect),
+# including its waits after rate-limit / blocked errors and 429 handshakes.
+# A stage that crashes stops the whole pipeline with its exception rather than
+# leaving the other stages blocked on full queues.
+#
+# Run from backend/webScraper:
+#     python stream_ingest.py --query nvidia              live (FINLIGHT_KEY)
+#     python stream_ingest.py --fake --articles 300       local fake WebSocket server
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+import websockets
+
+import utils
+from dedup import ArticleDeduper, MinHashLSH, headline_text
+
+FINLIGHT_WSS = "wss://wss.finlight.me"
+QUEUE_SIZE = 100
+FETCH_WORKERS = 8
+BATCH_SIZE = 25
+FLUSH_SECONDS = 2.0
+PING_SECONDS = 25
+MAX_RECONNECT_DELAY = 10.0
+RATE_LIMIT_DELAY = 60.0      # server said "limit" or refused the handshake with 429 (as the SDK waits)
+BLOCKED_DELAY = 3600.0       # server said "blocked"
+SENTIMENT_COLUMN = "Predicted Sentiment"
+LATENCY_WINDOW = 10_000      # latest write latencies kept for the p50/p95 report
+
+
+def finlight_to_article(data: dict) -> dict:
+    """Finlight sendArticle payload -> the Finnhub-shaped dict insert_intoDB takes"""
+    link = data["link"]
+    published = data.get("publishDate")
+    if isinstance(published, str):
+        published = datetime.fromisoformat(published.replace("Z", "+00:00")).timestamp()
+    return {
+        # Stable integer id from the link (articles.article_id is an integer, unique)
+        "id": int.from_bytes(hashlib.sha1(link.encode()).digest()[:7], "big"),
+        "category": "finlight",
+        "datetime": int(published or time.time()),
+        "headline": data.get("title"),
+        "related": ",".join(c["ticker"] for c in data.get("companies") or [] if c.get("ticker")),
+        "source": data.get("source"),
+        "summary": data.get("summary"),
+        "url": link,
+        "content": data.get("content"),
+        "sentiment": data.get("sentiment"),
+    }
+
+
+def load_finbert_scorer():
+    """Batch headline scorer using FinBERT, or None if transformers/torch aren't installed"""
+    try:
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    except ImportError:
+        return None
+    tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
+    model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
+    labels = {0: "Positive", 1: "Negative", 2: "Neutral"}
+
+    def score(texts: list) -> list:
+        inputs = tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
+        with torch.no_grad():
+            predicted = model(**inputs).logits.argmax(dim=-1)
+        return [labels[int(i)] for i in predicted]
+
+    return score
+
+
+class StreamIngestor:
+    """Long-running WebSocket -> articles DB pipeline with bounded queues and micro-batch commits"""
+
+    def __init__(self, url: str = FINLIGHT_WSS, api_key: str | None = None, payload: dict | None = None,
+                 db_name: str = "NewsArticles", fetch=None, score=None, queue_size: int = QUEUE_SIZE,
+                 fetch_workers: int = FETCH_WORKERS, batch_size: int = BATCH_SIZE,
+                 flush_seconds: float = FLUSH_SECONDS, max_articles: int | None = None,
+                 db_path: str | None = None):
+        self.url = url
+        self.api_key = api_key or os.getenv("FINLIGHT_KEY", "")
+        self.payload = payload or {"query": None, "extended": True, "includeEntities": True}
+        self.db_name = db_name
+        self.db_path = db_path
+        self.fetch = fetch or utils.get_fulltext
+        self.score = score
+        self.queue_size = queue_size
+        self.fetch_workers = fetch_workers
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_articles = max_articles
+        self.metrics = {"received": 0, "already": 0, "duplicates": 0, "fetched": 0, "from_stream": 0,
+                        "written": 0, "batches": 0, "bad": 0, "reconnects": 0}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.max_depth = {}
+
+    # ---------- Setup ----------
+    def _setup(self):
+        utils.setup_database(self.db_name, self.db_path)
+        try:
+            utils.cursor.execute(f"ALTER TABLE articles ADD COLUMN [{SENTIMENT_COLUMN}] TEXT")
+        except sqlite3.OperationalError:
+            pass
+        if utils.ROUTER is None:
+            utils.ROUTER = utils.ExtractorRouter.load(utils.connection)
+        self.deduper = ArticleDeduper(utils.connection)
+        # Near-duplicates of articles still being fetched (not in the DB yet), keyed by link
+        self._inflight = MinHashLSH()
+        self._inflight_links = set()
+        self._row_ids = {}    # link -> articles.id written this session
+        self._waiting = {}    # canonical link -> duplicates whose canonical isn't written yet
+        self._stop = asyncio.Event()
+        self.incoming = asyncio.Queue(self.queue_size)
+        self.to_fetch = asyncio.Queue(self.queue_size)
+        self.to_score = asyncio.Queue(self.queue_size)
+        self.to_write = asyncio.Queue(self.queue_size)
+
+    def stop(self):
+        self._stop.set()
+
+    def _track_depth(self):
+        for name in ("incoming", "to_fetch", "to_score", "to_write"):
+            self.max_depth[name] = max(self.max_depth.get(name, 0), getattr(self, name).qsize())
+
+    # ---------- Stages ----------
+    async def _receive(self):
+        """Read the socket into `incoming`; blocks (stops reading) while the pipeline is full"""
+        delay = 0.5
+        headers = {"x-api-key": self.api_key}
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(self.url, additional_headers=headers) as ws:
+                    delay = 0.5
+                    await ws.send(json.dumps({**self.payload, "clientNonce": str(uuid.uuid4())}))
+                    pinger = asyncio.create_task(self._ping(ws))
+                    try:
+                        async for message in ws:
+                            try:
+                                msg = json.loads(message)
+                                action = msg.get("action")
+                            except (ValueError, AttributeError):
+                                self.metrics["bad"] += 1  # not JSON, or not a JSON object
+                                continue
+                            if action == "sendArticle":
+                                self.metrics["received"] += 1
+                                await self.incoming.put((time.time(), msg.get("data") or {}))
+                                self._track_depth()
+                            elif action == "preempted":
+                                print(f"⚠️ Finlight stream preempted: {msg.get('reason')}")
+                                self._stop.set()
+                                return
+                            elif action == "admin_kick":
+                                delay = msg.get("retryAfter", 900_000) / 1000
+                                break
+                            elif action == "error":
+                                error = str(msg.get("data") or msg.get("error"))
+                                print(f"❌ Finlight stream error: {error}")
+                                if "limit" in error.lower():
+                                    delay = RATE_LIMIT_DELAY
+                                    break
+                                if "blocked" in error.lower():
+                                    delay = BLOCKED_DELAY
+                                    break
+                    finally:
+                        pinger.cancel()
+            except websockets.exceptions.InvalidStatus as e:
+                print(f"⚠️ Finlight rejected the connection: {e}")
+                if e.response.status_code == 429:
+                    delay = RATE_LIMIT_DELAY
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                print(f"⚠️ Finlight connection error: {e}")
+            if self._stop.is_set():
+                return
+            self.metrics["reconnects"] += 1
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)  # a long server-imposed wait is not repeated
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(PING_SECONDS)
+            await ws.send(json.dumps({"action": "ping", "t": int(time.time() * 1000)}))
+
+    async def _dedup(self):
+        """Drop already-stored articles; route near-duplicates straight to the writer (no fetch)"""
+        while (item := await self.incoming.get()) is not None:
+            received, data = item
+            try:
+                article = finlight_to_article(data)
+            except (KeyError, TypeError, ValueError):
+                self.metrics["bad"] += 1
+                continue
+            link = article["url"]
+            if link in self._inflight_links or link in self._row_ids or utils.cursor.execute(
+                    "SELECT 1 FROM articles WHERE article_id = ?", (article["id"],)).fetchone():
+                self.metrics["already"] += 1
+                continue
+
+            signature = self.deduper.signature(headline_text(article), "headline")
+            match = self.deduper.find(signature, "headline")
+            if match:
+                article["canonical_id"], article["similarity"] = match
+            elif signature is not None and (inflight := self._inflight.query(signature, self.deduper.threshold)):
+                article["canonical_link"], article["similarity"] = inflight[0]
+            if "canonical_id" in article or "canonical_link" in article:
+                self.metrics["duplicates"] += 1
+                await self.to_write.put((received, article, None))
+                continue
+
+            article["signature"] = signature
+            if signature is not None:
+                self._inflight.add(link, signature)
+            self._inflight_links.add(link)
+            await self.to_fetch.put((received, article))
+            self._track_depth()
+
+    async def _fetch_worker(self):
+        """Full text from the stream (extended payloads) or fetched + extracted off the event loop"""
+        while (job := await self.to_fetch.get()) is not None:
+            received, article = job
+            content = article.pop("content", None)
+            if content and len(content.split()) >= utils.MIN_WORDS:
+                result = (content, "ok", None, None, {"best_url": article["url"], "used_extractor": "finlight",
+                                                      "html_len": 0})
+                self.metrics["from_stream"] += 1
+            else:
+                try:
+                    result = await asyncio.to_thread(self.fetch, article["url"])
+                except Exception as e:
+                    result = (None, "error", str(e), None, {"best_url": article["url"]})
+                self.metrics["fetched"] += 1
+            await self.to_score.put((received, article, result))
+            self._track_depth()
+
+    async def _sentiment(self):
+        """Score headlines the stream didn't label, a batch at a time"""
+        done = False
+        while not done:
+            batch = [await self.to_score.get()]
+            while len(batch) < self.batch_size and not self.to_score.empty():
+                batch.append(self.to_score.get_nowait())
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            todo = [a for _, a, _ in batch if not a.get("sentiment") and a.get("headline")]
+            if todo and self.score:
+                labels = await asyncio.to_thread(self.score, [a["headline"] for a in todo])
+                for article, label in zip(todo, labels):
+                    article["sentiment"] = label
+            for job in batch:
+                await self.to_write.put(job)
+                self._track_depth()
+
+    async def _writer(self):
+        """Insert in micro-batches: one transaction per BATCH_SIZE rows or FLUSH_SECONDS"""
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                job = await asyncio.wait_for(self.to_write.get(), timeout)
+            except asyncio.TimeoutError:
+                job = ...
+            if job is None:
+                self._flush(batch, final=True)
+                return
+            if job is not ...:
+                batch.append(job)
+                deadline = deadline or time.monotonic() + self.flush_seconds
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch, deadline = [], None
+                if self.max_articles and self.metrics["written"] >= self.max_articles:
+                    self._stop.set()
+
+    def _insert(self, received: float, article: dict, result, canonical_id: int | None = None) -> int | None:
+        if result is None:  # near-duplicate, never fetched
+            result = (None, "duplicate", f"similarity={article.get('similarity', 0):.2f}", None,
+                      {"used_extractor": None, "html_len": 0})
+        text, status, error, http_status, meta = result
+        row_id = utils.insert_intoDB(article, text, status, error, http_status, meta, canonical_id=canonical_id)
+        if row_id is None:
+            return None
+        if article.get("sentiment"):
+            utils.cursor.execute(f"UPDATE articles SET [{SENTIMENT_COLUMN}] = ? WHERE id = ?",
+                                 (str(article["sentiment"]).capitalize(), row_id))
+        self.metrics["written"] += 1
+        self.latencies.append(time.time() - received)
+        return row_id
+
+    def _flush(self, batch: list, final: bool = False):
+        """Write canonicals first so duplicates in the same batch can link to them, then commit once"""
+        for received, article, result in sorted(batch, key=lambda job: job[2] is None):
+            link = article["url"]
+            if "canonical_link" in article:
+                canonical = self._row_ids.get(article["canonical_link"])
+                if canonical is None and article["canonical_link"] in self._inflight_links:
+                    # Canonical is still being fetched: park until it is written
+                    self._waiting.setdefault(article["canonical_link"], []).append((received, article, result))
+                else:
+                    self._insert(received, article, result, canonical_id=canonical)
+                continue
+            row_id = self._insert(received, article, result, canonical_id=article.get("canonical_id"))
+            if row_id is not None and result is not None:
+                self._row_ids[link] = row_id
+                self.deduper.add(row_id, article.get("signature"), "headline")
+            self._inflight_links.discard(link)
+            for dup in self._waiting.pop(link, []):
+                self._insert(*dup, canonical_id=row_id)
+        if final:
+            for dups in self._waiting.values():
+                for dup in dups:
+                    self._insert(*dup)
+            self._waiting = {}
+        utils.connection.commit()
+        self.metrics["batches"] += 1
+        if not self._inflight_links and not self._waiting:
+            # Nothing in flight: the DB-backed index covers everything written
+            self._inflight = MinHashLSH()
+            self._row_ids = {}
+
+    # ---------- Orchestration ----------
+    async def _supervise(self, awaitable, stages: list):
+        """Await `awaitable`, but re-raise the first stage that crashes instead of waiting forever"""
+        main = asyncio.ensure_future(awaitable)
+        pending = {main, *stages}
+        while main in pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            failed = next((t for t in done if t is not main and not t.cancelled() and t.exception()), None)
+            if failed is not None:
+                print(f"❌ Stream pipeline stage failed: {failed.exception()!r}")
+                for task in (main, *stages):
+                    task.cancel()
+                await asyncio.gather(main, *stages, return_exceptions=True)
+                raise failed.exception()
+        return main.result()
+
+    async def run(self):
+        """Run until stop() (or max_articles written), then drain every stage and commit"""
+        self._setup()
+        receiver = asyncio.create_task(self._receive())
+        dedup = asyncio.create_task(self._dedup())
+        fetchers = [asyncio.create_task(self._fetch_worker()) for _ in range(self.fetch_workers)]
+        scorer = asyncio.create_task(self._sentiment())
+        writer = asyncio.create_task(self._writer())
+        stages = [receiver, dedup, *fetchers, scorer, writer]
+        started = time.time()
+
+        await self._supervise(self._stop.wait(), stages)
+        receiver.cancel()
+        await asyncio.gather(receiver, return_exceptions=True)
+        await self._supervise(self._drain(dedup, fetchers, scorer, writer), stages[1:])
+        if utils.ROUTER is not None:
+            utils.ROUTER.save(utils.connection)
+        self.metrics["seconds"] = time.time() - started
+        return self.report()
+
+    async def _drain(self, dedup, fetchers: list, scorer, writer):
+        """Drain in pipeline order: each stage sees its sentinel after everything queued before it"""
+        await self.incoming.put(None)
+        await dedup
+        for _ in fetchers:
+            await self.to_fetch.put(None)
+        await asyncio.gather(*fetchers)
+        await self.to_score.put(None)
+        await scorer
+        await self.to_write.put(None)
+        await writer
+
+    def report(self) -> dict:
+        m = dict(self.metrics)
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            m["latency_p50"] = ordered[len(ordered) // 2]
+            m["latency_p95"] = ordered[int(len(ordered) * 0.95)]
+        m["max_queue_depth"] = dict(self.max_depth)
+        return m
+
+
+# ---------- Fake Finlight server ----------
+async def fake_finlight_server(articles: list, rate: float = 200.0, port: int = 0):
+    """Local stand-in for wss.finlight.me: admits the client, streams `articles`, answers pings"""
+    async def handler(ws):
+        await ws.recv()  # subscription payload
+        await ws.send(json.dumps({"action": "admit", "leaseId": "local", "serverNow": int(time.time() * 1000)}))
+
+        async def stream():
+            for data in articles:
+                await ws.send(json.dumps({"action": "sendArticle", "data": data}))
+                await asyncio.sleep(1 / rate)
+
+        streamer = asyncio.create_task(stream())
+        try:
+            async for message in ws:
+                msg = json.loads(message)
+                if msg.get("action") == "ping":
+                    await ws.send(json.dumps({"action": "pong", "t": msg.get("t")}))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            streamer.cancel()
+
+    return await websockets.serve(handler, "127.0.0.1", port)
+
+
+if __name__ == "__main__":
+    import argparse
+    import http.server
+    import random
+    import shutil
+    import tempfile
+    import threading
+
+    parser = argparse.ArgumentParser(description="Finlight WebSocket ingestion")
+    parser.add_argument("--query", default=None)
+    parser.add_argument("--seconds", type=float, default=None, help="stop after this long (live mode)")
+    parser.add_argument("--fake", action="store_true", help="local fake server, local article pages, temp DB")
+    parser.add_argument("--articles", type=int, default=300, help="articles the fake server sends")
+    parser.add_argument("--rate", type=float, default=200.0, help="fake server articles per second")
+    parser.add_argument("--page-delay", type=float, default=0.05, help="fake article page latency (s)")
+    args = parser.parse_args()
+
+    def fake_feed(n: int, base_url: str) -> list:
+        """Finlight-shaped articles: ~25% near-duplicate wire copies, ~30% with full content"""
+        rng = random.Random(0)
+        vocabulary = [f"t{j}" for j in range(5000)]
+        stories, feed = [], []
+        for i in range(n):
+            if stories and rng.random() < 0.25:
+                base = rng.choice(stories)
+                feed.append({**base, "link": f"{base_url}/copy/{i}", "source": "other-outlet.com",
+                             "title": base["title"] + " - Reuters"})
+                continue
+            words = " ".join(rng.choices(vocabulary, k=15))
+            data = {"link": f"{base_url}/story/{i}", "title": f"Story {i} {words}", "summary": words,
+                    "source": "example.com", "language": "en", "publishDate": datetime.now().isoformat(),
+                    "companies": [{"ticker": rng.choice(["AAPL", "MSFT", "NVDA", "AMZN"]), "companyId": 1}]}
+            if rng.random() < 0.3:
+                data["content"] = " ".join(rng.choices(vocabulary, k=400))
+            stories.append(data)
+            feed.append(data)
+        return feed
+
+    async def main():
+        if not args.fake:
+            ingestor = StreamIngestor(payload={"query": args.query, "extended": True, "includeEntities": True},
+                                      score=load_finbert_scorer())
+            if args.seconds:
+                asyncio.get_running_loop().call_later(args.seconds, ingestor.stop)
+            return await ingestor.run()
+
+        page_delay = args.page_delay
+        paragraph = "<p>" + " ".join(f"w{i}" for i in range(80)) + "</p>"
+
+        class Page(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(page_delay)
+                html = f"<html><body><article><h1>{self.path}</h1>{paragraph * 4}</article></body></html>".encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(html)))
+                self.end_headers()
+                self.wfile.write(html)
+
+            def log_message(self, *a):
+                pass
+
+        pages = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Page)
+        threading.Thread(target=pages.serve_forever, daemon=True).start()
+        feed = fake_feed(args.articles, f"http://127.0.0.1:{pages.server_port}")
+        server = await fake_finlight_server(feed, rate=args.rate)
+        root = tempfile.mkdtemp()
+        try:
+            utils.HTML_CACHE = utils.HtmlCache(os.path.join(root, "html_cache"))
+            ingestor = StreamIngestor(url=f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}",
+                                      api_key="local", db_path=os.path.join(root, "stream.db"),
+                                      score=lambda texts: ["Neutral"] * len(texts))
+            watcher = asyncio.create_task(_stop_when_idle(ingestor, len(feed)))
+            report = await ingestor.run()
+            watcher.cancel()
+            rows, dups = utils.cursor.execute(
+                "SELECT COUNT(*), COUNT(canonical_id) FROM articles").fetchone()
+            searchable = utils.cursor.execute(
+                "SELECT COUNT(*) FROM articles_fts WHERE articles_fts MATCH 'story'").fetchone()[0]
+            report.update(rows=rows, linked_duplicates=dups, searchable=searchable)
+            return report
+        finally:
+            server.close()
+            pages.shutdown()
+            utils.connection.close()
+            shutil.rmtree(root)
+
+    async def _stop_when_idle(ingestor, expected: int):
+        """Fake mode: stop once every sent article was received and the pipeline went quiet"""
+        while True:
+            await asyncio.sleep(0.2)
+            m = ingestor.metrics
+            if m["received"] >= expected and m["written"] + m["already"] + m["bad"] >= expected:
+                ingestor.stop()
+                return
+
+    report = asyncio.run(main())
+    latency = (f"p50 {report['latency_p50']:.2f}s, p95 {report['latency_p95']:.2f}s"
+               if "latency_p50" in report else "n/a")
+    print(f"📊 {report['received']} received, {report['written']} written in {report['batches']} batches "
+          f"({report['written'] / report['seconds']:.0f} articles/s)")
+    print(f"   {report['duplicates']} near-duplicates linked without fetching, {report['fetched']} fetched, "
+          f"{report['from_stream']} full text from the stream")
+    print(f"   received -> committed latency {latency}")
+    print(f"   max queue depth {report['max_queue_depth']}")
+    if "rows" in report:
+        print(f"✅ {report['rows']} rows ({report['linked_duplicates']} linked duplicates), "
+              f"{report['searchable']} searchable via FTS")